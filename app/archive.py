@@ -0,0 +1,85 @@
+import logging
+from datetime import datetime
+from sqlalchemy import and_, delete, func, insert, literal, or_, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from .metrics import APPOINTMENTS_ARCHIVED
+from .models import Appointment, AppointmentArchive, Client, Reminder
+
+# Sıcak / soğuk randevu deposu. Bitişi ufuktan eski randevular (tamamlanmış ya da iptal)
+# partiler halinde appointmentarchive tablosuna taşınır: INSERT ... SELECT + DELETE, parti
+# başına bir commit. Sıcak sorgular (busy_from_db, yaklaşan liste, iptal araması, schedule_all)
+# sadece güncel satırları tarar; geçmiş iki tablonun birleşimi olarak okunur.
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ("id", "tenant_id", "client_id", "start", "end", "status", "source", "ms_event_id",
+           "series_id", "occurrence_start")
+
+def archive_before(session: Session, cutoff: datetime, batch_size: int = 500, tenant_id: int | None = None) -> int:
+    # cutoff'tan önce biten randevuları taşır; taşınan satır sayısını döner.
+    # En büyük id taşınmaz: SQLite rowid'i max(id)+1'den verir, silinirse aynı id yeniden
+    # kullanılır ve arşivde çakışır.
+    moved = 0
+    max_id = select(func.max(Appointment.id)).scalar_subquery()
+    while True:
+        q = select(Appointment.id).where(Appointment.end < cutoff, Appointment.id < max_id)
+        if tenant_id is not None:
+            q = q.where(Appointment.tenant_id == tenant_id)
+        ids = session.exec(q.order_by(Appointment.id).limit(batch_size)).all()
+        if not ids:
+            return moved
+        cols = [getattr(Appointment, c) for c in COLUMNS]
+        try:
+            session.execute(insert(AppointmentArchive).from_select(
+                COLUMNS + ("archived_at",), select(*cols, func.now()).where(Appointment.id.in_(ids))))
+            # Geçmiş randevunun hatırlatmaları (gönderilmiş / başarısız) onunla birlikte gider
+            session.execute(delete(Reminder).where(Reminder.appointment_id.in_(ids)))
+            session.execute(delete(Appointment).where(Appointment.id.in_(ids)))
+            session.commit()
+        except IntegrityError as e:
+            # Aynı partiyi başka süreç taşıdı; bu tur bırakılır
+            session.rollback()
+            log.warning("arşivleme durdu: %s", e.orig)
+            return moved
+        moved += len(ids)
+        APPOINTMENTS_ARCHIVED.inc(len(ids))
+
+def _branch(model, tenant_id: int, before: datetime, start_from: datetime | None, phone: str | None,
+            status: str | None, after: tuple[datetime, int] | None, archived: bool):
+    q = (select(model.id, model.start, model.end, model.status, model.source, model.series_id,
+                Client.phone, literal(archived).label("archived"))
+         .join(Client, Client.id == model.client_id, isouter=True)
+         .where(model.tenant_id == tenant_id, model.start < before))
+    if start_from is not None:
+        q = q.where(model.start >= start_from)
+    if phone:
+        q = q.where(Client.phone == phone)
+    if status:
+        q = q.where(model.status == status)
+    if after is not None:
+        a_start, a_id = after
+        q = q.where(or_(model.start < a_start, and_(model.start == a_start, model.id < a_id)))
+    return q
+
+def history_query(tenant_id: int, before: datetime, start_from: datetime | None = None, phone: str | None = None,
+                  status: str | None = None, after: tuple[datetime, int] | None = None, limit: int = 20):
+    # Geçmiş: sıcak tablo + arşiv, (start, id) azalan keyset sayfalama. Her dal kendi indeksiyle
+    # sadece `limit` satır okur; birleşim en fazla 2*limit satırı sıralar.
+    branches = [
+        _branch(m, tenant_id, before, start_from, phone, status, after, m is AppointmentArchive)
+        .order_by(m.start.desc(), m.id.desc()).limit(limit)
+        for m in (Appointment, AppointmentArchive)
+    ]
+    # SQLite bileşik sorguda dal başına ORDER BY / LIMIT kabul etmez; dallar alt sorgu olur
+    u = union_all(*(select(*b.subquery().c) for b in branches)).subquery()
+    return select(u).order_by(u.c.start.desc(), u.c.id.desc()).limit(limit)
+
+def archived_overrides(series_ids: list[int], start: datetime, end: datetime | None):
+    # Arşivdeki seri istisnaları; geçmiş pencerede açılımın arşivlenmiş oturumları tekrar üretmemesi için
+    q = (select(AppointmentArchive.series_id, AppointmentArchive.occurrence_start)
+         .where(AppointmentArchive.series_id.in_(series_ids))
+         .where(AppointmentArchive.occurrence_start >= start))
+    if end is not None:
+        q = q.where(AppointmentArchive.occurrence_start < end)
+    return q
@@ -1,26 +1,72 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from jose import jwt
-from passlib.hash import pbkdf2_sha256, bcrypt, bcrypt_sha256  # bcrypt* sadece geriye dönük uyumluluk için
+from passlib.hash import pbkdf2_sha256
 
 # Ana şifre şeması: PBKDF2-SHA256  (bcrypt'e bağımlılık yok, 72 byte sınırı yok)
 def hash_password(p: str) -> str:
     # rounds = 29000 default; istersen 200k+ yapabilirsin
     return pbkdf2_sha256.hash(p)
 
+def _bcrypt_sha256():
+    # bcrypt* sadece geriye dönük uyumluluk için; ihtiyaç olunca yüklenir
+    from passlib.hash import bcrypt_sha256
+    return bcrypt_sha256
+
+def _bcrypt():
+    from passlib.hash import bcrypt
+    return bcrypt
+
+# Hash öneki → şema; sırayla deneyip istisna yakalamak yerine doğrudan seçilir
+_SCHEMES = (
+    ("$pbkdf2-sha256$", lambda: pbkdf2_sha256),
+    ("$bcrypt-sha256$", _bcrypt_sha256),
+    ("$2b$", _bcrypt), ("$2a$", _bcrypt), ("$2y$", _bcrypt),
+)
+
+def _scheme_for(h: str):
+    for prefix, loader in _SCHEMES:
+        if h.startswith(prefix):
+            return loader()
+    return None
+
 def verify_password(p: str, h: str) -> bool:
-    # 1) yeni şema
+    scheme = _scheme_for(h or "")
+    if scheme is None:
+        return False
     try:
-        return pbkdf2_sha256.verify(p, h)
+        return scheme.verify(p, h)
     except Exception:
-        pass
-    # 2) eski olası hash'ler için geriye dönük uyumluluk
-    try:
-        return bcrypt_sha256.verify(p, h)
-    except Exception:
-        try:
-            return bcrypt.verify(p, h)
-        except Exception:
-            return False
+        # bozuk hash ya da eksik bcrypt backend'i
+        return False
+
+def needs_rehash(h: str) -> bool:
+    # Eski şema (bcrypt*) ya da güncel olmayan PBKDF2 ayarları
+    if not h.startswith("$pbkdf2-sha256$"):
+        return True
+    return pbkdf2_sha256.needs_update(h)
+
+# PBKDF2 CPU işi event loop'u kilitlemesin diye sınırlı bir thread havuzunda çalışır
+# (hashlib.pbkdf2_hmac GIL'i bırakır). Havuz boyutu eşzamanlı hash sayısını da sınırlar.
+_hash_pool: ThreadPoolExecutor | None = None
+
+def configure_hashing(workers: int):
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False)
+    _hash_pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pwhash")
+
+async def _run(fn, *args):
+    if _hash_pool is None:
+        configure_hashing(2)
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+async def hash_password_async(p: str) -> str:
+    return await _run(hash_password, p)
+
+async def verify_password_async(p: str, h: str) -> bool:
+    return await _run(verify_password, p, h)
 
 def create_access_token(subject: str, secret: str, minutes: int) -> str:
     now = datetime.now(timezone.utc)
@@ -30,4 +76,3 @@ def create_access_token(subject: str, secret: str, minutes: int) -> str:
         "exp": int((now + timedelta(minutes=minutes)).timestamp()),
     }
     return jwt.encode(payload, secret, algorithm="HS256")
-
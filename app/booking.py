@@ -0,0 +1,204 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from .cache import TTLCache
+from .logic import as_utc
+from .models import Appointment, AppointmentSeries, APPOINTMENT_OVERLAP
+from .series import expand, occurrences, override, series_until
+
+# Çift rezervasyon koruması iki katmanlı:
+#   1) Tenant başına süreç içi aralık indeksi: "bu aralık dolu mu?" DB'ye gitmeden O(log n).
+#      Tembel yüklenir, bu süreçteki yazımlarla güncellenir, TTL sonunda yeniden okunur.
+#   2) Veritabanı guard'ı (bkz. db._install_overlap_guard): diğer worker'ların yazımları ve
+#      aynı anda gelen istekler için son söz. İndeks sadece hızlı ön kontrol; yanılırsa
+#      INSERT reddedilir ve indeks yeniden yüklenir.
+
+# Yeni serinin çakışma kontrolü bu kadar ileriye bakar (açık uçlu seriler için)
+SERIES_CHECK_DAYS = 366
+
+class BookingConflict(Exception):
+    # args[0] (varsa): çakışan ilk oturumun başlangıcı
+    pass
+
+class IntervalIndex:
+    # Onaylı randevular başlangıca göre sıralı; max_end[i] = ends[0..i] içindeki en geç bitiş.
+    # [start, end) ile çakışma: başlangıcı end'den önce olanların en geç bitişi start'tan sonra mı?
+    # Sorgu O(log n); ekleme / silme liste kaydırması kadar (memmove, binlerce kayıtta önemsiz).
+    def __init__(self, items=()):
+        items = sorted((as_utc(s), as_utc(e), i) for s, e, i in items)
+        self.starts = [s for s, _, _ in items]
+        self.ends = [e for _, e, _ in items]
+        self.ids = [i for _, _, i in items]
+        self.max_end = list(accumulate(self.ends, max))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def overlaps(self, start: datetime, end: datetime, ignore: int | None = None) -> bool:
+        start, end = as_utc(start), as_utc(end)
+        with self._lock:
+            i = bisect_left(self.starts, end)
+            if ignore is None:
+                return i > 0 and self.max_end[i - 1] > start
+            # Taşınan randevu kendisiyle çakışmasın: adayları geriye doğru tara (önek max > start iken)
+            j = i - 1
+            while j >= 0 and self.max_end[j] > start:
+                if self.ends[j] > start and self.ids[j] != ignore:
+                    return True
+                j -= 1
+            return False
+
+    def add(self, start: datetime, end: datetime, appt_id: int):
+        start, end = as_utc(start), as_utc(end)
+        with self._lock:
+            i = bisect_right(self.starts, start)
+            self.starts.insert(i, start)
+            self.ends.insert(i, end)
+            self.ids.insert(i, appt_id)
+            self.max_end.insert(i, max(self.max_end[i - 1], end) if i else end)
+            # Sonraki önek maksimumları sadece yeni bitiş onları aşıyorsa değişir
+            j = i + 1
+            while j < len(self.max_end) and self.max_end[j] < end:
+                self.max_end[j] = end
+                j += 1
+
+    def remove(self, appt_id: int, start: datetime) -> bool:
+        start = as_utc(start)
+        with self._lock:
+            i = bisect_left(self.starts, start)
+            while i < len(self.starts) and self.starts[i] == start:
+                if self.ids[i] == appt_id:
+                    del self.starts[i], self.ends[i], self.ids[i], self.max_end[i]
+                    for j in range(i, len(self.max_end)):
+                        m = max(self.max_end[j - 1], self.ends[j]) if j else self.ends[j]
+                        if m == self.max_end[j]:
+                            break  # buradan sonrası değişmez
+                        self.max_end[j] = m
+                    return True
+                i += 1
+            return False
+
+class BookingIndex:
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Tenant başına nesil: yükleme sürerken gelen yazım, eksik indeksin önbelleğe girmesini engeller
+        self._gen: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, tenant_id: int) -> IntervalIndex:
+        idx = self.cache.get(tenant_id)
+        if idx is None:
+            gen = self._gen.get(tenant_id, 0)
+            idx = self._load(session, tenant_id)
+            with self._lock:
+                if self._gen.get(tenant_id, 0) == gen:
+                    self.cache.set(tenant_id, idx)
+        return idx
+
+    def _load(self, session: Session, tenant_id: int) -> IntervalIndex:
+        # Bitmiş randevular yeni (ileri tarihli) rezervasyonla çakışamaz; geçmişe yazılan
+        # manuel kayıtlar için karar DB guard'ında
+        rows = session.exec(
+            select(Appointment.start, Appointment.end, Appointment.id)
+            .where(Appointment.tenant_id == tenant_id)
+            .where(Appointment.status == "confirmed")
+            .where(Appointment.end > datetime.now(timezone.utc))
+        ).all()
+        return IntervalIndex(rows)
+
+    def overlaps(self, session: Session, tenant_id: int, start: datetime, end: datetime,
+                 ignore: int | None = None) -> bool:
+        return self.get(session, tenant_id).overlaps(start, end, ignore)
+
+    def _bump(self, tenant_id: int):
+        with self._lock:
+            self._gen[tenant_id] = self._gen.get(tenant_id, 0) + 1
+
+    def add(self, tenant_id: int, start: datetime, end: datetime, appt_id: int):
+        self._bump(tenant_id)
+        idx = self.cache.get(tenant_id)
+        if idx is not None:
+            idx.add(start, end, appt_id)
+
+    def remove(self, tenant_id: int, appt_id: int, start: datetime):
+        self._bump(tenant_id)
+        idx = self.cache.get(tenant_id)
+        if idx is not None:
+            idx.remove(appt_id, start)
+
+    def invalidate(self, tenant_id: int):
+        self._bump(tenant_id)
+        self.cache.pop(tenant_id)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+def is_overlap_error(e: IntegrityError) -> bool:
+    # SQLite trigger mesajı ya da Postgres exclusion constraint adı
+    return APPOINTMENT_OVERLAP in str(e.orig)
+
+def series_overlaps(session: Session, tenant_id: int, start: datetime, end: datetime,
+                    skip: tuple[int, datetime] | None = None) -> bool:
+    # Tekrarlayan serilerin satıra dönüşmemiş oturumları DB guard'ında görünmez; burada açılır
+    return any((o.series_id, o.start) != skip for o in occurrences(session, tenant_id, start, end))
+
+def book_appointment(session: Session, index: BookingIndex, tenant_id: int, client_id: int,
+                     start: datetime, end: datetime, source: str,
+                     series: AppointmentSeries | None = None, occurrence_start: datetime | None = None) -> Appointment:
+    # series verilirse serinin o oturumu [start, end)'e taşınır (istisna satırı)
+    row, skip = None, None
+    if series is not None:
+        skip = (series.id, as_utc(occurrence_start))
+        row = session.exec(select(Appointment).where(Appointment.series_id == series.id)
+                           .where(Appointment.occurrence_start == skip[1])).first()
+    ignore = row.id if row is not None and row.status == "confirmed" else None
+    old_start = row.start if ignore is not None else None
+    if index.overlaps(session, tenant_id, start, end, ignore) or series_overlaps(session, tenant_id, start, end, skip):
+        raise BookingConflict()
+    if series is not None:
+        appt = override(session, series, occurrence_start, "confirmed", start, end)
+    else:
+        appt = Appointment(tenant_id=tenant_id, client_id=client_id, start=start, end=end,
+                           status="confirmed", source=source)
+        session.add(appt)
+    try:
+        session.commit()
+    except IntegrityError as e:
+        session.rollback()
+        if not is_overlap_error(e):
+            raise
+        # Başka worker / istek aynı saati aldı; bu süreçteki indeks eski
+        index.invalidate(tenant_id)
+        raise BookingConflict() from e
+    session.refresh(appt)
+    if old_start is not None:
+        index.remove(tenant_id, appt.id, old_start)
+    index.add(tenant_id, start, end, appt.id)
+    return appt
+
+def book_series(session: Session, index: BookingIndex, tenant_id: int, client_id: int, start: datetime,
+                duration_minutes: int, rrule: str, tz_name: str, source: str = "manual") -> AppointmentSeries:
+    # Oturumlar ilk SERIES_CHECK_DAYS gün için mevcut randevular ve diğer serilerle karşılaştırılır.
+    # Seriler satır olmadığından DB guard'ı kapsamaz; eşzamanlı iki seri oluşturma nadir, kontrol burada.
+    series = AppointmentSeries(tenant_id=tenant_id, client_id=client_id, start=start, duration_minutes=duration_minutes,
+                               rrule=rrule, tz=tz_name, source=source)
+    series.until = series_until(series)
+    horizon = start + timedelta(days=SERIES_CHECK_DAYS)
+    if series.until is not None:
+        horizon = min(horizon, series.until)
+    occs = expand(series, start, horizon)
+    if not occs:
+        raise ValueError("Kural hiç oturum üretmiyor")
+    booked = index.get(session, tenant_id)
+    others = IntervalIndex((o.start, o.end, -o.series_id) for o in occurrences(session, tenant_id, start, horizon))
+    for s, e in occs:
+        if booked.overlaps(s, e) or others.overlaps(s, e):
+            raise BookingConflict(s)
+    session.add(series)
+    session.commit()
+    session.refresh(series)
+    return series
@@ -0,0 +1,264 @@
+import codecs, csv, io, json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterable, Callable, Iterator
+from zoneinfo import ZoneInfo
+from sqlalchemy import bindparam, insert, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from .booking import IntervalIndex
+from .logic import as_utc, ensure_client
+from .models import Appointment, AppointmentArchive, Client
+from .series import occurrences
+
+# Toplu içe / dışa aktarma (NDJSON ve CSV). İçe aktarma gövdeyi akış halinde okur ve
+# partiler halinde yazar: danışanlar (tenant_id, phone) üzerinden tek sorguda eşlenir /
+# eklenir, randevular tek INSERT ile eklenir, parti başına bir commit. Satır başına
+# WhatsApp bildirimi ve hatırlatma kurulumu yok; hatırlatmalar en sonda bir kez kurulur.
+# Dışa aktarma sunucu tarafı imleçle (yield_per) satır satır akar; tablo belleğe alınmaz.
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+APPOINTMENT_STATUSES = ("confirmed", "cancelled")
+MAX_REPORTED_ERRORS = 100
+
+def detect_format(fmt: str | None, content_type: str | None) -> str:
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"format {'/'.join(FORMATS)} olmalı")
+        return fmt
+    return "csv" if content_type and "csv" in content_type else "ndjson"
+
+# ----------------- Okuma -----------------
+async def iter_lines(chunks: AsyncIterable[bytes]):
+    # Parçalar halinde gelen UTF-8 gövdeyi satırlara böler (parça sınırındaki çok baytlı karakterler dahil)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    async for chunk in chunks:
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf.rstrip("\r")
+
+async def iter_records(chunks: AsyncIterable[bytes], fmt: str):
+    # (satır no, kayıt dict | ValueError); boş satırlar atlanır.
+    # CSV: ilk satır başlık; tırnak içinde satır sonu desteklenmez (satır bazlı okunur).
+    header = None
+    lineno = 0
+    async for line in iter_lines(chunks):
+        lineno += 1
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                rec = json.loads(line)
+                yield lineno, rec if isinstance(rec, dict) else ValueError("JSON nesnesi bekleniyor")
+            except json.JSONDecodeError as e:
+                yield lineno, ValueError(f"geçersiz JSON: {e.msg}")
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        yield lineno, dict(zip(header, values))
+
+def _phone(rec: dict) -> str:
+    phone = str(rec.get("phone") or "").strip()
+    if not phone:
+        raise ValueError("phone gerekli")
+    return phone
+
+def _dt(value, tzi: ZoneInfo) -> datetime:
+    try:
+        raw = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"geçersiz tarih: {value!r}")
+    if raw.tzinfo is None:
+        raw = raw.replace(tzinfo=tzi)
+    return raw.astimezone(timezone.utc)
+
+def parse_client(rec: dict) -> dict:
+    return {"phone": _phone(rec), "name": (str(rec.get("name") or "").strip() or None)}
+
+def parse_appointment(rec: dict, tz_name: str, slot_minutes: int) -> dict:
+    # Saat dilimi olmayan tarihler klinik yerel saati kabul edilir (POST /api/appointments gibi)
+    tzi = ZoneInfo(tz_name)
+    if not rec.get("start"):
+        raise ValueError("start gerekli")
+    start = _dt(rec["start"], tzi)
+    end = _dt(rec["end"], tzi) if rec.get("end") else start + timedelta(minutes=slot_minutes)
+    if end <= start:
+        raise ValueError("end start'tan sonra olmalı")
+    status = str(rec.get("status") or "confirmed").strip().lower()
+    if status not in APPOINTMENT_STATUSES:
+        raise ValueError(f"status {'/'.join(APPOINTMENT_STATUSES)} olmalı")
+    return {**parse_client(rec), "start": start, "end": end, "status": status,
+            "source": str(rec.get("source") or "import").strip()[:32]}
+
+# ----------------- Yazma -----------------
+@dataclass
+class ImportResult:
+    imported: int = 0
+    clients_created: int = 0
+    clients_updated: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+    future_ids: list[int] = field(default_factory=list)  # hatırlatma kurulacak randevular
+    reminders: int = 0
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def summary(self) -> dict:
+        return {"imported": self.imported, "failed": self.failed, "clients_created": self.clients_created,
+                "clients_updated": self.clients_updated, "reminders": self.reminders, "errors": self.errors}
+
+def upsert_clients(session: Session, tenant_id: int, clients: dict[str, str | None],
+                   result: ImportResult | None = None) -> dict[str, int]:
+    # phone → isim (None: mevcut ismi koru). Dönen: phone → client_id; commit burada.
+    # Dialekte özgü ON CONFLICT yerine: mevcutları tek sorguda oku, eksikleri tek INSERT'le ekle.
+    phones = list(clients)
+    existing = {}
+    for i in range(0, len(phones), 500):
+        existing.update({p: (cid, n) for p, cid, n in session.exec(
+            select(Client.phone, Client.id, Client.name)
+            .where(Client.tenant_id == tenant_id).where(Client.phone.in_(phones[i:i + 500]))).all()})
+    missing = [{"tenant_id": tenant_id, "phone": p, "name": clients[p]} for p in phones if p not in existing]
+    renamed = [{"cid": existing[p][0], "new_name": n} for p, n in clients.items()
+               if p in existing and n and n != existing[p][1]]
+    try:
+        if missing:
+            session.execute(insert(Client), missing)
+        if renamed:
+            session.connection().execute(
+                update(Client).where(Client.id == bindparam("cid")).values(name=bindparam("new_name")), renamed)
+        session.commit()
+    except IntegrityError:
+        # Aynı danışan eşzamanlı başka istekte eklendi; tek tek (ensure_client) devam et
+        session.rollback()
+        return {p: ensure_client(session, tenant_id, p, n).id for p, n in clients.items()}
+    if result is not None:
+        result.clients_created += len(missing)
+        result.clients_updated += len(renamed)
+    ids = {p: v[0] for p, v in existing.items()}
+    if missing:
+        for i in range(0, len(missing), 500):
+            chunk = [m["phone"] for m in missing[i:i + 500]]
+            ids.update(session.exec(select(Client.phone, Client.id)
+                                    .where(Client.tenant_id == tenant_id).where(Client.phone.in_(chunk))).all())
+    return ids
+
+def _taken(session: Session, tenant_id: int, batch: list[tuple[int, dict]]) -> IntervalIndex:
+    # Partinin penceresindeki onaylı randevular + satıra dönüşmemiş seri oturumları (pencere başına bir kez).
+    # Seri oturumlarını DB guard'ı görmez; yalnızca bu kontrol yakalar
+    lo = min(r["start"] for _, r in batch)
+    hi = max(r["end"] for _, r in batch)
+    rows = session.exec(select(Appointment.start, Appointment.end, Appointment.id)
+                        .where(Appointment.tenant_id == tenant_id).where(Appointment.status == "confirmed")
+                        .where(Appointment.start < hi).where(Appointment.end > lo)).all()
+    return IntervalIndex(list(rows) + [(o.start, o.end, -o.series_id)
+                                       for o in occurrences(session, tenant_id, lo, hi)])
+
+def import_appointment_batch(session: Session, tenant_id: int, batch: list[tuple[int, dict]],
+                             result: ImportResult, is_overlap: Callable[[IntegrityError], bool]):
+    # batch: [(satır no, parse_appointment çıktısı)]; önce çakışma kontrolü, sonra danışanlar,
+    # sonra randevular tek INSERT + commit. Reddedilen satırın danışanı eklenmez / yeniden adlandırılmaz.
+    # Geçmiş tarihli satırlar (arşiv aktarımı) seri oturumlarıyla karşılaştırılmaz.
+    now = datetime.now(timezone.utc)
+    upcoming = [(n, r) for n, r in batch if r["status"] == "confirmed" and r["start"] > now]
+    if upcoming:
+        taken, rejected = _taken(session, tenant_id, upcoming), set()
+        for lineno, r in upcoming:
+            if taken.overlaps(r["start"], r["end"]):
+                rejected.add(lineno)
+                result.error(lineno, "saat dolu (çakışan onaylı randevu ya da seri oturumu)")
+            else:
+                taken.add(r["start"], r["end"], 0)  # aynı partideki sonraki satırlar için
+        batch = [(n, r) for n, r in batch if n not in rejected]
+        if not batch:
+            return
+    names: dict[str, str | None] = {}
+    for _, r in batch:
+        names[r["phone"]] = r["name"] or names.get(r["phone"])
+    client_ids = upsert_clients(session, tenant_id, names, result)
+    rows = [{"tenant_id": tenant_id, "client_id": client_ids[r["phone"]], "start": r["start"], "end": r["end"],
+             "status": r["status"], "source": r["source"]} for _, r in batch]
+    try:
+        ids = session.execute(insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True), rows).scalars().all()
+        session.commit()
+    except IntegrityError as e:
+        # Partide DB çakışma guard'ına takılan satır var (ön kontrolden sonra başka istek aynı saati
+        # aldı, ya da geçmiş tarihli çakışma): partiyi satır satır yaz, reddedilenleri raporla.
+        # Bu nadir durumda satırın danışanı eklenmiş olarak kalır.
+        session.rollback()
+        if not is_overlap(e):
+            raise
+        ids = []
+        for (lineno, _), row in zip(batch, rows):
+            try:
+                ids.append(session.execute(insert(Appointment).returning(Appointment.id), row).scalar_one())
+                session.commit()
+            except IntegrityError as e:
+                session.rollback()
+                if not is_overlap(e):
+                    raise
+                ids.append(None)
+                result.error(lineno, "saat dolu (çakışan onaylı randevu)")
+    for appt_id, row in zip(ids, rows):
+        if appt_id is None:
+            continue
+        result.imported += 1
+        if row["status"] == "confirmed" and row["start"] > now:
+            result.future_ids.append(appt_id)
+
+# ----------------- Dışa aktarma -----------------
+APPOINTMENT_COLUMNS = ("id", "phone", "name", "start", "end", "status", "source", "series_id")
+CLIENT_COLUMNS = ("phone", "name", "created_at")
+
+def cell(v):
+    return as_utc(v).isoformat() if isinstance(v, datetime) else v
+
+def stream_rows(session_factory: Callable[[], Session], query, columns: tuple, fmt: str,
+                batch_size: int = 1000) -> Iterator[str]:
+    # StreamingResponse'un thread havuzunda tükettiği üreteç; kendi session'ını açar (istek
+    # bağımlılığının session'ı yanıt akarken kapanmış olur). yield_per → sunucu tarafı imleç.
+    with session_factory() as session:
+        result = session.execute(query.execution_options(yield_per=batch_size))
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(columns)
+            for part in result.partitions():
+                writer.writerows([[cell(v) for v in row] for row in part])
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()
+        else:
+            for part in result.partitions():
+                yield "".join(json.dumps(dict(zip(columns, map(cell, row))), ensure_ascii=False) + "\n"
+                              for row in part)
+
+def appointments_export_query(tenant_id: int, start_from: datetime | None, start_to: datetime | None):
+    # Arşive taşınmış randevular da dahil (sıcak tablo + appointmentarchive)
+    def _branch(model):
+        q = (select(model.id, Client.phone, Client.name, model.start, model.end, model.status,
+                    model.source, model.series_id)
+             .join(Client, Client.id == model.client_id, isouter=True)
+             .where(model.tenant_id == tenant_id))
+        if start_from is not None:
+            q = q.where(model.start >= start_from)
+        if start_to is not None:
+            q = q.where(model.start < start_to)
+        return q
+    u = union_all(_branch(Appointment), _branch(AppointmentArchive)).subquery()
+    return select(u).order_by(u.c.start, u.c.id)
+
+def clients_export_query(tenant_id: int):
+    return (select(Client.phone, Client.name, Client.created_at)
+            .where(Client.tenant_id == tenant_id).order_by(Client.id))
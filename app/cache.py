@@ -0,0 +1,216 @@
+import threading, time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, time as dtime
+from sqlalchemy import event
+from sqlmodel import Session, select
+from .logic import as_utc, busy_from_db, free_slots, local_day_bounds, zone
+from .models import Tenant, User
+
+_MISSING = object()
+
+# Boyut (LRU) ve süre (TTL) sınırlı, thread-safe basit önbellek; isabet/ıska sayaçlı
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[0] < now:
+                if item is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, (None, None))[1]
+
+    def discard_where(self, pred) -> int:
+        with self._lock:
+            keys = [k for k in self._data if pred(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+# Tenant + yerel gün anahtarlı meşgul aralık / boş slot önbelleği.
+# Randevu eklenince / iptal edilince sadece etkilenen günler silinir (invalidate).
+# Önbellek süreç içidir; diğer worker'lar en geç TTL sonunda güncel veriyi görür.
+class AvailabilityCache:
+    def __init__(self, work_start: dtime, work_end: dtime, slot_minutes: int, tz_name: str,
+                 maxsize: int = 2048, ttl: float = 30.0):
+        self.work_start = work_start
+        self.work_end = work_end
+        self.slot_minutes = slot_minutes
+        self.tz_name = tz_name
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Tenant başına nesil sayacı: sorgu sürerken gelen invalidate, eski sonucun yazılmasını engeller.
+        # Kontrol + yazma ile sayaç artışı aynı kilitte; aksi halde kontrolden hemen sonra gelen invalidate kaçar
+        self._gen: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def range(self, session: Session, tenant_id: int, first_day: date, last_day: date,
+              not_before: datetime | None = None):
+        # (meşgul aralıklar, boş slotlar); eksik günler tek sorguyla DB'den doldurulur
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        entries = {d: self.cache.get((tenant_id, d)) for d in days}
+        missing = [d for d, v in entries.items() if v is None]
+        if missing:
+            entries.update(self._load(session, tenant_id, missing[0], missing[-1], missing))
+        busy, free = [], []
+        for d in days:
+            b, f = entries[d]
+            busy += b
+            free += f if not_before is None else [(s, e) for s, e in f if s >= not_before]
+        return busy, free
+
+    def _load(self, session: Session, tenant_id: int, first_day: date, last_day: date, wanted: list[date]):
+        gen = self._gen.get(tenant_id, 0)
+        busy = busy_from_db(session, tenant_id, *local_day_bounds(first_day, last_day, self.tz_name))
+        by_day: dict[date, list] = {d: [] for d in wanted}
+        for b in busy:
+            for d in self._days_of(*b):
+                if d in by_day:
+                    by_day[d].append(b)
+        out = {}
+        for d, b in by_day.items():
+            f = free_slots(d, d, self.work_start, self.work_end, self.slot_minutes, self.tz_name, b)
+            out[d] = (b, f)
+        with self._lock:
+            if self._gen.get(tenant_id, 0) == gen:
+                for d, v in out.items():
+                    self.cache.set((tenant_id, d), v)
+        return out
+
+    def _days_of(self, start: datetime, end: datetime) -> list[date]:
+        tzi = zone(self.tz_name)
+        d = as_utc(start).astimezone(tzi).date()
+        last = (as_utc(end) - timedelta(microseconds=1)).astimezone(tzi).date()
+        out = []
+        while d <= last:
+            out.append(d)
+            d += timedelta(days=1)
+        return out
+
+    def _bump(self, tenant_id: int):
+        with self._lock:
+            self._gen[tenant_id] = self._gen.get(tenant_id, 0) + 1
+
+    def invalidate(self, tenant_id: int, start: datetime, end: datetime):
+        self._bump(tenant_id)
+        for d in self._days_of(start, end):
+            self.cache.pop((tenant_id, d))
+
+    def invalidate_tenant(self, tenant_id: int) -> int:
+        self._bump(tenant_id)
+        return self.cache.discard_where(lambda k: k[0] == tenant_id)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+# Kimlik doğrulama sıcak yolu: doğrulanmış token → kullanıcı id, id → User, id / tenant_key → Tenant.
+# Önbelleğe konan kayıtlar session'dan ayrılmış (detached) kopyalardır; sadece okunmalı.
+# User / Tenant güncellenir ya da silinirse ORM olaylarıyla kayıt düşürülür (install_invalidation).
+class AuthCache:
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0):
+        self.enabled = ttl > 0
+        self.tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.users = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.tenants = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.tenant_keys = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def token_subject(self, token: str) -> int | None:
+        return self.tokens.get(token) if self.enabled else None
+
+    def put_token(self, token: str, uid: int, exp: int | None):
+        if not self.enabled:
+            return
+        # Süresi dolmuş token'ı önbellekten de asla kabul etme
+        ttl = None if exp is None else exp - time.time()
+        if ttl is None or ttl > 0:
+            self.tokens.set(token, uid, ttl)
+
+    def user(self, session: Session, uid: int) -> User | None:
+        u = self.users.get(uid) if self.enabled else None
+        if u is None:
+            u = session.get(User, uid)
+            if u is not None and self.enabled:
+                session.expunge(u)
+                self.users.set(uid, u)
+        return u
+
+    def tenant(self, session: Session, tenant_id: int) -> Tenant | None:
+        t = self.tenants.get(tenant_id) if self.enabled else None
+        if t is None:
+            t = session.get(Tenant, tenant_id)
+            if t is not None and self.enabled:
+                session.expunge(t)
+                self.tenants.set(tenant_id, t)
+        return t
+
+    def tenant_by_key(self, session: Session, tenant_key: str) -> Tenant | None:
+        tid = self.tenant_keys.get(tenant_key) if self.enabled else None
+        if tid is not None:
+            t = self.tenant(session, tid)
+            # tenant_key değişmiş / tenant silinmişse DB'ye düş
+            if t is not None and t.tenant_key == tenant_key:
+                return t
+        t = session.exec(select(Tenant).where(Tenant.tenant_key == tenant_key)).first()
+        if t is not None and self.enabled:
+            self.tenant_keys.set(tenant_key, t.id)
+            session.expunge(t)
+            self.tenants.set(t.id, t)
+        return t
+
+    def invalidate_user(self, uid: int):
+        self.users.pop(uid)
+
+    def invalidate_tenant(self, tenant_id: int):
+        # tenant_key → id eşlemesi, okunurken tenant'ın güncel anahtarıyla doğrulanır
+        self.tenants.pop(tenant_id)
+
+    def install_invalidation(self):
+        # Bu süreçte yapılan her User / Tenant değişikliği ilgili kaydı düşürür
+        def _user(mapper, connection, target):
+            self.invalidate_user(target.id)
+        def _tenant(mapper, connection, target):
+            self.invalidate_tenant(target.id)
+        for ev in ("after_update", "after_delete"):
+            event.listen(User, ev, _user)
+            event.listen(Tenant, ev, _tenant)
+
+    def stats(self) -> dict:
+        return {"tokens": self.tokens.stats(), "users": self.users.stats(), "tenants": self.tenants.stats(),
+                "tenant_keys": self.tenant_keys.stats()}
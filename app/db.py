@@ -1,25 +1,218 @@
 # app/db.py
-import os
+import os, logging, threading
+from typing import Callable, TypeVar
+from sqlalchemy import Engine, event, inspect
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import SQLModel, create_engine, Session
-from .settings import load_settings
+from .settings import get_settings
+from .metrics import instrument_engine
+from .models import APPOINTMENT_OVERLAP, REMINDER_PENDING
 
-_settings = load_settings()
+_settings = get_settings()
 
-# Render için güvenli SQLite yolu
-if _settings.database_url.startswith("sqlite:////"):
-    db_path = _settings.database_url.replace("sqlite:////", "/opt/render/project/src/")
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+def _ensure_sqlite_dir(url: str):
+    # Render için güvenli SQLite yolu
+    if url.startswith("sqlite:////"):
+        db_path = url.replace("sqlite:////", "/opt/render/project/src/")
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-engine = create_engine(_settings.database_url, echo=False, future=True)
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url)
 
+def _engine_options(s) -> dict:
+    opts = {"echo": False, "future": True, "pool_pre_ping": True}
+    # Bellek içi SQLite tek bağlantılı havuz kullanır; havuz ayarları ona uygulanmaz
+    if not _is_memory_sqlite(s.database_url):
+        opts.update(pool_size=s.db_pool_size, max_overflow=s.db_max_overflow,
+                    pool_recycle=s.db_pool_recycle, pool_timeout=s.db_pool_timeout)
+    return opts
 
-def init_db():
-    if _settings.database_url.startswith("sqlite"):
-        with engine.connect() as conn:
-            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+log = logging.getLogger(__name__)
 
+# PRAGMA'lar bağlantı başına geçerli; havuzun açtığı her yeni bağlantıya uygulanır
+def _sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    if not _is_memory_sqlite(_settings.database_url):
+        # WAL: okuyucular yazarı beklemez; NORMAL WAL'da güvenli ve fsync sayısını düşürür
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={int(_settings.sqlite_busy_timeout)}")
+    cur.execute("PRAGMA foreign_keys=ON")
+    cur.close()
+    # Sürücünün DML öncesi açtığı örtük transaction BEGIN IMMEDIATE olsun: yazma kilidi baştan
+    # alınır, eşzamanlı yazarlar busy_timeout kadar sırayla bekler. (DEFERRED'da okuma
+    # snapshot'ı eskiyen yazar beklemeden "database is locked" alır.) Okumalar kilit almaz.
+    dbapi_conn.isolation_level = "IMMEDIATE"
+
+# Engine import anında değil ilk kullanımda kurulur (dizin oluşturma, havuz, olay dinleyicileri)
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _ensure_sqlite_dir(_settings.database_url)
+                engine = create_engine(_settings.database_url, **_engine_options(_settings))
+                if _settings.metrics_enabled:
+                    instrument_engine(engine)
+                if engine.dialect.name == "sqlite":
+                    event.listen(engine, "connect", _sqlite_pragmas)
+                _engine = engine
+    return _engine
+
+def __getattr__(name: str):
+    # `from app.db import engine` eskisi gibi çalışsın (PEP 562)
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def init_db(engine: Engine | None = None):
+    # engine verilmezse uygulamanın engine'i (testler / bench kendi engine'ini verebilir)
     from . import models
+    engine = engine or get_engine()
     SQLModel.metadata.create_all(engine)
+    migrate(engine)
+
+def migrate(engine: Engine | None = None):
+    # create_all sadece eksik tabloları kurar; mevcut tablolara sonradan eklenen
+    # kolon ve indeksleri burada tamamlıyoruz (SQLite ve Postgres için idempotent).
+    engine = engine or get_engine()
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                # Yeni kolonlar NULL kabul etmeli ya da sabit varsayılan taşımalı
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col.type.compile(engine.dialect)}'
+                conn.exec_driver_sql(ddl)
+                log.info("migrate: %s.%s eklendi", table.name, col.name)
+        if "ux_reminder_pending_appointment_kind" not in {i["name"] for i in insp.get_indexes("reminder")}:
+            # Tekil indeksten önce eski yarışların bıraktığı tekrar eden bekleyenler temizlenir (en eskisi kalır)
+            conn.exec_driver_sql(
+                f"DELETE FROM reminder WHERE {REMINDER_PENDING} AND id NOT IN "
+                f"(SELECT MIN(id) FROM reminder WHERE {REMINDER_PENDING} GROUP BY appointment_id, kind)")
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except SQLAlchemyError as e:
+                # Örn. tekil indeks için mevcut tekrar eden kayıtlar; uygulamayı düşürme
+                log.warning("migrate: %s oluşturulamadı: %s", index.name, e)
+    _install_overlap_guard(engine)
+
+# Aynı tenant'ta zaman aralığı kesişen iki 'confirmed' randevuyu veritabanı reddeder.
+# SQLite: trigger; yazarlar BEGIN IMMEDIATE ile sıralandığı için kontrol + INSERT yarışmaz.
+#   Alt sorgu bitiş indeksiyle sadece yeni randevudan sonra biten kayıtları tarar.
+# Postgres: btree_gist exclusion constraint (eşzamanlı transaction'larda da geçerli).
+def _sqlite_overlap_trigger(name: str, when: str, extra: str = "") -> str:
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS {name} {when} ON appointment WHEN NEW.status = 'confirmed'
+    BEGIN
+        SELECT RAISE(ABORT, '{APPOINTMENT_OVERLAP}') WHERE EXISTS (
+            SELECT 1 FROM appointment INDEXED BY ix_appointment_tenant_status_end
+            WHERE tenant_id = NEW.tenant_id AND status = 'confirmed'
+              AND "end" > NEW."start" AND "start" < NEW."end" {extra});
+    END"""
+
+def _install_overlap_guard(engine: Engine):
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql(_sqlite_overlap_trigger(f"{APPOINTMENT_OVERLAP}_insert", "BEFORE INSERT"))
+                conn.exec_driver_sql(_sqlite_overlap_trigger(
+                    f"{APPOINTMENT_OVERLAP}_update", 'BEFORE UPDATE OF "start", "end", status, tenant_id',
+                    "AND id != NEW.id"))
+            elif engine.dialect.name == "postgresql":
+                name = f"ex_{APPOINTMENT_OVERLAP}"
+                if not conn.exec_driver_sql("SELECT 1 FROM pg_constraint WHERE conname = %s", (name,)).first():
+                    conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS btree_gist")
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE appointment ADD CONSTRAINT {name} EXCLUDE USING gist "
+                        f"(tenant_id WITH =, tsrange(\"start\", \"end\") WITH &&) WHERE (status = 'confirmed')")
+    except SQLAlchemyError as e:
+        # Örn. mevcut çakışan kayıtlar ya da eklenti yetkisi yok; uygulama indeks kontrolüyle devam eder
+        log.warning("migrate: çakışma guard'ı kurulamadı: %s", e)
+
+# ----------------- Async yol (DB_ASYNC=1) -----------------
+# Aynı veritabanına async sürücüyle (aiosqlite / asyncpg) bağlanan ikinci engine.
+# Scheduler, inbound worker'ları ve sync endpoint'ler senkron engine'i kullanmaya devam eder.
+def async_url(url: str) -> str:
+    scheme, _, rest = url.partition("://")
+    base = scheme.split("+")[0]
+    if base == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if base in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    raise ValueError(f"DB_ASYNC bu veritabanı için desteklenmiyor: {scheme}")
+
+_async_engine = None
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        if _is_memory_sqlite(_settings.database_url):
+            # Bellek içi SQLite'ta ikinci engine ayrı (boş) bir veritabanı olurdu
+            raise ValueError("DB_ASYNC bellek içi SQLite ile kullanılamaz")
+        from sqlalchemy.ext.asyncio import create_async_engine
+        _async_engine = create_async_engine(async_url(_settings.database_url), **_engine_options(_settings))
+        if _async_engine.dialect.name == "sqlite":
+            event.listen(_async_engine.sync_engine, "connect", _sqlite_pragmas)
+        if _settings.metrics_enabled:
+            instrument_engine(_async_engine.sync_engine)
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+T = TypeVar("T")
+
+# Async handler'ların DB erişimi. ORM kodu (ensure_client, store_messages, önbellekler...)
+# tek yerde senkron yazılır; `await db.run(fn, ...)` onu event loop'u bloklamadan çalıştırır:
+#   DB_ASYNC=1 → AsyncSession.run_sync (async sürücü, greenlet)
+#   DB_ASYNC=0 → senkron Session, thread havuzunda
+# fn içinden dönen değerler düz veri (id, str, tuple) olmalı; commit sonrası expire edilmiş
+# ORM nesnelerine async modda run dışında erişilemez.
+class SyncDB:
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        from starlette.concurrency import run_in_threadpool
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+class AsyncDB:
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+DB = SyncDB | AsyncDB
+
+async def get_db():
+    # FastAPI bağımlılığı (async endpoint'ler için)
+    if _settings.db_async:
+        # sqlmodel'in AsyncSession'ı: run_sync içindeki session da `exec` destekler
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        async with AsyncSession(get_async_engine()) as session:
+            yield AsyncDB(session)
+    else:
+        with Session(get_engine()) as session:
+            yield SyncDB(session)
+
+def new_session() -> Session:
+    # Arka plan işleri için: `with new_session() as session:` ile kapatılır
+    return Session(get_engine())
 
 def get_session():
-    return Session(engine)
+    # FastAPI bağımlılığı: istek bitince session kapanır, bağlantı havuza hemen döner
+    with Session(get_engine()) as session:
+        yield session
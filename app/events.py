@@ -0,0 +1,130 @@
+import asyncio, json, threading, uuid
+from collections import deque
+from itertools import count
+
+# Tenant başına süreç içi değişiklik akışı (Server-Sent Events). Yayın senkron koddan (thread
+# havuzu, inbound worker'ları, zamanlayıcı) yapılır; aboneler event loop'ta bekler. Her olay bir
+# kez SSE çerçevesine çevrilir, tüm abonelere aynı bytes gider.
+#
+# Olay kimliği "<epoch>-<seq>": epoch süreç başına rastgele, seq artan. Yeniden bağlanan istemci
+# Last-Event-ID gönderir; kaçırdığı olaylar tenant geçmişinde (son `history` olay) duruyorsa
+# tekrar oynatılır, yoksa (süreç yeniden başladı / başka worker / geçmiş taştı) tek bir
+# "refresh" olayı gider ve istemci listeyi baştan çeker.
+
+REFRESH = "refresh"
+
+def _frame(event_id: str | None, data: dict) -> bytes:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n".encode()
+
+def _deliver(subs: list["Subscriber"], frame: bytes):
+    for sub in subs:
+        sub.put(frame)
+
+class Subscriber:
+    # Tek bağlantının tamponu; dolarsa (yavaş istemci) tampon boşaltılıp refresh istenir
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.frames: deque[bytes] = deque()
+        self.overflow = False
+        self.wakeup = asyncio.Event()
+
+    def put(self, frame: bytes):
+        # Sadece abonenin event loop'unda çağrılır
+        if len(self.frames) >= self.maxsize:
+            self.frames.clear()
+            self.overflow = True
+        else:
+            self.frames.append(frame)
+        self.wakeup.set()
+
+    def drain(self) -> list[bytes]:
+        self.wakeup.clear()
+        if self.overflow:
+            self.overflow = False
+            self.frames.clear()
+            return [_frame(None, {"type": REFRESH})]
+        out = list(self.frames)
+        self.frames.clear()
+        return out
+
+class ChangeFeed:
+    def __init__(self, history: int = 500, queue_size: int = 256):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.history = history
+        self.queue_size = queue_size
+        self._seq = count(1)
+        self._lock = threading.Lock()
+        self._events: dict[int, deque[tuple[int, bytes]]] = {}
+        self._evicted: dict[int, int] = {}  # tenant → geçmişten düşen son seq
+        self._subs: dict[int, set[Subscriber]] = {}
+        self.published = 0
+
+    def publish(self, tenant_id: int, event_type: str, **data) -> str:
+        with self._lock:
+            seq = next(self._seq)
+            event_id = f"{self.epoch}-{seq}"
+            frame = _frame(event_id, {"type": event_type, **data})
+            events = self._events.setdefault(tenant_id, deque())
+            if len(events) >= self.history:
+                self._evicted[tenant_id] = events.popleft()[0]
+            events.append((seq, frame))
+            by_loop: dict[asyncio.AbstractEventLoop, list[Subscriber]] = {}
+            for sub in self._subs.get(tenant_id, ()):
+                by_loop.setdefault(sub.loop, []).append(sub)
+            self.published += 1
+        # Event loop başına tek uyandırma (abone başına call_soon_threadsafe yüzlerce panelde pahalı)
+        for loop, subs in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subs, frame)
+            except RuntimeError:
+                pass  # loop kapanmış (kapanış sırasında)
+        return event_id
+
+    def subscribe(self, tenant_id: int, last_event_id: str | None) -> tuple[Subscriber, list[bytes]]:
+        # Kayıt ve geçmiş okuması aynı kilit altında: arada yayınlanan olay ne kaybolur ne iki kez gelir
+        sub = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subs.setdefault(tenant_id, set()).add(sub)
+            replay = self._replay(tenant_id, last_event_id) if last_event_id else []
+        return sub, replay
+
+    def _replay(self, tenant_id: int, last_event_id: str) -> list[bytes]:
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) < self._evicted.get(tenant_id, 0):
+            return [_frame(None, {"type": REFRESH})]
+        last = int(seq)
+        return [frame for s, frame in self._events.get(tenant_id, ()) if s > last]
+
+    def unsubscribe(self, tenant_id: int, sub: Subscriber):
+        with self._lock:
+            subs = self._subs.get(tenant_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[tenant_id]
+
+    async def stream(self, tenant_id: int, last_event_id: str | None, keepalive: float = 20.0, retry_ms: int = 3000):
+        # StreamingResponse gövdesi; istemci koptuğunda Starlette üreteci iptal eder
+        sub, replay = self.subscribe(tenant_id, last_event_id)
+        try:
+            yield f"retry: {retry_ms}\n\n".encode()
+            for frame in replay:
+                yield frame
+            while True:
+                try:
+                    await asyncio.wait_for(sub.wakeup.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"  # proxy'ler boştaki bağlantıyı kapatmasın
+                    continue
+                frames = sub.drain()
+                if frames:
+                    yield b"".join(frames)
+        finally:
+            self.unsubscribe(tenant_id, sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subscribers": sum(len(s) for s in self._subs.values()), "tenants": len(self._subs),
+                    "published": self.published, "buffered": sum(len(e) for e in self._events.values())}
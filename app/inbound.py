@@ -0,0 +1,185 @@
+import json, logging, queue, threading
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import or_, and_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from .models import InboundMessage, Tenant
+
+log = logging.getLogger(__name__)
+
+def extract_messages(body: dict) -> list[dict]:
+    # Meta payload'undaki tüm entry / change / message öğeleri (sadece [0][0][0] değil)
+    out = []
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            for m in value.get("messages") or []:
+                if not m.get("id") or not m.get("from"):
+                    continue
+                out.append({
+                    "message_id": m["id"],
+                    "from_phone": m["from"],
+                    "text": (m.get("text") or {}).get("body", ""),
+                    "payload": json.dumps(m, ensure_ascii=False),
+                })
+    return out
+
+def store_messages(session: Session, tenant_id: int, messages: list[dict]) -> list[InboundMessage]:
+    # Yeni mesajları kaydeder, daha önce görülen message_id'leri atlar; kaydedilenleri döner
+    if not messages:
+        return []
+    ids = [m["message_id"] for m in messages]
+    seen = set(session.exec(select(InboundMessage.message_id).where(InboundMessage.message_id.in_(ids))).all())
+    rows, batch_ids = [], set()
+    for m in messages:
+        if m["message_id"] in seen or m["message_id"] in batch_ids:
+            continue
+        batch_ids.add(m["message_id"])
+        rows.append(InboundMessage(tenant_id=tenant_id, **m))
+    if not rows:
+        return []
+    session.add_all(rows)
+    try:
+        session.commit()
+    except IntegrityError:
+        # Aynı teslimat eşzamanlı başka istekte kaydedildi; tek tek dene
+        session.rollback()
+        saved = []
+        for r in rows:
+            session.add(InboundMessage(tenant_id=tenant_id, message_id=r.message_id, from_phone=r.from_phone,
+                                       text=r.text, payload=r.payload))
+            try:
+                session.commit()
+                saved.append(r.message_id)
+            except IntegrityError:
+                session.rollback()
+        return session.exec(select(InboundMessage).where(InboundMessage.message_id.in_(saved))).all() if saved else []
+    for r in rows:
+        session.refresh(r)
+    return rows
+
+def _stale_claim(stale: datetime):
+    # Sahiplenme süresi aşılmış 'processing' (mesajın yaşı değil; bkz. ReminderDispatcher._claim).
+    # claimed_at'i olmayan eski satırlar takılı sayılır
+    return and_(InboundMessage.status == 'processing',
+                or_(InboundMessage.claimed_at.is_(None), InboundMessage.claimed_at < stale))
+
+# Kaydedilmiş mesajları arka planda işleyen worker havuzu.
+# Gönderen telefon hash'iyle tek bir worker'a düşer; aynı kişinin mesajları sırayla işlenir.
+# Hata alan mesaj kuyruğun sonuna değil, aynı worker'da gecikmeyle yerinde yeniden denenir:
+# gönderenin sonraki mesajı (örn. randevudan hemen sonra 'iptal') bu mesaj bitmeden işlenmez.
+# Satır koşullu UPDATE ile 'processing' yapılarak sahiplenilir, böylece kurtarma (recover)
+# ile canlı akış aynı mesajı iki kez işlemez.
+class InboundPipeline:
+    def __init__(self, session_factory: Callable[[], Session],
+                 handler: Callable[[Session, Tenant, InboundMessage], None],
+                 workers: int = 4, max_attempts: int = 3, stale_seconds: int = 300, retry_seconds: float = 1.0):
+        self.session_factory = session_factory
+        self.handler = handler
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        self.retry_seconds = retry_seconds
+        self._stopping = threading.Event()
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.processed = self.failed = 0
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(target=self._run, args=(q,), name=f"wa-inbound-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        # Yeniden deneme beklemesi kesilir; mesaj 'pending' kalır, sonraki açılışta recover alır
+        self._stopping.set()
+        for q in self._queues:
+            q.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, msg_id: int, from_phone: str):
+        self._queues[hash(from_phone) % len(self._queues)].put(msg_id)
+
+    def join(self):
+        for q in self._queues:
+            q.join()
+
+    def recover(self) -> int:
+        # Açılışta: bekleyen ve takılı kalmış (çöken süreç) mesajları yeniden kuyruğa al
+        stale = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        with self.session_factory() as session:
+            rows = session.exec(
+                select(InboundMessage.id, InboundMessage.from_phone)
+                .where(InboundMessage.attempts < self.max_attempts)
+                .where(or_(InboundMessage.status == 'pending',
+                           _stale_claim(stale)))
+                .order_by(InboundMessage.id)
+            ).all()
+        for msg_id, phone in rows:
+            self.submit(msg_id, phone)
+        return len(rows)
+
+    def _run(self, q: queue.Queue):
+        while True:
+            msg_id = q.get()
+            try:
+                if msg_id is None:
+                    return
+                self._process(msg_id)
+            except Exception:
+                log.exception("inbound mesaj işlenemedi (id=%s)", msg_id)
+            finally:
+                q.task_done()
+
+    def _process(self, msg_id: int):
+        # Hata → deneme hakkı bitene kadar attempts * retry_seconds bekleyip yerinde tekrar
+        while (delay := self._attempt(msg_id)) is not None:
+            if self._stopping.wait(delay):
+                return
+
+    def _attempt(self, msg_id: int) -> float | None:
+        # Bir deneme; mesaj yeniden denenecekse (pending) bekleme süresini döner
+        stale = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        with self.session_factory() as session:
+            claimed = session.exec(
+                update(InboundMessage).where(InboundMessage.id == msg_id)
+                .where(or_(InboundMessage.status == 'pending',
+                           _stale_claim(stale)))
+                .values(status='processing', claimed_at=datetime.utcnow(), attempts=InboundMessage.attempts + 1)
+            ).rowcount
+            session.commit()
+            if not claimed:
+                return None
+            msg = session.get(InboundMessage, msg_id)
+            tenant = session.get(Tenant, msg.tenant_id)
+            try:
+                if tenant:
+                    self.handler(session, tenant, msg)
+                msg.status, msg.error = 'done', None
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                session.rollback()
+                msg = session.get(InboundMessage, msg_id)
+                msg.error = (str(e) or e.__class__.__name__)[:500]
+                msg.status = 'pending' if msg.attempts < self.max_attempts else 'failed'
+                with self._lock:
+                    self.failed += 1
+                log.warning("inbound mesaj hatası (id=%s): %s", msg_id, e)
+            msg.processed_at = datetime.utcnow()
+            session.add(msg)
+            session.commit()
+            return self.retry_seconds * msg.attempts if msg.status == 'pending' else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"queued": sum(q.qsize() for q in self._queues), "processed": self.processed,
+                    "failed": self.failed, "workers": len(self._queues)}
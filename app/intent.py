@@ -0,0 +1,93 @@
+import re, unicodedata
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# WhatsApp mesajlarını anlama: niyet (intent), zaman penceresi ve net tarih/saat.
+# Tüm anahtar kelimeler tek bir derlenmiş regex'te; metin bir kez taranır.
+# Türkçe büyük/küçük harf (I→ı, İ→i) ve aksansız yazım (yarin, bugun, iptal) desteklenir.
+
+def fold(text: str) -> str:
+    # Türkçe küçük harf + aksansız ASCII; eşleştirme bu biçim üzerinde yapılır.
+    # lower() 'İ'yi 'i̇' yapar, NFKD + ascii birleşik noktayı ve diğer aksanları atar;
+    # ayrışmayan tek harf 'ı' elle çevrilir. (str.translate'ten ~3 kat hızlı)
+    return unicodedata.normalize("NFKD", text.lower().replace("ı", "i")).encode("ascii", "ignore").decode()
+
+# Öncelik sırası: cancel > book > availability ("randevumu iptal et" iptaldir)
+INTENT_PRIORITY = ("cancel", "book", "availability")
+
+_KEYWORDS = {
+    "cancel": [r"iptal\w*", r"cancel\w*", r"vazgec\w*"],
+    "book": [r"randevu\w*", r"rezerv\w*", r"al", r"almak", r"alabilir\w*", r"ayarla\w*"],
+    "availability": [r"uygun\w*", r"musait\w*", r"bos", r"saat\w*"],
+    # pencere kelimeleri (aynı zamanda availability niyeti)
+    "today": [r"bugun\w*"],
+    "tomorrow": [r"yarin\w*"],
+    "week": [r"hafta\w*"],
+}
+
+# Tek \b önekli alternasyon: kelime başı olmayan konumlar hemen elenir
+_MATCHER = re.compile(
+    r"\b(?:" + "|".join(rf"(?P<{name}>(?:{'|'.join(words)})\b)" for name, words in _KEYWORDS.items()) + ")"
+)
+
+# Desteklenen net tarih/saat biçimleri (tüm mesaj; başında/sonunda boşluk serbest):
+#   2025-01-31 14:30 | 2025-01-31T14:30 | 31.01.2025 14:30 | 31/01/2025 14:30 | 31.01 14:30
+#   bugün 14:30 | yarın 14:30 | 14:30   (saat ayırıcı ':' veya '.')
+_WHEN = re.compile(
+    r"\s*(?:"
+    r"(?P<y1>\d{4})-(?P<m1>\d{1,2})-(?P<d1>\d{1,2})[ t]"
+    r"|(?P<d2>\d{1,2})[./](?P<m2>\d{1,2})(?:[./](?P<y2>\d{4}))?\s+"
+    r"|(?P<rel>bugun|yarin)\s+"
+    r")?"
+    r"(?:saat\s+)?(?P<H>\d{1,2})[:.](?P<M>\d{2})\s*"
+)
+
+@dataclass
+class ParsedMessage:
+    intent: str  # book | cancel | availability | help
+    window: str  # today | tomorrow | week
+    when: datetime | None = None  # UTC; mesaj net bir tarih/saat ise
+
+def classify(text: str) -> tuple[str, str]:
+    return _classify(fold(text))
+
+def _classify(folded: str) -> tuple[str, str]:
+    found = {m.lastgroup for m in _MATCHER.finditer(folded)}
+    window = "week" if "week" in found else "tomorrow" if "tomorrow" in found else "today"
+    for intent in INTENT_PRIORITY:
+        if intent in found:
+            return intent, window
+    if found & {"today", "tomorrow", "week"}:
+        return "availability", window
+    return "help", window
+
+def parse_when(text: str, tz_name: str, today: date | None = None) -> datetime | None:
+    # Net tarih/saat değilse None (istisna fırlatmaz); yerel saat → UTC
+    return _parse_when(fold(text), tz_name, today)
+
+def _parse_when(folded: str, tz_name: str, today: date | None) -> datetime | None:
+    m = _WHEN.fullmatch(folded)
+    if not m:
+        return None
+    tzi = ZoneInfo(tz_name)
+    if today is None:
+        today = datetime.now(tzi).date()
+    g = m.groupdict()
+    try:
+        if g["y1"]:
+            d = date(int(g["y1"]), int(g["m1"]), int(g["d1"]))
+        elif g["d2"]:
+            d = date(int(g["y2"] or today.year), int(g["m2"]), int(g["d2"]))
+        else:
+            d = today + timedelta(days=1) if g["rel"] == "yarin" else today
+        t = dtime(int(g["H"]), int(g["M"]))
+    except ValueError:
+        # 31.02 ya da 25:00 gibi geçersiz değerler
+        return None
+    return datetime.combine(d, t, tzi).astimezone(timezone.utc)
+
+def parse_message(text: str, tz_name: str, today: date | None = None) -> ParsedMessage:
+    folded = fold(text)
+    intent, window = _classify(folded)
+    return ParsedMessage(intent=intent, window=window, when=_parse_when(folded, tz_name, today))
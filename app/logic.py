@@ -1,14 +1,27 @@
-from datetime import datetime, timedelta, time as dtime, timezone
-from dateutil import tz
+import base64
+from datetime import date, datetime, timedelta, time as dtime, timezone
+from functools import lru_cache
 from typing import List, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 from .models import Appointment, Client
 
+def as_utc(dt: datetime) -> datetime:
+    # SQLite tz bilgisini saklamaz; DB'den gelen naive değerler UTC kabul edilir
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+@lru_cache(maxsize=64)
+def zone(tz_name: str) -> ZoneInfo:
+    # Standart kütüphane zoneinfo; dateutil.tz açılışta yüklenmez
+    return ZoneInfo(tz_name)
+
 def overlaps(a_start, a_end, b_start, b_end)->bool:
     return max(a_start,b_start) < min(a_end,b_end)
 
 def working_slots(day: datetime, work_start: dtime, work_end: dtime, slot_minutes: int, tz_name: str):
-    tzi = tz.gettz(tz_name)
+    tzi = zone(tz_name)
     local = day.astimezone(tzi).replace(hour=work_start.hour, minute=work_start.minute, second=0, microsecond=0)
     end_local = day.astimezone(tzi).replace(hour=work_end.hour, minute=work_end.minute, second=0, microsecond=0)
     slots=[]
@@ -19,13 +32,101 @@ def working_slots(day: datetime, work_start: dtime, work_end: dtime, slot_minute
         cur = nxt
     return slots
 
+def merge_intervals(intervals):
+    # Sıralı, çakışmayan (ve bitişik olanları birleşmiş) aralık listesi
+    merged = []
+    for s, e in sorted(intervals):
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1][1] = e
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged]
+
+def free_slots(first_day: date, last_day: date, work_start: dtime, work_end: dtime, slot_minutes: int, tz_name: str,
+               busy, not_before: datetime | None = None):
+    # [first_day, last_day] (yerel tarih, dahil) aralığındaki boş slotlar, UTC.
+    # Slotlar ve birleştirilmiş meşgul aralıklar ikisi de sıralı olduğundan tek geçişte
+    # (O(slot + busy)) süzülür; her slot için tüm meşgul listesi taranmaz.
+    tzi = zone(tz_name)
+    step = timedelta(minutes=slot_minutes)
+    busy = merge_intervals((as_utc(b1), as_utc(b2)) for b1, b2 in busy)
+    j, nb = 0, len(busy)
+    out = []
+    day = first_day
+    while day <= last_day:
+        cur = datetime.combine(day, work_start, tzi).astimezone(timezone.utc)
+        day_end = datetime.combine(day, work_end, tzi).astimezone(timezone.utc)
+        while cur + step <= day_end:
+            nxt = cur + step
+            # Bu slottan önce biten meşgul aralıkları bir daha bakmamak üzere geç
+            while j < nb and busy[j][1] <= cur:
+                j += 1
+            if (j >= nb or busy[j][0] >= nxt) and (not_before is None or cur >= not_before):
+                out.append((cur, nxt))
+            cur = nxt
+        day += timedelta(days=1)
+    return out
+
+def local_day_bounds(first_day: date, last_day: date, tz_name: str):
+    # Yerel tarih aralığının UTC başlangıç/bitişi (bitiş hariç)
+    tzi = zone(tz_name)
+    start = datetime.combine(first_day, dtime(0, 0), tzi).astimezone(timezone.utc)
+    end = datetime.combine(last_day + timedelta(days=1), dtime(0, 0), tzi).astimezone(timezone.utc)
+    return start, end
+
 def busy_from_db(session: Session, tenant_id: int, start: datetime, end: datetime):
+    from .series import occurrences  # series → logic (as_utc); döngüsel import
     appts = session.exec(select(Appointment).where(Appointment.tenant_id==tenant_id).where(Appointment.start<end).where(Appointment.end>start).where(Appointment.status=='confirmed')).all()
-    return [(a.start,a.end) for a in appts]
+    # Tekrarlayan serilerin bu penceredeki (satıra dönüşmemiş) oturumları da dolu sayılır
+    return [(as_utc(a.start),as_utc(a.end)) for a in appts] + [(o.start, o.end) for o in occurrences(session, tenant_id, start, end)]
+
+def encode_cursor(start: datetime, appt_id: int) -> str:
+    raw = f"{as_utc(start).isoformat()}|{appt_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    # Geçersiz imlecte ValueError
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start, appt_id = raw.split("|")
+        return as_utc(datetime.fromisoformat(start)), int(appt_id)
+    except Exception as e:
+        raise ValueError("geçersiz imleç") from e
+
+def appointments_page_query(tenant_id: int, start_from: datetime, start_to: datetime | None = None,
+                            status: str | None = None, after: tuple[datetime, int] | None = None, limit: int = 20):
+    # Tek join'li sorgu, sadece gereken kolonlar; (start, id) üzerinden keyset sayfalama
+    q = (
+        select(Appointment.id, Appointment.start, Appointment.end, Appointment.status, Appointment.source,
+               Appointment.series_id, Client.phone)
+        .join(Client, Client.id == Appointment.client_id, isouter=True)
+        .where(Appointment.tenant_id == tenant_id, Appointment.start >= start_from)
+    )
+    if start_to is not None:
+        q = q.where(Appointment.start < start_to)
+    if status:
+        q = q.where(Appointment.status == status)
+    if after is not None:
+        a_start, a_id = after
+        q = q.where(or_(Appointment.start > a_start, and_(Appointment.start == a_start, Appointment.id > a_id)))
+    return q.order_by(Appointment.start, Appointment.id).limit(limit)
+
+def list_appointments(session: Session, tenant_id: int, start_from: datetime, start_to: datetime | None = None,
+                      status: str | None = None, after: tuple[datetime, int] | None = None, limit: int = 20):
+    return session.exec(appointments_page_query(tenant_id, start_from, start_to, status, after, limit)).all()
 
 def ensure_client(session: Session, tenant_id: int, phone: str, name: str|None=None)->Client:
-    c = session.exec(select(Client).where(Client.tenant_id==tenant_id).where(Client.phone==phone)).first()
+    q = select(Client).where(Client.tenant_id==tenant_id).where(Client.phone==phone)
+    c = session.exec(q).first()
     if c: return c
     c = Client(tenant_id=tenant_id, phone=phone, name=name or None)
-    session.add(c); session.commit(); session.refresh(c)
+    session.add(c)
+    try:
+        session.commit()
+    except IntegrityError:
+        # Aynı anda başka istek ekledi (ux_client_tenant_phone)
+        session.rollback()
+        return session.exec(q).one()
+    session.refresh(c)
     return c
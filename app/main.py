@@ -1,42 +1,76 @@
 import os, secrets
-from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
 from fastapi import FastAPI, Request, Depends, HTTPException, Header, Query
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from jose import jwt, JWTError
 from sqlmodel import Session, select
 
-from .db import init_db, get_session
-from .models import Tenant, User, Client, Appointment
-from .settings import load_settings
-from .auth import hash_password, verify_password, create_access_token
-from .logic import working_slots, busy_from_db, ensure_client
-from .whatsapp import send_whatsapp_text
-from .scheduler import start_scheduler, schedule_all
+from .db import init_db, get_session, get_db, new_session, dispose_async_engine, DB
+from .models import Tenant, User, Client, Appointment, AppointmentSeries, InboundMessage
+from .settings import get_settings
+from .auth import hash_password_async, verify_password_async, needs_rehash, configure_hashing, create_access_token
+from .intent import parse_message
+from .logic import ensure_client, as_utc, list_appointments, encode_cursor, decode_cursor, zone
+from .cache import AvailabilityCache, AuthCache
+from .booking import BookingIndex, BookingConflict, book_appointment, book_series, is_overlap_error
+from . import bulk
+from .archive import archive_before, history_query
+from .events import ChangeFeed, REFRESH
+from .series import normalize_rrule, is_occurrence, upcoming_occurrences, next_occurrence, override, materialize
+from .inbound import InboundPipeline, extract_messages, store_messages
+from .whatsapp import Outbox, configure as configure_whatsapp
+from .scheduler import start_scheduler, schedule_all, schedule_appointment, schedule_appointments, ReminderDispatcher
+from .metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
 
 # ----------------- App & Settings -----------------
-# ----------------- App & Settings -----------------
-from fastapi.staticfiles import StaticFiles
-import os
-settings = load_settings()
-app = FastAPI(title="Psych Scheduler SaaS")
+settings = get_settings()
+
+# Import yan etkisizdir: thread'ler (outbox, inbound, zamanlayıcı), DB ve açılış işleri burada
+# başlar. RUN_SCHEDULER=0 olan worker'lar (yalnız web) zamanlayıcıyı ve açılıştaki tam
+# hatırlatma kurulumunu atlar; bunları tek bir süreç yürütür.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    outbox.start()
+    inbound.start()
+    # Önceki süreçten işlenmeden kalan webhook mesajları
+    inbound.recover()
+    scheduler = None
+    if settings.run_scheduler:
+        materialize_series()
+        # Hatırlatmaların tam kurulumu sadece açılışta; sonrası artımlı
+        with new_session() as session:
+            reschedule_all(session)
+        scheduler = start_scheduler(dispatcher, settings.reminder_poll_seconds,
+                                    materialize_series, settings.series_materialize_seconds,
+                                    archive_old if settings.archive_after_days > 0 else None,
+                                    settings.archive_interval_seconds)
+        scheduler.start()
+    try:
+        yield
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
+        inbound.stop()
+        outbox.stop()
+        dispatcher.shutdown()
+        await dispose_async_engine()
+
+app = FastAPI(title="Psych Scheduler SaaS", lifespan=lifespan)
 
 BASE_DIR = os.path.dirname(__file__)
 STATIC_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "static"))
 
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+# Route başına süre / SQL sayısı histogramları ve isteğe bağlı yavaş istek logu
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, slow_request_ms=settings.slow_request_ms)
 
-# ✅ DOĞRUSU: startup event’inde çağır
-from .db import init_db
-
-@app.on_event("startup")
-def on_startup():
-    # Modeller yüklü olsun (garanti)
-    from . import models  # Tenant, User, Client, Appointment
-    init_db()
 
 @app.get("/", response_class=HTMLResponse)
 def root():
@@ -60,24 +94,113 @@ def _schedule():
         return FileResponse(path)
     raise HTTPException(404, "schedule.html yok")
 
+MAX_AVAILABILITY_DAYS = 62
+MAX_PAGE_SIZE = 200
+
+# Tenant+gün başına meşgul aralık / boş slot önbelleği; randevu yazımlarında ilgili günler silinir
+availability_cache = AvailabilityCache(
+    settings.work_start, settings.work_end, settings.slot_minutes, settings.timezone,
+    maxsize=settings.availability_cache_size, ttl=settings.availability_cache_ttl,
+)
+
+# Tenant başına onaylı randevu aralık indeksi (çakışma ön kontrolü); asıl guard DB'de
+booking_index = BookingIndex(maxsize=settings.booking_index_size, ttl=settings.booking_index_ttl)
+
+# Panellere canlı değişiklik akışı (GET /api/events); yazım yolları commit sonrası yayınlar
+feed = ChangeFeed(history=settings.events_history, queue_size=settings.events_queue_size)
+
 def tznow() -> datetime:
     return datetime.now(timezone.utc)
 
+def publish_appointment(event: str, appt: Appointment, phone: str | None):
+    # Olay gövdesi /api/appointments/upcoming öğesiyle aynı; occurrence_start seri oturumunun
+    # açılımdaki karşılığını (id'siz satırı) bulmak için
+    feed.publish(appt.tenant_id, f"appointment.{event}", appointment={
+        "id": appt.id,
+        "series_id": appt.series_id,
+        "occurrence_start": as_utc(appt.occurrence_start).isoformat() if appt.occurrence_start else None,
+        "phone": phone or "-",
+        "start": as_utc(appt.start).isoformat(),
+        "end": as_utc(appt.end).isoformat(),
+        "status": appt.status,
+        "source": appt.source,
+    })
+
+def _client_phone(session: Session, client_id: int) -> str | None:
+    return session.exec(select(Client.phone).where(Client.id == client_id)).first()
+
 # ----------------- Scheduler -----------------
-scheduler = start_scheduler()
-scheduler.start()
+# Hatırlatmalar DB'de (Reminder) tutulur; her süreçteki dispatcher vadesi gelenleri
+# sahiplenerek gönderir, böylece N worker aynı mesajı N kez göndermez.
+dispatcher = ReminderDispatcher(
+    new_session,
+    {"access_token": settings.whatsapp_access_token, "phone_number_id": settings.whatsapp_phone_number_id},
+    batch_size=settings.reminder_batch_size,
+    workers=settings.reminder_workers,
+    claim_timeout=settings.reminder_claim_timeout,
+    max_attempts=settings.reminder_max_attempts,
+)
+def _materialize(session: Session, tenant_id: int | None = None) -> int:
+    # Hatırlatma ufkuna giren seri oturumlarını Appointment satırına çevirip hatırlatmalarını kur.
+    # Ufuk iki tur aralığı kadar geniş: 24s hatırlatması vadesinden önce kurulmuş olur.
+    horizon = tznow() + timedelta(minutes=max(settings.reminder_24h, settings.reminder_1h),
+                                  seconds=2 * settings.series_materialize_seconds)
+    created = materialize(session, horizon, tenant_id)
+    for appt in created:
+        booking_index.add(appt.tenant_id, appt.start, appt.end, appt.id)
+        reschedule_appointment(session, appt)
+    return len(created)
+
+def materialize_series() -> int:
+    with new_session() as session:
+        return _materialize(session)
+
+def archive_old(tenant_id: int | None = None) -> int:
+    # Bitişi ARCHIVE_AFTER_DAYS günden eski randevular arşiv tablosuna (0 = kapalı). Sadece
+    # geçmiş satırlar taşınır; önbellekler / çakışma indeksi gelecek aralıkları tuttuğu için etkilenmez
+    if settings.archive_after_days <= 0:
+        return 0
+    cutoff = tznow() - timedelta(days=settings.archive_after_days)
+    with new_session() as session:
+        return archive_before(session, cutoff, settings.archive_batch_size, tenant_id)
+
+# ----------------- WhatsApp outbound -----------------
+# Havuzlu HTTP oturumu + phone_number_id başına token bucket; handler'lar sadece kuyruğa atar
+configure_whatsapp(settings.whatsapp_api_base, settings.whatsapp_timeout, settings.whatsapp_rate_per_sec,
+                   pool_size=settings.whatsapp_send_workers + settings.reminder_workers)
+outbox = Outbox(workers=settings.whatsapp_send_workers, max_retries=settings.whatsapp_max_retries)
+
+def send_wa(to: str, text: str) -> bool:
+    return outbox.enqueue(settings.whatsapp_access_token, settings.whatsapp_phone_number_id, to, text)
+
+def reschedule_all(session: Session) -> int:
+    return schedule_all(
+        session,
+        settings.reminder_24h,
+        settings.reminder_1h,
+        settings.zoom_join_url,
+        settings.timezone,
+    )
 
-def reschedule_all(session: Session):
-    schedule_all(
+def reschedule_appointment(session: Session, appt: Appointment):
+    # Sadece değişen randevunun hatırlatmalarını ekle / güncelle / sil
+    schedule_appointment(
+        appt,
         session,
-        scheduler,
         settings.reminder_24h,
         settings.reminder_1h,
         settings.zoom_join_url,
-        {"access_token": settings.whatsapp_access_token, "phone_number_id": settings.whatsapp_phone_number_id},
+        settings.timezone,
     )
 
 # ----------------- Auth helper -----------------
+# Şifre hash'leme event loop dışında, sınırlı thread havuzunda
+configure_hashing(settings.password_hash_workers)
+
+# Doğrulanmış token ve User / Tenant kayıtları için süre sınırlı önbellek
+auth_cache = AuthCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl)
+auth_cache.install_invalidation()
+
 def current_user(
     authorization: str = Header(None),
     session: Session = Depends(get_session),
@@ -87,12 +210,15 @@ def current_user(
     scheme, _, token = authorization.partition(" ")
     if scheme.lower() != "bearer":
         raise HTTPException(401, "Bearer bekleniyor")
-    try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=["HS256"])
-        uid = int(payload["sub"])
-    except JWTError:
-        raise HTTPException(401, "Token geçersiz")
-    u = session.get(User, uid)
+    uid = auth_cache.token_subject(token)
+    if uid is None:
+        try:
+            payload = jwt.decode(token, settings.jwt_secret, algorithms=["HS256"])
+            uid = int(payload["sub"])
+        except (JWTError, KeyError, ValueError):
+            raise HTTPException(401, "Token geçersiz")
+        auth_cache.put_token(token, uid, payload.get("exp"))
+    u = auth_cache.user(session, uid)
     if not u:
         raise HTTPException(401, "Kullanıcı yok")
     return u
@@ -102,9 +228,63 @@ def current_user(
 def health():
     return {"ok": True}
 
+# ----------------- Metrics -----------------
+def _cache_metric(field: str):
+    def collect():
+        caches = {"availability": availability_cache.stats(), "booking_index": booking_index.stats(),
+                  **{f"auth_{k}": v for k, v in auth_cache.stats().items()}}
+        return [((name,), st[field]) for name, st in caches.items()]
+    return collect
+
+REGISTRY.callback("cache_hits_total", "Önbellek isabetleri", "counter", ("cache",), _cache_metric("hits"))
+REGISTRY.callback("cache_misses_total", "Önbellek ıskaları", "counter", ("cache",), _cache_metric("misses"))
+REGISTRY.callback("cache_entries", "Önbellekteki kayıt sayısı", "gauge", ("cache",), _cache_metric("size"))
+REGISTRY.callback("queue_depth", "Arka plan kuyruklarında bekleyen iş", "gauge", ("queue",),
+                  lambda: [(("whatsapp_outbox",), outbox.stats()["queued"]),
+                           (("whatsapp_inbound",), inbound.stats()["queued"])])
+REGISTRY.callback("whatsapp_outbox_messages_total", "Outbox gönderim sonuçları", "counter", ("result",),
+                  lambda: [((k,), v) for k, v in outbox.stats().items() if k in ("sent", "failed", "dropped")])
+REGISTRY.callback("whatsapp_inbound_messages_total", "İşlenen webhook mesajları", "counter", ("result",),
+                  lambda: [((k,), v) for k, v in inbound.stats().items() if k in ("processed", "failed")])
+REGISTRY.callback("sse_subscribers", "Açık değişiklik akışı bağlantıları", "gauge", (),
+                  lambda: [((), feed.stats()["subscribers"])])
+REGISTRY.callback("sse_events_total", "Yayınlanan değişiklik olayları", "counter", (),
+                  lambda: [((), feed.stats()["published"])])
+
+@app.get("/metrics")
+def metrics(authorization: str = Header(None)):
+    if not settings.metrics_enabled:
+        raise HTTPException(404, "Metrikler kapalı")
+    if settings.metrics_token and authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(401, "Metrik token'ı gerekli")
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # ----------------- Auth APIs -----------------
+# Async handler'lardaki DB işleri db.run(...) ile çalışır (bkz. app/db.py); bu fonksiyonlar
+# senkron Session alır ve düz veri döner.
+def _user_login_row(session: Session, email: str):
+    u = session.exec(select(User).where(User.email == email)).first()
+    if not u:
+        return None
+    row = u.id, u.password_hash, auth_cache.tenant(session, u.tenant_id).tenant_key
+    # Okuma transaction'ını kapat: hash doğrulanırken bağlantı havuzda beklesin
+    session.commit()
+    return row
+
+def _create_account(session: Session, name: str, email: str, password_hash: str):
+    tenant = Tenant(name=name, tenant_key=secrets.token_urlsafe(6))
+    session.add(tenant); session.commit(); session.refresh(tenant)
+    u = User(tenant_id=tenant.id, email=email, password_hash=password_hash, role="admin")
+    session.add(u); session.commit(); session.refresh(u)
+    return u.id, tenant.tenant_key
+
+def _update_password_hash(session: Session, user_id: int, password_hash: str):
+    u = session.get(User, user_id)
+    u.password_hash = password_hash
+    session.add(u); session.commit()
+
 @app.post("/api/auth/signup")
-async def signup(req: Request, session: Session = Depends(get_session)):
+async def signup(req: Request, db: DB = Depends(get_db)):
     data = await req.json()
     email = data["email"].strip().lower()
     password = data["password"]
@@ -114,117 +294,455 @@ async def signup(req: Request, session: Session = Depends(get_session)):
         raise HTTPException(400, "Şifre en az 6 karakter olmalı")
 
     # aynı e-posta varsa yeni kayıt açma; mevcut kullanıcıya token ver
-    existing = session.exec(select(User).where(User.email == email)).first()
+    existing = await db.run(_user_login_row, email)
     if existing:
-        token = create_access_token(str(existing.id), settings.jwt_secret, settings.jwt_expire_minutes)
-        tenant = session.get(Tenant, existing.tenant_id)
-        return {"access_token": token, "tenant_key": tenant.tenant_key}
+        user_id, _, tenant_key = existing
+        token = create_access_token(str(user_id), settings.jwt_secret, settings.jwt_expire_minutes)
+        return {"access_token": token, "tenant_key": tenant_key}
 
-    tenant = Tenant(name=name, tenant_key=secrets.token_urlsafe(6))
-    session.add(tenant); session.commit(); session.refresh(tenant)
-
-    u = User(tenant_id=tenant.id, email=email, password_hash=hash_password(password), role="admin")
-    session.add(u); session.commit(); session.refresh(u)
-
-    token = create_access_token(str(u.id), settings.jwt_secret, settings.jwt_expire_minutes)
-    reschedule_all(session)
-    return {"access_token": token, "tenant_key": tenant.tenant_key}
+    user_id, tenant_key = await db.run(_create_account, name, email, await hash_password_async(password))
+    token = create_access_token(str(user_id), settings.jwt_secret, settings.jwt_expire_minutes)
+    return {"access_token": token, "tenant_key": tenant_key}
 
 @app.post("/api/auth/login")
-async def login(req: Request, session: Session = Depends(get_session)):
+async def login(req: Request, db: DB = Depends(get_db)):
     data = await req.json()
     email = data["email"].strip().lower()
     password = data["password"]
 
-    u = session.exec(select(User).where(User.email == email)).first()
-    if not u or not verify_password(password, u.password_hash):
+    row = await db.run(_user_login_row, email)
+    if not row:
+        raise HTTPException(401, "Geçersiz bilgiler")
+    user_id, password_hash, tenant_key = row
+    if not await verify_password_async(password, password_hash):
         raise HTTPException(401, "Geçersiz bilgiler")
+    if needs_rehash(password_hash):
+        # Eski (bcrypt*) hash'leri başarılı girişte sessizce PBKDF2'ye taşı
+        await db.run(_update_password_hash, user_id, await hash_password_async(password))
 
-    token = create_access_token(str(u.id), settings.jwt_secret, settings.jwt_expire_minutes)
-    reschedule_all(session)
-    tenant = session.get(Tenant, u.tenant_id)
-    return {"access_token": token, "tenant_key": tenant.tenant_key}
+    token = create_access_token(str(user_id), settings.jwt_secret, settings.jwt_expire_minutes)
+    return {"access_token": token, "tenant_key": tenant_key}
 
 @app.get("/api/me")
 def me(u: User = Depends(current_user), session: Session = Depends(get_session)):
-    tenant = session.get(Tenant, u.tenant_id)
+    tenant = auth_cache.tenant(session, u.tenant_id)
     return {"email": u.email, "tenant": {"name": tenant.name, "tenant_key": tenant.tenant_key}}
 
 # ----------------- Appointments -----------------
+def _book_manual(session: Session, tenant_id: int, phone: str, start: datetime, end: datetime) -> int:
+    client = ensure_client(session, tenant_id, phone)
+    appt = book_appointment(session, booking_index, tenant_id, client.id, start, end, "manual")
+    availability_cache.invalidate(tenant_id, start, end)
+    reschedule_appointment(session, appt)
+    publish_appointment("created", appt, phone)
+    return appt.id
+
+def parse_local(value: str) -> datetime:
+    # ISO tarih-saat → UTC; saat dilimi yoksa klinik yerel saati kabul edilir
+    raw = datetime.fromisoformat(value)
+    if raw.tzinfo is None:
+        raw = raw.replace(tzinfo=ZoneInfo(settings.timezone))
+    return raw.astimezone(timezone.utc)
+
 @app.post("/api/appointments")
 async def create_appointment(
     req: Request,
     u: User = Depends(current_user),
-    session: Session = Depends(get_session),
+    db: DB = Depends(get_db),
 ):
     data = await req.json()
     phone = data["phone"].strip()
 
     local_tz = ZoneInfo(settings.timezone)  # örn: Europe/Istanbul
-    raw_start = datetime.fromisoformat(data["start"])
-    if raw_start.tzinfo is None:
-        start = raw_start.replace(tzinfo=local_tz).astimezone(timezone.utc)
-    else:
-        start = raw_start.astimezone(timezone.utc)
-
-    if data.get("end"):
-        raw_end = datetime.fromisoformat(data["end"])
-        if raw_end.tzinfo is None:
-            end = raw_end.replace(tzinfo=local_tz).astimezone(timezone.utc)
-        else:
-            end = raw_end.astimezone(timezone.utc)
-    else:
-        end = start + timedelta(minutes=settings.slot_minutes)
+    start = parse_local(data["start"])
+    end = parse_local(data["end"]) if data.get("end") else start + timedelta(minutes=settings.slot_minutes)
+    if end <= start:
+        raise HTTPException(400, "Bitiş başlangıçtan sonra olmalı")
 
-    client = ensure_client(session, u.tenant_id, phone)
-    appt = Appointment(
-        tenant_id=u.tenant_id, client_id=client.id,
-        start=start, end=end, status="confirmed", source="manual"
-    )
-    session.add(appt); session.commit(); session.refresh(appt)
-
-    # WhatsApp göndermede hata olsa bile uygulamayı düşürme
     try:
-        zoom_text = f"\nZoom: {settings.zoom_join_url}" if settings.zoom_join_url else ""
-        start_local_str = start.astimezone(local_tz).strftime("%d.%m.%Y %H:%M")
-        if settings.whatsapp_access_token and settings.whatsapp_phone_number_id:
-            send_whatsapp_text(
-                settings.whatsapp_access_token,
-                settings.whatsapp_phone_number_id,
-                phone,
-                f"Randevunuz onaylandı: {start_local_str}{zoom_text}",
-            )
-    except Exception:
-        pass
+        appt_id = await db.run(_book_manual, u.tenant_id, phone, start, end)
+    except BookingConflict:
+        raise HTTPException(409, "Seçilen saat dolu")
 
-    reschedule_all(session)
-    return {"id": appt.id}
+    # WhatsApp kuyruğa atılır; gönderim hatası isteği ne bekletir ne düşürür
+    zoom_text = f"\nZoom: {settings.zoom_join_url}" if settings.zoom_join_url else ""
+    start_local_str = start.astimezone(local_tz).strftime("%d.%m.%Y %H:%M")
+    send_wa(phone, f"Randevunuz onaylandı: {start_local_str}{zoom_text}")
+    return {"id": appt_id}
 
 @app.get("/api/appointments/upcoming")
 def list_upcoming_appointments(
-    limit: int = 20,
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    status: str | None = None,
+    from_: str | None = Query(None, alias="from"),
+    to: str | None = None,
+    u: User = Depends(current_user),
+    session: Session = Depends(get_session),
+):
+    # Sonraki sayfa imleci X-Next-Cursor başlığında döner (gövde eskisi gibi liste)
+    local_tz = ZoneInfo(settings.timezone)
+    try:
+        start_from = datetime.combine(date.fromisoformat(from_), datetime.min.time(), local_tz) if from_ else tznow()
+        start_to = datetime.combine(date.fromisoformat(to) + timedelta(days=1), datetime.min.time(), local_tz) if to else None
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(400, "Geçersiz from / to / cursor")
+
+    start_from = start_from.astimezone(timezone.utc)
+    start_to = start_to.astimezone(timezone.utc) if start_to else None
+    rows = list_appointments(session, u.tenant_id, start_from, start_to, status=status, after=after, limit=limit)
+    items = [((as_utc(r.start), r.id), {
+        "id": r.id,
+        "series_id": r.series_id,
+        "phone": r.phone or "-",
+        "start": as_utc(r.start).isoformat(),
+        "end": as_utc(r.end).isoformat(),
+        "status": r.status,
+        "source": r.source,
+    }) for r in rows]
+    if status in (None, "confirmed"):
+        # Serilerin satıra dönüşmemiş oturumları aynı (start, id) sırasına katılır; id yerine -series_id
+        items += [(o.sort_key, {
+            "id": None,
+            "series_id": o.series_id,
+            "phone": o.phone or "-",
+            "start": o.start.isoformat(),
+            "end": o.end.isoformat(),
+            "status": o.status,
+            "source": "series",
+        }) for o in upcoming_occurrences(session, u.tenant_id, start_from, start_to, after, limit)]
+        items = sorted(items, key=lambda kv: kv[0])[:limit]
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(*items[-1][0])
+    return [item for _, item in items]
+
+@app.get("/api/appointments/history")
+def list_appointment_history(
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    status: str | None = None,
+    phone: str | None = None,
+    from_: str | None = Query(None, alias="from"),
+    to: str | None = None,
     u: User = Depends(current_user),
     session: Session = Depends(get_session),
 ):
+    # Geçmiş randevular (yeniden eskiye): sıcak tablo + arşiv. Sonraki sayfa imleci X-Next-Cursor'da
+    local_tz = ZoneInfo(settings.timezone)
+    try:
+        start_from = datetime.combine(date.fromisoformat(from_), datetime.min.time(), local_tz) if from_ else None
+        before = datetime.combine(date.fromisoformat(to) + timedelta(days=1), datetime.min.time(), local_tz) if to else None
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(400, "Geçersiz from / to / cursor")
+
     now = tznow()
+    before = min(before.astimezone(timezone.utc), now) if before else now
+    start_from = start_from.astimezone(timezone.utc) if start_from else None
+    rows = session.execute(history_query(u.tenant_id, before, start_from, phone, status, after, limit)).all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].start, rows[-1].id)
+    return [{
+        "id": r.id,
+        "series_id": r.series_id,
+        "phone": r.phone or "-",
+        "start": as_utc(r.start).isoformat(),
+        "end": as_utc(r.end).isoformat(),
+        "status": r.status,
+        "source": r.source,
+        "archived": bool(r.archived),
+    } for r in rows]
+
+@app.get("/api/events")
+async def change_events(
+    last_event_id: str | None = Header(None),
+    u: User = Depends(current_user),
+):
+    # Server-Sent Events: randevu oluşturma / iptal / taşıma olayları (gövde upcoming öğesiyle aynı)
+    # ve toplu değişikliklerde "refresh". Yeniden bağlanınca Last-Event-ID ile kaldığı yerden devam.
+    return StreamingResponse(feed.stream(u.tenant_id, last_event_id, settings.events_keepalive),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ----------------- Recurring series -----------------
+# Seri tek satır; oturumlar listede / uygunlukta pencere içinde açılır. Tek oturum iptali ya da
+# taşıması seriye bağlı bir Appointment satırı yazar (bkz. app/series.py).
+MAX_SERIES_MINUTES = 12 * 60
+
+def _create_series(session: Session, tenant_id: int, phone: str, start: datetime, duration: int, rrule: str) -> dict:
+    client = ensure_client(session, tenant_id, phone)
+    series = book_series(session, booking_index, tenant_id, client.id, start, duration, rrule, settings.timezone)
+    availability_cache.invalidate_tenant(tenant_id)
+    _materialize(session, tenant_id)
+    feed.publish(tenant_id, REFRESH)
+    return {"id": series.id, "until": as_utc(series.until).isoformat() if series.until else None}
+
+def _tenant_series(session: Session, tenant_id: int, series_id: int) -> AppointmentSeries:
+    series = session.get(AppointmentSeries, series_id)
+    if not series or series.tenant_id != tenant_id or series.status != "active":
+        raise LookupError("Seri bulunamadı")
+    return series
+
+def _cancel_series(session: Session, tenant_id: int, series_id: int):
+    series = _tenant_series(session, tenant_id, series_id)
+    series.status = "cancelled"
+    session.add(series)
+    # Somutlaşmış gelecek oturumlar da iptal; hatırlatmaları silinir
+    rows = session.exec(select(Appointment).where(Appointment.series_id == series_id)
+                        .where(Appointment.status == "confirmed").where(Appointment.start > tznow())).all()
+    for a in rows:
+        a.status = "cancelled"
+        session.add(a)
+    session.commit()
+    for a in rows:
+        booking_index.remove(tenant_id, a.id, a.start)
+        reschedule_appointment(session, a)
+    availability_cache.invalidate_tenant(tenant_id)
+    feed.publish(tenant_id, REFRESH)
+
+def _cancel_occurrence(session: Session, tenant_id: int, series_id: int, occurrence_start: datetime) -> int:
+    series = _tenant_series(session, tenant_id, series_id)
+    if not is_occurrence(series, occurrence_start):
+        raise LookupError("Oturum bulunamadı")
+    appt = override(session, series, occurrence_start, "cancelled")
+    session.commit(); session.refresh(appt)
+    booking_index.remove(tenant_id, appt.id, appt.start)
+    availability_cache.invalidate(tenant_id, appt.start, appt.end)
+    reschedule_appointment(session, appt)
+    publish_appointment("cancelled", appt, _client_phone(session, appt.client_id))
+    return appt.id
+
+def _move_occurrence(session: Session, tenant_id: int, series_id: int, occurrence_start: datetime,
+                     start: datetime, end: datetime | None) -> int:
+    series = _tenant_series(session, tenant_id, series_id)
+    if not is_occurrence(series, occurrence_start):
+        raise LookupError("Oturum bulunamadı")
+    end = end or start + timedelta(minutes=series.duration_minutes)
+    appt = book_appointment(session, booking_index, tenant_id, series.client_id, start, end, series.source,
+                            series=series, occurrence_start=occurrence_start)
+    availability_cache.invalidate_tenant(tenant_id)  # eski ve yeni gün
+    reschedule_appointment(session, appt)
+    publish_appointment("updated", appt, _client_phone(session, appt.client_id))
+    return appt.id
+
+@app.post("/api/series")
+async def create_series(req: Request, u: User = Depends(current_user), db: DB = Depends(get_db)):
+    # {"phone", "start", "duration_minutes"?, "rrule"?: "FREQ=WEEKLY;COUNT=12"}
+    data = await req.json()
+    start = parse_local(data["start"])
+    duration = int(data.get("duration_minutes") or settings.slot_minutes)
+    if not 0 < duration <= MAX_SERIES_MINUTES:
+        raise HTTPException(400, f"Süre 1..{MAX_SERIES_MINUTES} dakika olmalı")
+    try:
+        rrule = normalize_rrule(data.get("rrule") or "FREQ=WEEKLY")
+    except ValueError as e:
+        raise HTTPException(400, f"Geçersiz rrule: {e}")
+    try:
+        return await db.run(_create_series, u.tenant_id, data["phone"].strip(), start, duration, rrule)
+    except BookingConflict as e:
+        when = e.args[0].astimezone(ZoneInfo(settings.timezone)).strftime("%d.%m.%Y %H:%M")
+        raise HTTPException(409, f"Seçilen saat dolu: {when}")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.get("/api/series")
+def list_series(u: User = Depends(current_user), session: Session = Depends(get_session)):
     rows = session.exec(
-        select(Appointment)
-        .where(Appointment.tenant_id == u.tenant_id, Appointment.start >= now)
-        .order_by(Appointment.start)
-        .limit(limit)
+        select(AppointmentSeries, Client.phone).join(Client, Client.id == AppointmentSeries.client_id, isouter=True)
+        .where(AppointmentSeries.tenant_id == u.tenant_id).where(AppointmentSeries.status == "active")
+        .order_by(AppointmentSeries.start)
     ).all()
-    out = []
-    for a in rows:
-        c = session.get(Client, a.client_id)
-        out.append({
-            "id": a.id,
-            "phone": c.phone if c else "-",
-            "start": a.start.isoformat(),
-            "end": a.end.isoformat(),
-            "status": a.status,
-            "source": a.source,
-        })
-    return out
+    return [{
+        "id": s.id,
+        "phone": phone or "-",
+        "start": as_utc(s.start).isoformat(),
+        "duration_minutes": s.duration_minutes,
+        "rrule": s.rrule,
+        "until": as_utc(s.until).isoformat() if s.until else None,
+    } for s, phone in rows]
+
+@app.delete("/api/series/{series_id}")
+async def cancel_series(series_id: int, u: User = Depends(current_user), db: DB = Depends(get_db)):
+    try:
+        await db.run(_cancel_series, u.tenant_id, series_id)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    return {"ok": True}
+
+@app.post("/api/series/{series_id}/occurrences/cancel")
+async def cancel_occurrence(series_id: int, req: Request, u: User = Depends(current_user), db: DB = Depends(get_db)):
+    # {"start": <oturumun serideki başlangıcı>}
+    data = await req.json()
+    try:
+        appt_id = await db.run(_cancel_occurrence, u.tenant_id, series_id, parse_local(data["start"]))
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    return {"id": appt_id}
+
+@app.post("/api/series/{series_id}/occurrences/move")
+async def move_occurrence(series_id: int, req: Request, u: User = Depends(current_user), db: DB = Depends(get_db)):
+    # {"start": <serideki başlangıç>, "new_start", "new_end"?}
+    data = await req.json()
+    occurrence_start = parse_local(data["start"])
+    start = parse_local(data["new_start"])
+    end = parse_local(data["new_end"]) if data.get("new_end") else None
+    if end is not None and end <= start:
+        raise HTTPException(400, "Bitiş başlangıçtan sonra olmalı")
+    try:
+        appt_id = await db.run(_move_occurrence, u.tenant_id, series_id, occurrence_start, start, end)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    except BookingConflict:
+        raise HTTPException(409, "Seçilen saat dolu")
+    return {"id": appt_id}
+
+@app.get("/api/availability")
+def availability(
+    from_: str | None = Query(None, alias="from"),
+    to: str | None = Query(None),
+    u: User = Depends(current_user),
+    session: Session = Depends(get_session),
+):
+    # from / to: yerel tarih (YYYY-MM-DD), ikisi de dahil; varsayılan bugünden itibaren 7 gün
+    now = tznow()
+    try:
+        first_day = date.fromisoformat(from_) if from_ else now.astimezone(ZoneInfo(settings.timezone)).date()
+        last_day = date.fromisoformat(to) if to else first_day + timedelta(days=6)
+    except ValueError:
+        raise HTTPException(400, "Tarih formatı YYYY-MM-DD olmalı")
+    if last_day < first_day:
+        raise HTTPException(400, "'to' 'from'dan önce olamaz")
+    if (last_day - first_day).days > MAX_AVAILABILITY_DAYS:
+        raise HTTPException(400, f"En fazla {MAX_AVAILABILITY_DAYS} günlük aralık sorgulanabilir")
+
+    _, slots = availability_cache.range(session, u.tenant_id, first_day, last_day, not_before=now)
+    return [{"start": s.isoformat(), "end": e.isoformat()} for s, e in slots]
+
+# ----------------- Bulk import / export -----------------
+# Gövde akış halinde okunur, settings.bulk_batch_size'lık partilerle yazılır (parti başına bir
+# commit). İçe aktarılan randevular için WhatsApp onayı gönderilmez; hatırlatmalar en sonda tek
+# seferde kurulur. Dışa aktarma tabloyu belleğe almadan akar (bkz. app/bulk.py).
+def _import_format(format: str | None, req: Request) -> str:
+    try:
+        return bulk.detect_format(format, req.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+def _finish_import(session: Session, tenant_id: int, appt_ids: list[int]) -> int:
+    availability_cache.invalidate_tenant(tenant_id)
+    booking_index.invalidate(tenant_id)
+    feed.publish(tenant_id, REFRESH)
+    return schedule_appointments(session, appt_ids, settings.reminder_24h, settings.reminder_1h, settings.zoom_join_url,
+                                 tz_name=settings.timezone)
+
+@app.post("/api/import/appointments")
+async def import_appointments(req: Request, format: str | None = None,
+                              u: User = Depends(current_user), db: DB = Depends(get_db)):
+    # Satır: phone, start, [end, status, name, source]; hatalı satırlar atlanır ve raporlanır
+    fmt = _import_format(format, req)
+    result = bulk.ImportResult()
+    batch = []
+    try:
+        async for lineno, rec in bulk.iter_records(req.stream(), fmt):
+            try:
+                if isinstance(rec, Exception):
+                    raise rec
+                batch.append((lineno, bulk.parse_appointment(rec, settings.timezone, settings.slot_minutes)))
+            except ValueError as e:
+                result.error(lineno, str(e))
+            if len(batch) >= settings.bulk_batch_size:
+                await db.run(bulk.import_appointment_batch, u.tenant_id, batch, result, is_overlap_error)
+                batch = []
+        if batch:
+            await db.run(bulk.import_appointment_batch, u.tenant_id, batch, result, is_overlap_error)
+    finally:
+        # Yarıda kesilse de yazılmış partilerin hatırlatmaları ve önbellekleri güncellenir
+        if result.imported:
+            result.reminders = await db.run(_finish_import, u.tenant_id, result.future_ids)
+    return result.summary()
+
+@app.post("/api/import/clients")
+async def import_clients(req: Request, format: str | None = None,
+                         u: User = Depends(current_user), db: DB = Depends(get_db)):
+    # Satır: phone, [name]; (tenant, phone) varsa isim güncellenir, yoksa eklenir
+    fmt = _import_format(format, req)
+    result = bulk.ImportResult()
+    batch: dict[str, str | None] = {}
+    async for lineno, rec in bulk.iter_records(req.stream(), fmt):
+        try:
+            if isinstance(rec, Exception):
+                raise rec
+            c = bulk.parse_client(rec)
+        except ValueError as e:
+            result.error(lineno, str(e))
+            continue
+        batch[c["phone"]] = c["name"] or batch.get(c["phone"])
+        if len(batch) >= settings.bulk_batch_size:
+            await db.run(bulk.upsert_clients, u.tenant_id, batch, result)
+            batch = {}
+    if batch:
+        await db.run(bulk.upsert_clients, u.tenant_id, batch, result)
+    result.imported = result.clients_created + result.clients_updated
+    return result.summary()
+
+def _export_response(query, columns: tuple, fmt: str, name: str) -> StreamingResponse:
+    if fmt not in bulk.FORMATS:
+        raise HTTPException(400, f"format {'/'.join(bulk.FORMATS)} olmalı")
+    rows = bulk.stream_rows(new_session, query, columns, fmt, settings.bulk_batch_size)
+    return StreamingResponse(rows, media_type=bulk.MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'})
+
+@app.get("/api/export/appointments")
+def export_appointments(
+    format: str = "ndjson",
+    from_: str | None = Query(None, alias="from"),
+    to: str | None = None,
+    u: User = Depends(current_user),
+):
+    # from / to: yerel tarih (YYYY-MM-DD), ikisi de dahil; verilmezse tüm randevular
+    local_tz = ZoneInfo(settings.timezone)
+    try:
+        start_from = datetime.combine(date.fromisoformat(from_), datetime.min.time(), local_tz) if from_ else None
+        start_to = datetime.combine(date.fromisoformat(to) + timedelta(days=1), datetime.min.time(), local_tz) if to else None
+    except ValueError:
+        raise HTTPException(400, "Tarih formatı YYYY-MM-DD olmalı")
+    query = bulk.appointments_export_query(u.tenant_id, start_from and start_from.astimezone(timezone.utc),
+                                           start_to and start_to.astimezone(timezone.utc))
+    return _export_response(query, bulk.APPOINTMENT_COLUMNS, format, "appointments")
+
+@app.get("/api/export/clients")
+def export_clients(format: str = "ndjson", u: User = Depends(current_user)):
+    return _export_response(bulk.clients_export_query(u.tenant_id), bulk.CLIENT_COLUMNS, format, "clients")
+
+# ----------------- Admin -----------------
+@app.post("/api/admin/reminders/rebuild")
+def rebuild_reminders(u: User = Depends(current_user), session: Session = Depends(get_session)):
+    # Tüm hatırlatma işlerini baştan kurar (pahalı; sadece bakım için)
+    if u.role != "admin":
+        raise HTTPException(403, "Yetki yok")
+    return {"reminders": reschedule_all(session)}
+
+@app.post("/api/admin/archive")
+def archive_appointments(u: User = Depends(current_user)):
+    # Tenant'ın eski randevularını zamanlayıcıyı beklemeden arşive taşır
+    if u.role != "admin":
+        raise HTTPException(403, "Yetki yok")
+    if settings.archive_after_days <= 0:
+        raise HTTPException(400, "Arşivleme kapalı (ARCHIVE_AFTER_DAYS=0)")
+    return {"archived": archive_old(u.tenant_id)}
+
+@app.get("/api/admin/stats")
+def admin_stats(u: User = Depends(current_user)):
+    if u.role != "admin":
+        raise HTTPException(403, "Yetki yok")
+    return {"availability_cache": availability_cache.stats(), "auth_cache": auth_cache.stats(),
+            "booking_index": booking_index.stats(),
+            "change_feed": feed.stats(),
+            "whatsapp_outbox": outbox.stats(),
+            "whatsapp_inbound": inbound.stats()}
 
 # ----------------- WhatsApp Webhook -----------------
 @app.get("/whatsapp/webhook/{tenant_key}")
@@ -235,60 +753,75 @@ def wa_verify(
     token: str = Query(None, alias="hub.verify_token"),
     session: Session = Depends(get_session),
 ):
-    t = session.exec(select(Tenant).where(Tenant.tenant_key == tenant_key)).first()
+    t = auth_cache.tenant_by_key(session, tenant_key)
     if not t:
         return PlainTextResponse("tenant not found", status_code=404)
     if mode == "subscribe" and token == settings.whatsapp_verify_token:
         return PlainTextResponse(challenge or "")
     return PlainTextResponse("forbidden", status_code=403)
 
+def _tenant_id_by_key(session: Session, tenant_key: str) -> int | None:
+    t = auth_cache.tenant_by_key(session, tenant_key)
+    return t.id if t else None
+
+def _store_inbound(session: Session, tenant_id: int, messages: list[dict]) -> list[tuple[int, str]]:
+    return [(r.id, r.from_phone) for r in store_messages(session, tenant_id, messages)]
+
 @app.post("/whatsapp/webhook/{tenant_key}")
-async def wa_webhook(tenant_key: str, req: Request, session: Session = Depends(get_session)):
-    t = session.exec(select(Tenant).where(Tenant.tenant_key == tenant_key)).first()
-    if not t:
+async def wa_webhook(tenant_key: str, req: Request, db: DB = Depends(get_db)):
+    # Sadece doğrula, kaydet ve kuyruğa at; Meta yavaş cevaplarda tekrar gönderdiği için
+    # işleme (intent, slot, rezervasyon, gönderim) arka planda yapılır.
+    tenant_id = await db.run(_tenant_id_by_key, tenant_key)
+    if tenant_id is None:
         return JSONResponse({"status": "no tenant"}, status_code=404)
 
-    body = await req.json()
     try:
-        entry = body["entry"][0]["changes"][0]["value"]
-        message = entry["messages"][0]
-        from_phone = message["from"]
-        text_body = message.get("text", {}).get("body", "").strip().lower()
+        body = await req.json()
+        messages = extract_messages(body)
     except Exception:
         return JSONResponse({"status": "ignored"})
+    if not messages:
+        return JSONResponse({"status": "ignored"})
 
-    # intent
-    intent = "help"
-    if any(k in text_body for k in ["randevu", "rezerv", "al"]):
-        intent = "book"
-    elif any(k in text_body for k in ["iptal", "cancel"]):
-        intent = "cancel"
-    elif any(k in text_body for k in ["bugün", "yarın", "hafta", "uygun", "saat"]):
-        intent = "availability"
+    rows = await db.run(_store_inbound, tenant_id, messages)
+    for msg_id, from_phone in rows:
+        inbound.submit(msg_id, from_phone)
+    return JSONResponse({"status": "ok", "accepted": len(rows), "duplicates": len(messages) - len(rows)})
 
-    day = tznow()
-    db_busy = busy_from_db(session, t.id, day.replace(hour=0, minute=0), day.replace(hour=0, minute=0) + timedelta(days=1))
-    avail = working_slots(day, settings.work_start, settings.work_end, settings.slot_minutes, settings.timezone)
-    free = [(s, e) for (s, e) in avail if not any(max(s, b1) < min(e, b2) for (b1, b2) in db_busy)]
+def process_whatsapp_message(session: Session, t: Tenant, msg: InboundMessage):
+    from_phone = msg.from_phone
+    now = tznow()
+    today = now.astimezone(ZoneInfo(settings.timezone)).date()
+    parsed = parse_message(msg.text, settings.timezone, today)
+    intent = parsed.intent
+
+    # pencere: bugün / yarın / bu hafta (yerel tarih)
+    first_day, last_day, label = today, today, "Bugün"
+    if parsed.window == "week":
+        last_day, label = today + timedelta(days=6), "Bu hafta"
+    elif parsed.window == "tomorrow":
+        first_day = last_day = today + timedelta(days=1)
+        label = "Yarın"
+    _, free = availability_cache.range(session, t.id, first_day, last_day, not_before=now)
 
     def _wa(txt: str):
-        try:
-            if settings.whatsapp_access_token and settings.whatsapp_phone_number_id:
-                send_whatsapp_text(settings.whatsapp_access_token, settings.whatsapp_phone_number_id, from_phone, txt)
-        except Exception:
-            pass
+        send_wa(from_phone, txt)
 
-    if intent in ["book", "availability"]:
+    if parsed.when is not None:
+        # metin net bir tarih/saat: aşağıda rezerv denenir
+        pass
+    elif intent in ["book", "availability"]:
         if not free:
-            _wa("Bugün için uygun saat yok. 'yarın' veya 'hafta' yazabilirsiniz.")
+            _wa(f"{label} için uygun saat yok. 'yarın' veya 'hafta' yazabilirsiniz.")
         else:
-            formatted = "\n".join([f"- {s.astimezone().strftime('%H:%M')} - {e.astimezone().strftime('%H:%M')}" for s, e in free[:10]])
+            # Klinik saatiyle (onay mesajı gibi); sunucunun saat dilimi değil
+            fmt, tzi = ('%d.%m %H:%M' if first_day != last_day else '%H:%M'), zone(settings.timezone)
+            formatted = "\n".join([f"- {s.astimezone(tzi).strftime(fmt)} - {e.astimezone(tzi).strftime('%H:%M')}" for s, e in free[:10]])
             _wa(f"Uygun saatler:\n{formatted}\n\nRezerv için 'YYYY-MM-DD HH:MM' yazın.")
     elif intent == "cancel":
         client = session.exec(select(Client).where(Client.tenant_id == t.id).where(Client.phone == from_phone)).first()
-        if not client:
-            _wa("Kayıtlı randevunuz bulunamadı.")
-        else:
+        appt = occ = None
+        if client:
             appt = session.exec(
                 select(Appointment)
                 .where(Appointment.tenant_id == t.id)
@@ -297,33 +830,49 @@ async def wa_webhook(tenant_key: str, req: Request, session: Session = Depends(g
                 .where(Appointment.start > tznow())
                 .order_by(Appointment.start)
             ).first()
-            if not appt:
-                _wa("İptal edilecek randevu bulunamadı.")
+            # Tekrarlayan serideki (henüz satırı olmayan) sıradaki oturum daha yakınsa o iptal edilir
+            occ = next_occurrence(session, t.id, client.id, now)
+            if occ and appt and as_utc(appt.start) <= occ.start:
+                occ = None
+        if not client:
+            _wa("Kayıtlı randevunuz bulunamadı.")
+        elif not appt and not occ:
+            _wa("İptal edilecek randevu bulunamadı.")
+        else:
+            if occ:
+                appt = override(session, session.get(AppointmentSeries, occ.series_id), occ.start, 'cancelled')
             else:
                 appt.status = 'cancelled'
-                session.add(appt); session.commit()
-                _wa("Randevunuz iptal edildi.")
-                reschedule_all(session)
+            session.add(appt); session.commit(); session.refresh(appt)
+            booking_index.remove(t.id, appt.id, appt.start)
+            availability_cache.invalidate(t.id, appt.start, appt.end)
+            _wa("Randevunuz iptal edildi.")
+            reschedule_appointment(session, appt)
+            publish_appointment("cancelled", appt, client.phone)
     else:
         _wa("Merhaba! 'randevu al', 'bugün', 'yarın' veya 'iptal' yazabilirsiniz.")
 
     # metin net bir tarih ise rezerv dene
-    try:
-        from dateutil import parser
-        dt = parser.parse(text_body)
-        start = dt.replace(second=0, microsecond=0).astimezone(timezone.utc)
+    if parsed.when is not None:
+        start = parsed.when
         end = start + timedelta(minutes=settings.slot_minutes)
-        clash = any(max(start, b1) < min(end, b2) for (b1, b2) in db_busy)
-        if clash:
+        if start <= now:
+            _wa("Geçmiş bir saat seçtiniz. 'YYYY-MM-DD HH:MM' biçiminde ileri bir tarih yazın.")
+            return
+        # Çakışma istenen tarihin kendisine bakılarak (indeks + DB guard) kontrol edilir
+        client = ensure_client(session, t.id, from_phone)
+        try:
+            appt = book_appointment(session, booking_index, t.id, client.id, start, end, 'whatsapp')
+        except BookingConflict:
             _wa("Seçtiğiniz saat dolu. Başka bir saat dener misiniz?")
-        else:
-            client = ensure_client(session, t.id, from_phone)
-            appt = Appointment(tenant_id=t.id, client_id=client.id, start=start, end=end, status='confirmed', source='whatsapp')
-            session.add(appt); session.commit()
-            zoom_text = f"\nZoom: {settings.zoom_join_url}" if settings.zoom_join_url else ""
-            _wa(f"Randevunuz onaylandı: {start.astimezone().strftime('%d.%m.%Y %H:%M')}{zoom_text}")
-            reschedule_all(session)
-    except Exception:
-        pass
-
-    return JSONResponse({"status": "ok"})
+            return
+        availability_cache.invalidate(t.id, start, end)
+        zoom_text = f"\nZoom: {settings.zoom_join_url}" if settings.zoom_join_url else ""
+        start_local_str = start.astimezone(ZoneInfo(settings.timezone)).strftime('%d.%m.%Y %H:%M')
+        _wa(f"Randevunuz onaylandı: {start_local_str}{zoom_text}")
+        reschedule_appointment(session, appt)
+        publish_appointment("created", appt, from_phone)
+
+# Webhook mesajlarını işleyen arka plan hattı (gönderen başına sıralı)
+inbound = InboundPipeline(new_session, process_whatsapp_message, workers=settings.inbound_workers,
+                          retry_seconds=settings.inbound_retry_seconds)
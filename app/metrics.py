@@ -0,0 +1,255 @@
+import logging, threading, time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+# Süreç içi metrikler ve Prometheus metin formatı (harici bağımlılık yok).
+# Çok worker'lı kurulumda her süreç kendi değerlerini verir; toplama Prometheus tarafında.
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # key → [bucket sayaçları..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+                    break
+            s[-2] += value
+            s[-1] += 1
+
+    def count(self, **labels) -> int:
+        s = self._series.get(self._key(labels))
+        return s[-1] if s else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        out = self.header()
+        for key, s in items:
+            cum = 0
+            for b, n in zip(self.buckets, s):
+                cum += n
+                le = 'le="%s"' % _num(b)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cum}")
+            inf = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, key, inf)} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {s[-2]!r}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return out
+
+class CallbackMetric(_Metric):
+    # Değeri okuma anında hesaplanan metrik (kuyruk derinliği, önbellek sayaçları...)
+    def __init__(self, name, help, kind: str, labelnames: tuple, fn: Callable[[], Iterable[tuple[tuple, float]]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        try:
+            items = list(self.fn())
+        except Exception:
+            log.exception("metrik okunamadı: %s", self.name)
+            return []
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric  # aynı ad tekrar kaydedilirse yenisi geçerli
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, kind, labelnames, fn) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, kind, labelnames, fn))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP istek süresi", ("method", "route", "status"))
+HTTP_REQUEST_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "İstek başına SQL sorgu sayısı", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100))
+DB_QUERY_SECONDS = REGISTRY.histogram("db_query_duration_seconds", "SQL sorgu süresi", ("operation",))
+REMINDERS = REGISTRY.counter("reminders_total", "Dispatcher'ın işlediği hatırlatmalar", ("result",))
+REMINDER_LAG_SECONDS = REGISTRY.histogram(
+    "reminder_dispatch_lag_seconds", "Vade ile gönderim arasındaki gecikme", (),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600))
+REMINDER_DISPATCH_SECONDS = REGISTRY.histogram("reminder_dispatch_duration_seconds", "Bir dispatch turunun süresi")
+REMINDERS_PENDING = REGISTRY.gauge("reminders_pending", "Bekleyen (gönderilmemiş) hatırlatmalar")
+WHATSAPP_REQUEST_SECONDS = REGISTRY.histogram(
+    "whatsapp_request_duration_seconds", "WhatsApp Cloud API çağrı süresi", ("outcome",))
+APPOINTMENTS_ARCHIVED = REGISTRY.counter("appointments_archived_total", "Arşiv tablosuna taşınan randevular")
+
+# ----------------- İstek başına SQL dökümü -----------------
+@dataclass
+class RequestStats:
+    queries: int = 0
+    sql_seconds: float = 0.0
+    statements: dict[str, list] = field(default_factory=dict)  # SQL → [adet, süre]
+
+    def add(self, statement: str, seconds: float):
+        # SQLAlchemy derlenmiş SQL'i önbellekten verir (parametreler ayrı); metin anahtar olarak yeter
+        self.queries += 1
+        self.sql_seconds += seconds
+        s = self.statements.get(statement)
+        if s is None:
+            s = self.statements[statement] = [0, 0.0]
+        s[0] += 1
+        s[1] += seconds
+
+    def breakdown(self, top: int = 5) -> str:
+        rows = sorted(self.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        return "\n".join(f"    {n:3d}x {t * 1000:8.2f} ms  {' '.join(sql.split())[:160]}" for sql, (n, t) in rows)
+
+# Sync endpoint'ler thread havuzunda çalışsa da context kopyalanır; aynı nesneye yazarlar
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+def instrument_engine(engine):
+    # Sorgu süresi ve sayısı: global histogram + (varsa) o anki isteğin dökümü
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0 = getattr(context, "_metrics_t0", None)
+        if t0 is None:
+            return
+        dt = time.perf_counter() - t0
+        op = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+        DB_QUERY_SECONDS.observe(dt, operation=op if op in ("select", "insert", "update", "delete") else "other")
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.add(statement, dt)
+
+# ----------------- ASGI middleware -----------------
+# Saf ASGI: streaming yanıtları tamponlamaz. Route etiketi şablondan alınır
+# (/api/x/{id}), eşleşmeyen yollar tek etikette toplanır; kardinalite sınırlı kalır.
+class MetricsMiddleware:
+    def __init__(self, app, slow_request_ms: int = 0):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.slow_log = logging.getLogger("app.slow")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            dt = time.perf_counter() - t0
+            _request_stats.reset(token)
+            route = scope.get("route")
+            label = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(dt, method=scope["method"], route=label, status=str(status))
+            HTTP_REQUEST_QUERIES.observe(stats.queries, route=label)
+            if self.slow_request_ms and dt * 1000 >= self.slow_request_ms:
+                self.slow_log.warning("yavaş istek: %s %s → %s %.1f ms; %d sorgu, SQL %.1f ms\n%s",
+                                      scope["method"], label, status, dt * 1000, stats.queries,
+                                      stats.sql_seconds * 1000, stats.breakdown())
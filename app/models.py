@@ -1,8 +1,13 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, text
 from typing import Optional, List
 from datetime import datetime
 
+# İndeksler sıcak sorgu şekillerine göre; tekillik de (ALTER gerektirmeden eski DB'lere
+# eklenebilsin diye) unique index olarak tanımlı. Bkz. db.migrate()
+
 class Tenant(SQLModel, table=True):
+    __table_args__ = (Index('ux_tenant_tenant_key', 'tenant_key', unique=True),)
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     tenant_key: str
@@ -13,6 +18,7 @@ class Tenant(SQLModel, table=True):
     appointments: List['Appointment'] = Relationship(back_populates='tenant')
 
 class User(SQLModel, table=True):
+    __table_args__ = (Index('ux_user_email', 'email', unique=True),)
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(foreign_key='tenant.id')
     email: str
@@ -22,6 +28,7 @@ class User(SQLModel, table=True):
     tenant: Optional[Tenant] = Relationship(back_populates='users')
 
 class Client(SQLModel, table=True):
+    __table_args__ = (Index('ux_client_tenant_phone', 'tenant_id', 'phone', unique=True),)
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(foreign_key='tenant.id')
     phone: str
@@ -30,7 +37,22 @@ class Client(SQLModel, table=True):
     tenant: Optional[Tenant] = Relationship(back_populates='clients')
     appointments: List['Appointment'] = Relationship(back_populates='client')
 
+# Randevu başına tür ('24' / '1') için en fazla bir bekleyen hatırlatma; eşzamanlı yeniden
+# kurulumlar (schedule_all / schedule_appointment) satırları ON CONFLICT DO UPDATE ile ekler
+REMINDER_PENDING = "status = 'pending'"
+
+# Aynı tenant'ta çakışan iki onaylı randevuyu reddeden DB guard'ının adı (bkz. db.migrate)
+APPOINTMENT_OVERLAP = 'appointment_overlap'
+
 class Appointment(SQLModel, table=True):
+    __table_args__ = (
+        Index('ix_appointment_tenant_status_start', 'tenant_id', 'status', 'start', 'end'),  # busy_from_db
+        Index('ix_appointment_tenant_status_end', 'tenant_id', 'status', 'end'),  # çakışma guard'ı
+        Index('ix_appointment_tenant_start_id', 'tenant_id', 'start', 'id'),  # yaklaşan randevular (keyset)
+        Index('ix_appointment_client_start', 'client_id', 'start'),  # iptal araması
+        Index('ix_appointment_status_start', 'status', 'start'),  # schedule_all
+        Index('ux_appointment_series_occurrence', 'series_id', 'occurrence_start', unique=True),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(foreign_key='tenant.id')
     client_id: int = Field(foreign_key='client.id')
@@ -39,5 +61,84 @@ class Appointment(SQLModel, table=True):
     status: str = Field(default='confirmed')
     source: str = Field(default='whatsapp')
     ms_event_id: Optional[str] = None
+    # Seriden gelen satır: bir oturumun iptali / taşınması ya da hatırlatma için somutlaşması
+    series_id: Optional[int] = Field(default=None, foreign_key='appointmentseries.id')
+    occurrence_start: Optional[datetime] = None  # serideki asıl başlangıç (UTC)
     tenant: Optional[Tenant] = Relationship(back_populates='appointments')
     client: Optional[Client] = Relationship(back_populates='appointments')
+
+class AppointmentArchive(SQLModel, table=True):
+    # Bitişi arşiv ufkundan (ARCHIVE_AFTER_DAYS) eski randevular; sıcak tablo ve indeksleri küçük
+    # kalır. id asıl Appointment.id'dir (satır taşınır, kimliği değişmez). Bkz. app/archive.py
+    __table_args__ = (
+        Index('ix_archive_tenant_start_id', 'tenant_id', 'start', 'id'),  # geçmiş listesi (keyset)
+        Index('ix_archive_client_start', 'client_id', 'start'),  # danışan geçmişi
+        Index('ix_archive_series_occurrence', 'series_id', 'occurrence_start'),  # seri istisnaları
+    )
+    id: int = Field(primary_key=True, sa_column_kwargs={'autoincrement': False})
+    tenant_id: int = Field(foreign_key='tenant.id')
+    client_id: int = Field(foreign_key='client.id')
+    start: datetime
+    end: datetime
+    status: str
+    source: str
+    ms_event_id: Optional[str] = None
+    series_id: Optional[int] = Field(default=None, foreign_key='appointmentseries.id')
+    occurrence_start: Optional[datetime] = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AppointmentSeries(SQLModel, table=True):
+    # Tekrarlayan randevu (RRULE). Oturumlar satır olarak saklanmaz; sorgulanan pencerede
+    # açılır (bkz. app/series.py). İstisnalar series_id + occurrence_start taşıyan Appointment satırları.
+    __table_args__ = (Index('ix_series_tenant_status_start', 'tenant_id', 'status', 'start'),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key='tenant.id')
+    client_id: int = Field(foreign_key='client.id')
+    start: datetime  # ilk oturum / DTSTART (UTC)
+    duration_minutes: int
+    rrule: str  # örn. 'FREQ=WEEKLY;COUNT=12'
+    tz: str  # tekrarlar bu saat diliminde duvar saatine göre (yaz saati geçişinde 10:00 yine 10:00)
+    until: Optional[datetime] = None  # son oturumun bitişi; None = açık uçlu
+    status: str = Field(default='active')  # active | cancelled
+    source: str = Field(default='manual')
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Reminder(SQLModel, table=True):
+    # Kalıcı hatırlatma kuyruğu; dispatcher'lar satırları 'claimed' yaparak sahiplenir
+    __table_args__ = (
+        Index('ix_reminder_status_due', 'status', 'due_at'),
+        Index('ux_reminder_pending_appointment_kind', 'appointment_id', 'kind', unique=True,
+              sqlite_where=text(REMINDER_PENDING), postgresql_where=text(REMINDER_PENDING)),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key='tenant.id')
+    appointment_id: int = Field(foreign_key='appointment.id', index=True)
+    kind: str  # '24' | '1'
+    due_at: datetime
+    phone: str
+    text: str
+    status: str = Field(default='pending')  # pending | claimed | sent | failed | superseded
+    attempts: int = Field(default=0)
+    claimed_by: Optional[str] = None
+    claimed_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+class InboundMessage(SQLModel, table=True):
+    # Webhook'tan gelen ham mesajlar; hemen kaydedilip arka planda işlenir. message_id (wamid) tekil → tekrar gelen teslimatlar atlanır
+    __table_args__ = (
+        Index('ux_inbound_message_id', 'message_id', unique=True),
+        Index('ix_inbound_status_received', 'status', 'received_at'),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key='tenant.id')
+    message_id: str
+    from_phone: str
+    text: str = Field(default='')
+    payload: str = Field(default='{}')
+    status: str = Field(default='pending')  # pending | processing | done | failed
+    attempts: int = Field(default=0)
+    error: Optional[str] = None
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+    claimed_at: Optional[datetime] = None  # 'processing' sahiplenme anı; takılı kalma buna göre ölçülür
+    processed_at: Optional[datetime] = None
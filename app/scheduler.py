@@ -1,35 +1,228 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
+import os, socket, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, delete, func, or_, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
-from .models import Appointment, Client
+from .models import Appointment, Client, Reminder, REMINDER_PENDING
 from .whatsapp import send_whatsapp_text
+from .logic import as_utc, zone
+from .settings import get_settings
+from .metrics import REMINDERS, REMINDER_LAG_SECONDS, REMINDER_DISPATCH_SECONDS, REMINDERS_PENDING
+
+# Her randevu için iki hatırlatma: kind='24' ve kind='1'
+REMINDER_KINDS = ("24", "1")
+
+def start_scheduler(dispatcher: "ReminderDispatcher | None" = None, poll_seconds: int = 15,
+                    materialize: Callable[[], int] | None = None, materialize_seconds: int = 600,
+                    archive: Callable[[], int] | None = None, archive_seconds: int = 3600):
+    # Zamanlayıcı sadece dispatcher'ı, seri oturumlarının somutlaşmasını ve eski randevuların
+    # arşivlenmesini tetikler; işler bellekte değil DB'de (Reminder / Appointment) tutulur.
+    # apscheduler burada yüklenir: RUN_SCHEDULER=0 olan web worker'ları hiç import etmez
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+    scheduler = BackgroundScheduler(timezone=timezone.utc)
+    if dispatcher is not None:
+        scheduler.add_job(dispatcher.dispatch_due, trigger=IntervalTrigger(seconds=poll_seconds),
+                          id="reminder-dispatch", max_instances=1, coalesce=True, replace_existing=True)
+    if materialize is not None:
+        scheduler.add_job(materialize, trigger=IntervalTrigger(seconds=materialize_seconds),
+                          id="series-materialize", max_instances=1, coalesce=True, replace_existing=True)
+    if archive is not None:
+        scheduler.add_job(archive, trigger=IntervalTrigger(seconds=archive_seconds),
+                          id="appointment-archive", max_instances=1, coalesce=True, replace_existing=True)
+    return scheduler
+
+def schedule_all(session: Session, reminder_24m: int, reminder_1h: int, zoom_url: str | None,
+                 tz_name: str | None = None) -> int:
+    # Tam yeniden kurulum: sadece açılışta / admin işlemi olarak çağrılmalı
+    session.exec(delete(Reminder).where(Reminder.status == 'pending'))
+    now = datetime.now(timezone.utc)
+    # Danışan telefonu join ile tek sorguda gelir (randevu başına session.get yok)
+    appts = session.exec(
+        select(Appointment, Client.phone).join(Client, Client.id == Appointment.client_id)
+        .where(Appointment.status=='confirmed').where(Appointment.start>now)
+    ).all()
+    total = 0
+    for a, phone in appts:
+        rows = _schedule(a, phone, reminder_24m, reminder_1h, zoom_url, tz_name)
+        _insert_pending(session, rows)
+        total += len(rows)
+    session.commit()
+    return total
+
+def unschedule_appointment(session: Session, appt_id: int, commit: bool = True):
+    session.exec(delete(Reminder).where(Reminder.appointment_id == appt_id).where(Reminder.status == 'pending'))
+    if commit:
+        session.commit()
 
-def start_scheduler():
-    return BackgroundScheduler(timezone=timezone.utc)
+def schedule_appointment(a: Appointment, session: Session, reminder_24m: int, reminder_1h: int, zoom_url: str | None,
+                         tz_name: str | None = None):
+    # Artımlı güncelleme: sadece bu randevunun bekleyen hatırlatmalarına dokunur (ekle / güncelle / sil)
+    unschedule_appointment(session, a.id, commit=False)
+    if a.status == 'confirmed' and as_utc(a.start) > datetime.now(timezone.utc):
+        phone = session.exec(select(Client.phone).where(Client.id == a.client_id)).first()
+        if phone:
+            _insert_pending(session, _schedule(a, phone, reminder_24m, reminder_1h, zoom_url, tz_name))
+    session.commit()
 
-def schedule_all(session: Session, scheduler: BackgroundScheduler, reminder_24m: int, reminder_1h: int, zoom_url: str | None, send_args: dict):
-    for job in scheduler.get_jobs():
-        job.remove()
+def schedule_appointments(session: Session, appt_ids: list[int], reminder_24m: int, reminder_1h: int,
+                          zoom_url: str | None, chunk: int = 500, tz_name: str | None = None) -> int:
+    # Toplu artımlı güncelleme (içe aktarma sonrası): sadece verilen randevular, IN listesi parça parça
+    total = 0
     now = datetime.now(timezone.utc)
-    appts = session.exec(select(Appointment).where(Appointment.status=='confirmed').where(Appointment.start>now)).all()
-    for a in appts:
-        _schedule(a, session, scheduler, reminder_24m, reminder_1h, zoom_url, send_args)
+    for i in range(0, len(appt_ids), chunk):
+        ids = appt_ids[i:i + chunk]
+        session.exec(delete(Reminder).where(Reminder.appointment_id.in_(ids)).where(Reminder.status == 'pending'))
+        appts = session.exec(
+            select(Appointment, Client.phone).join(Client, Client.id == Appointment.client_id)
+            .where(Appointment.id.in_(ids))
+            .where(Appointment.status == 'confirmed').where(Appointment.start > now)
+        ).all()
+        for a, phone in appts:
+            rows = _schedule(a, phone, reminder_24m, reminder_1h, zoom_url, tz_name)
+            _insert_pending(session, rows)
+            total += len(rows)
+        session.commit()
+    return total
+
+PENDING_COLUMNS = ("tenant_id", "appointment_id", "kind", "due_at", "phone", "text", "status", "attempts")
+
+def _insert_pending(session: Session, rows: list[Reminder]):
+    # Silme + ekleme arasında aynı randevuyu kuran başka bir istek/süreç ya da geri bekleyene
+    # alınan eski bir deneme varsa ux_reminder_pending_appointment_kind'e takılır; mevcut bekleyen
+    # satır tek kalır ve en son kurulumun vadesi / metniyle güncellenir
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        session.add_all(rows)
+        return
+    stmt = insert(Reminder)
+    stmt = stmt.on_conflict_do_update(index_elements=["appointment_id", "kind"], index_where=text(REMINDER_PENDING),
+                                      set_={c: stmt.excluded[c] for c in ("due_at", "phone", "text")})
+    session.execute(stmt, [{c: getattr(r, c) for c in PENDING_COLUMNS} for r in rows])
 
-def _schedule(a: Appointment, session: Session, scheduler: BackgroundScheduler, reminder_24m: int, reminder_1h: int, zoom_url: str | None, send_args: dict):
-    client = session.get(Client, a.client_id)
-    if not client: return
+def _schedule(a: Appointment, phone: str, reminder_24m: int, reminder_1h: int, zoom_url: str | None,
+              tz_name: str | None = None) -> list[Reminder]:
     now = datetime.now(timezone.utc)
+    start = as_utc(a.start)
+    # Saat klinik saat diliminde (onay mesajı gibi); sunucunun saat dilimi değil
+    local = start.astimezone(zone(tz_name or get_settings().timezone))
     def msg(prefix:str):
         z = f"\nZoom: {zoom_url}" if zoom_url else ""
-        return f"{prefix}: {a.start.astimezone().strftime('%d.%m %H:%M')} seansınız var.{z}"
-    t1 = a.start - timedelta(minutes=reminder_24m)
-    if t1 > now:
-        scheduler.add_job(send_whatsapp_text, trigger=DateTrigger(run_date=t1),
-                          args=[send_args.get('access_token',''), send_args.get('phone_number_id',''), client.phone, msg('Hatırlatma (24s)')],
-                          id=f"a-{a.id}-24", replace_existing=True)
-    t2 = a.start - timedelta(minutes=reminder_1h)
-    if t2 > now:
-        scheduler.add_job(send_whatsapp_text, trigger=DateTrigger(run_date=t2),
-                          args=[send_args.get('access_token',''), send_args.get('phone_number_id',''), client.phone, msg('Hatırlatma (1s)')],
-                          id=f"a-{a.id}-1", replace_existing=True)
+        return f"{prefix}: {local.strftime('%d.%m %H:%M')} seansınız var.{z}"
+    out = []
+    for kind, minutes, prefix in (("24", reminder_24m, 'Hatırlatma (24s)'), ("1", reminder_1h, 'Hatırlatma (1s)')):
+        due = start - timedelta(minutes=minutes)
+        if due > now:
+            out.append(Reminder(tenant_id=a.tenant_id, appointment_id=a.id, kind=kind, due_at=due,
+                                phone=phone, text=msg(prefix)))
+    return out
+
+# Vadesi gelen hatırlatmaları partiler halinde sahiplenip sınırlı bir thread havuzuyla gönderir.
+# Sahiplenme koşullu UPDATE ile yapılır; aynı DB'yi kullanan birden fazla süreç aynı satırı
+# iki kez göndermez. Çöken sürecin sahiplendikleri claim_timeout sonra tekrar alınabilir.
+class ReminderDispatcher:
+    def __init__(self, session_factory: Callable[[], Session], send_args: dict, batch_size: int = 100,
+                 workers: int = 4, claim_timeout: int = 300, max_attempts: int = 3):
+        self.session_factory = session_factory
+        self.send_args = send_args
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminder")
+
+    def dispatch_due(self) -> int:
+        t0 = time.perf_counter()
+        try:
+            return self._dispatch_batches()
+        finally:
+            REMINDER_DISPATCH_SECONDS.observe(time.perf_counter() - t0)
+
+    def _dispatch_batches(self) -> int:
+        sent = 0
+        while True:
+            with self.session_factory() as session:
+                batch = self._claim(session)
+                if not batch:
+                    REMINDERS_PENDING.set(session.exec(
+                        select(func.count()).select_from(Reminder).where(Reminder.status == 'pending')).one())
+                    return sent
+                results = list(self.pool.map(self._send, batch))
+                self._finish(session, batch, results)
+                sent += sum(1 for err in results if err is None)
+            if len(batch) < self.batch_size:
+                return sent
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+    def _claimable(self, now: datetime):
+        stale = now - timedelta(seconds=self.claim_timeout)
+        return and_(
+            Reminder.due_at <= now,
+            Reminder.attempts < self.max_attempts,
+            or_(Reminder.status == 'pending', and_(Reminder.status == 'claimed', Reminder.claimed_at < stale)),
+        )
+
+    def _claim(self, session: Session) -> list[Reminder]:
+        now = datetime.now(timezone.utc)
+        token = f"{self.owner}-{uuid.uuid4().hex[:8]}"
+        ids = session.exec(
+            select(Reminder.id).where(self._claimable(now)).order_by(Reminder.due_at).limit(self.batch_size)
+        ).all()
+        if not ids:
+            return []
+        # Koşul tekrar kontrol edilir: arada başka süreç aldıysa o satırlar atlanır
+        session.exec(
+            update(Reminder).where(Reminder.id.in_(ids)).where(self._claimable(now))
+            .values(status='claimed', claimed_by=token, claimed_at=now, attempts=Reminder.attempts + 1)
+        )
+        session.commit()
+        return session.exec(select(Reminder).where(Reminder.claimed_by == token).where(Reminder.status == 'claimed')).all()
+
+    def _send(self, r: Reminder) -> str | None:
+        try:
+            send_whatsapp_text(self.send_args.get('access_token', ''), self.send_args.get('phone_number_id', ''), r.phone, r.text)
+            return None
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+
+    def _finish(self, session: Session, batch: list[Reminder], results: list[str | None]):
+        now = datetime.now(timezone.utc)
+        failed = []
+        for r, err in zip(batch, results):
+            if err is None:
+                REMINDER_LAG_SECONDS.observe((now - as_utc(r.due_at)).total_seconds())
+                r.status, r.sent_at, r.last_error = 'sent', now, None
+                REMINDERS.inc(result='sent')
+                session.add(r)
+            else:
+                failed.append((r.id, r.attempts, err[:500]))
+        # Gönderilenler önce yazılır: aşağıdaki bir hata onları 'claimed' bırakıp claim_timeout
+        # sonra tekrar gönderilmelerine yol açmasın
+        session.commit()
+        for rid, attempts, err in failed:
+            # Deneme hakkı kaldıysa geri bekleyene al, biraz geciktirerek
+            if attempts < self.max_attempts:
+                values = {"status": 'pending', "due_at": now + timedelta(seconds=30 * attempts)}
+            else:
+                values = {"status": 'failed'}
+            try:
+                session.exec(update(Reminder).where(Reminder.id == rid).values(last_error=err, **values))
+                session.commit()
+            except IntegrityError:
+                # Sahiplenilmişken randevu yeniden kuruldu: aynı tür için yeni bekleyen satır var, bu kopya emekli
+                session.rollback()
+                values = {"status": 'superseded'}
+                session.exec(update(Reminder).where(Reminder.id == rid).values(last_error=err, **values))
+                session.commit()
+            REMINDERS.inc(result='retry' if values["status"] == 'pending' else values["status"])
@@ -0,0 +1,237 @@
+import heapq, logging
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from zoneinfo import ZoneInfo
+from sqlalchemy import or_, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from .archive import archived_overrides
+from .logic import as_utc
+from .models import Appointment, AppointmentSeries, Client
+
+# Tekrarlayan randevular tek satır (AppointmentSeries) olarak saklanır; oturumlar sadece
+# sorgulanan pencere için RRULE'dan açılır. Tek oturuma dair her şey (iptal, taşıma,
+# hatırlatma için somutlaşma) series_id + occurrence_start taşıyan bir Appointment satırıdır;
+# o oturum artık açılımdan değil satırdan gelir.
+
+log = logging.getLogger(__name__)
+
+ALLOWED_FREQ = ("DAILY", "WEEKLY", "MONTHLY")
+MAX_COUNT = 1000
+MAX_DURATION = timedelta(hours=12)  # istisna araması bu kadar geriye bakar
+CACHE_SPAN = timedelta(days=2 * 366)  # kural başına önceden açılıp saklanan süre
+
+@dataclass
+class Occurrence:
+    series_id: int
+    client_id: int
+    start: datetime
+    end: datetime
+    phone: str | None = None
+    status: str = "confirmed"
+
+    @property
+    def sort_key(self) -> tuple[datetime, int]:
+        # Keyset sayfalamada satırlarla aynı sırada: id yerine -series_id (satır id'leriyle çakışmaz)
+        return self.start, -self.series_id
+
+def normalize_rrule(text: str) -> str:
+    # 'RRULE:FREQ=WEEKLY;COUNT=10' → 'FREQ=WEEKLY;COUNT=10'; geçersizse ValueError
+    text = text.strip().upper().removeprefix("RRULE:")
+    parts = dict(p.split("=", 1) for p in text.split(";") if "=" in p)
+    if parts.get("FREQ") not in ALLOWED_FREQ:
+        raise ValueError(f"FREQ {'/'.join(ALLOWED_FREQ)} olmalı")
+    if "DTSTART" in parts:
+        raise ValueError("DTSTART verilmez; başlangıç ayrı alan")
+    if "COUNT" in parts and not 0 < int(parts["COUNT"]) <= MAX_COUNT:
+        raise ValueError(f"COUNT 1..{MAX_COUNT} olmalı")
+    _rule(text, datetime(2000, 1, 1))  # dateutil ayrıştırabiliyor mu
+    return text
+
+@lru_cache(maxsize=4096)
+def _rule(rrule: str, dtstart: datetime):
+    # dtstart yerel duvar saati (naive); seri başına ayrıştırma bir kez
+    from dateutil.rrule import rrulestr
+    return rrulestr(rrule, dtstart=dtstart)
+
+@lru_cache(maxsize=1024)
+def _starts(rrule: str, dtstart: datetime) -> tuple[list[datetime], datetime | None]:
+    # dateutil her sorguda DTSTART'tan itibaren sayar; bunun yerine ilk CACHE_SPAN içindeki
+    # (yerel) başlangıçlar bir kez açılır, pencere araması bisect ile yapılır.
+    # İkinci değer: listenin kesildiği an (None → kural burada bitiyor, liste tam)
+    limit = dtstart + CACHE_SPAN
+    out = []
+    for occ in _rule(rrule, dtstart):
+        if occ > limit:
+            return out, limit
+        out.append(occ)
+    return out, None
+
+def _iter_local(series: AppointmentSeries, zi: ZoneInfo, after: datetime):
+    # after (yerel, dahil) ve sonrasındaki yerel başlangıçlar, sıralı ve tembel
+    dtstart = _local(series.start, zi)
+    starts, limit = _starts(series.rrule, dtstart)
+    for k in range(bisect_left(starts, after), len(starts)):
+        yield starts[k]
+    if limit is not None:
+        # Önbellek ufkunun ötesi (nadir): dateutil'e bırak
+        yield from _rule(series.rrule, dtstart).xafter(max(after, limit), inc=after > limit)
+
+@lru_cache(maxsize=4096)
+def _local(dt: datetime, zi: ZoneInfo) -> datetime:
+    # Aynı pencere sınırı / DTSTART her seri için tekrar dönüştürülmesin
+    return as_utc(dt).astimezone(zi).replace(tzinfo=None)
+
+def _utc(local: datetime, zi: ZoneInfo) -> datetime:
+    return local.replace(tzinfo=zi).astimezone(timezone.utc)
+
+def rule_of(series: AppointmentSeries):
+    return _rule(series.rrule, _local(series.start, ZoneInfo(series.tz)))
+
+def expand(series: AppointmentSeries, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    # [start, end) ile kesişen oturumlar (başlangıç, bitiş), UTC
+    zi = ZoneInfo(series.tz)
+    dur = timedelta(minutes=series.duration_minutes)
+    hi = _local(end, zi)
+    out = []
+    for occ in _iter_local(series, zi, _local(start - dur, zi)):
+        if occ > hi:
+            break
+        s = _utc(occ, zi)
+        if s < end and s + dur > start:
+            out.append((s, s + dur))
+    return out
+
+def series_until(series: AppointmentSeries) -> datetime | None:
+    # Sonlu kurallarda son oturumun bitişi (pencere sorgularında seriyi elemek için)
+    if "COUNT=" not in series.rrule and "UNTIL=" not in series.rrule:
+        return None
+    last = None
+    for last in rule_of(series):
+        pass
+    if last is None:
+        return as_utc(series.start)
+    return _utc(last, ZoneInfo(series.tz)) + timedelta(minutes=series.duration_minutes)
+
+def _active_series(tenant_id: int | None, start: datetime, end: datetime | None, client_id: int | None = None):
+    # Açılım için gereken kolonlar (ORM nesnesi kurmadan); satırlar expand()'e seri yerine geçer
+    q = select(AppointmentSeries.id, AppointmentSeries.client_id, AppointmentSeries.start,
+               AppointmentSeries.duration_minutes, AppointmentSeries.rrule, AppointmentSeries.tz, Client.phone)
+    q = q.join(Client, Client.id == AppointmentSeries.client_id, isouter=True)
+    q = q.where(AppointmentSeries.status == "active")
+    if tenant_id is not None:
+        q = q.where(AppointmentSeries.tenant_id == tenant_id)
+    if client_id is not None:
+        q = q.where(AppointmentSeries.client_id == client_id)
+    if end is not None:
+        q = q.where(AppointmentSeries.start < end)
+    return q.where(or_(AppointmentSeries.until.is_(None), AppointmentSeries.until > start))
+
+def _overridden(session: Session, series_ids: list[int], start: datetime, end: datetime | None) -> set:
+    # Satırı olan oturumlar (iptal / taşınmış / somutlaşmış) açılımdan düşer; arşive taşınmış
+    # satırlar da (gelecek pencerede arşiv dalı indeksten boş döner)
+    q = (select(Appointment.series_id, Appointment.occurrence_start)
+         .where(Appointment.series_id.in_(series_ids))
+         .where(Appointment.occurrence_start >= start - MAX_DURATION))
+    if end is not None:
+        q = q.where(Appointment.occurrence_start < end)
+    q = union_all(q, archived_overrides(series_ids, start - MAX_DURATION, end))
+    return {(sid, as_utc(os)) for sid, os in session.execute(q).all()}
+
+def occurrences(session: Session, tenant_id: int | None, start: datetime, end: datetime) -> list[Occurrence]:
+    # Penceredeki satıra dönüşmemiş oturumlar; sorgu sayısı seri / oturum sayısından bağımsız (en fazla 2)
+    rows = session.exec(_active_series(tenant_id, start, end)).all()
+    if not rows:
+        return []
+    skip = _overridden(session, [s.id for s in rows], start, end)
+    out = [Occurrence(s.id, s.client_id, os, oe, s.phone)
+           for s in rows for os, oe in expand(s, start, end) if (s.id, os) not in skip]
+    out.sort(key=lambda o: o.sort_key)
+    return out
+
+def upcoming_occurrences(session: Session, tenant_id: int, start_from: datetime, start_to: datetime | None,
+                         after: tuple[datetime, int] | None, limit: int) -> list[Occurrence]:
+    # Sayfalı liste için: start_from (ve imleç) sonrasındaki ilk `limit` oturum. Bitişi olmayan
+    # pencerede de her seri tembel açılır ve heapq.merge ile sadece gereken kadar okunur.
+    rows = session.exec(_active_series(tenant_id, start_from, start_to)).all()
+    if not rows:
+        return []
+    skip = _overridden(session, [s.id for s in rows], start_from, start_to)
+
+    def _gen(s):
+        zi = ZoneInfo(s.tz)
+        dur = timedelta(minutes=s.duration_minutes)
+        for occ in _iter_local(s, zi, _local(start_from, zi)):
+            os = _utc(occ, zi)
+            if start_to is not None and os >= start_to:
+                return
+            if os < start_from or (s.id, os) in skip:
+                continue
+            o = Occurrence(s.id, s.client_id, os, os + dur, s.phone)
+            if after is None or o.sort_key > after:
+                yield o
+
+    merged = heapq.merge(*(_gen(s) for s in rows), key=lambda o: o.sort_key)
+    return list(islice(merged, limit))
+
+def next_occurrence(session: Session, tenant_id: int, client_id: int, after: datetime) -> Occurrence | None:
+    rows = session.exec(_active_series(tenant_id, after, None, client_id)).all()
+    if not rows:
+        return None
+    skip = _overridden(session, [s.id for s in rows], after, None)
+    best = None
+    for s in rows:
+        zi = ZoneInfo(s.tz)
+        for occ in _iter_local(s, zi, _local(after, zi)):
+            os = _utc(occ, zi)
+            if os > after and (s.id, os) not in skip:
+                if best is None or os < best.start:
+                    best = Occurrence(s.id, s.client_id, os, os + timedelta(minutes=s.duration_minutes), s.phone)
+                break
+    return best
+
+def override(session: Session, series: AppointmentSeries, occurrence_start: datetime, status: str,
+             start: datetime | None = None, end: datetime | None = None) -> Appointment:
+    # Tek oturum için satır: iptal (status='cancelled'), taşıma ya da somutlaşma (status='confirmed').
+    # Satır zaten varsa (önceden somutlaşmış) o güncellenir. Commit çağırana ait.
+    occurrence_start = as_utc(occurrence_start)
+    appt = session.exec(select(Appointment).where(Appointment.series_id == series.id)
+                        .where(Appointment.occurrence_start == occurrence_start)).first()
+    dur = timedelta(minutes=series.duration_minutes)
+    if appt is None:
+        appt = Appointment(tenant_id=series.tenant_id, client_id=series.client_id, source=series.source,
+                           series_id=series.id, occurrence_start=occurrence_start,
+                           start=occurrence_start, end=occurrence_start + dur)
+    if start is not None:
+        appt.start, appt.end = start, end or start + dur
+    appt.status = status
+    session.add(appt)
+    return appt
+
+def is_occurrence(series: AppointmentSeries, start: datetime) -> bool:
+    start = as_utc(start)
+    return any(s == start for s, _ in expand(series, start, start + timedelta(minutes=1)))
+
+def materialize(session: Session, until: datetime, tenant_id: int | None = None) -> list[Appointment]:
+    # Şimdi..until arasındaki oturumları satıra çevirir; hatırlatmalar (Reminder.appointment_id)
+    # ve iptal akışı satır üzerinden çalışır. Ufuk kısa tutulur: depolama seri başına sabit kalır.
+    now = datetime.now(timezone.utc)
+    created = []
+    for occ in occurrences(session, tenant_id, now, until):
+        if occ.start < now:
+            continue
+        series = session.get(AppointmentSeries, occ.series_id)
+        appt = override(session, series, occ.start, "confirmed")
+        try:
+            session.commit()
+        except IntegrityError as e:
+            # Başka süreç somutlaştırdı ya da o saate başka randevu yazılmış (çakışma guard'ı)
+            session.rollback()
+            log.warning("seri %s oturumu %s somutlaşamadı: %s", occ.series_id, occ.start, e.orig)
+            continue
+        session.refresh(appt)
+        created.append(appt)
+    return created
@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import time
 
 @dataclass
@@ -18,6 +19,43 @@ class Settings:
     reminder_1h: int
     zoom_join_url: str | None
     database_url: str  # 🆕 EKLENDİ — veritabanı bağlantısı için gerekli
+    reminder_poll_seconds: int = 15
+    reminder_batch_size: int = 100
+    reminder_workers: int = 4
+    reminder_claim_timeout: int = 300
+    reminder_max_attempts: int = 3
+    availability_cache_size: int = 2048
+    availability_cache_ttl: int = 30
+    whatsapp_api_base: str = 'https://graph.facebook.com/v20.0'
+    whatsapp_timeout: float = 10.0
+    whatsapp_rate_per_sec: float = 20.0
+    whatsapp_send_workers: int = 8
+    whatsapp_max_retries: int = 3
+    inbound_workers: int = 4
+    inbound_retry_seconds: float = 1.0
+    auth_cache_size: int = 4096
+    auth_cache_ttl: int = 300
+    password_hash_workers: int = 2
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_timeout: int = 30
+    sqlite_busy_timeout: int = 5000
+    db_async: bool = False
+    metrics_enabled: bool = True
+    metrics_token: str = ''
+    slow_request_ms: int = 0
+    booking_index_size: int = 1024
+    booking_index_ttl: int = 300
+    series_materialize_seconds: int = 600
+    bulk_batch_size: int = 1000
+    events_history: int = 500
+    events_queue_size: int = 256
+    events_keepalive: int = 20
+    run_scheduler: bool = True
+    archive_after_days: int = 180
+    archive_interval_seconds: int = 3600
+    archive_batch_size: int = 500
 
 def _pt(s: str) -> time:
     h, m = s.split(':')
@@ -39,4 +77,46 @@ def load_settings() -> Settings:
         reminder_1h=int(os.getenv('REMINDER_1H', '60')),
         zoom_join_url=(os.getenv('ZOOM_JOIN_URL') or '').strip() or None,
         database_url=os.getenv('DATABASE_URL', 'sqlite:////data/app.db'),  # 🧱 varsayılan veritabanı yolu
+        reminder_poll_seconds=int(os.getenv('REMINDER_POLL_SECONDS', '15')),
+        reminder_batch_size=int(os.getenv('REMINDER_BATCH_SIZE', '100')),
+        reminder_workers=int(os.getenv('REMINDER_WORKERS', '4')),
+        reminder_claim_timeout=int(os.getenv('REMINDER_CLAIM_TIMEOUT', '300')),
+        reminder_max_attempts=int(os.getenv('REMINDER_MAX_ATTEMPTS', '3')),
+        availability_cache_size=int(os.getenv('AVAILABILITY_CACHE_SIZE', '2048')),
+        availability_cache_ttl=int(os.getenv('AVAILABILITY_CACHE_TTL', '30')),
+        whatsapp_api_base=os.getenv('WHATSAPP_API_BASE', 'https://graph.facebook.com/v20.0'),
+        whatsapp_timeout=float(os.getenv('WHATSAPP_TIMEOUT', '10')),
+        whatsapp_rate_per_sec=float(os.getenv('WHATSAPP_RATE_PER_SEC', '20')),
+        whatsapp_send_workers=int(os.getenv('WHATSAPP_SEND_WORKERS', '8')),
+        whatsapp_max_retries=int(os.getenv('WHATSAPP_MAX_RETRIES', '3')),
+        inbound_workers=int(os.getenv('INBOUND_WORKERS', '4')),
+        inbound_retry_seconds=float(os.getenv('INBOUND_RETRY_SECONDS', '1')),
+        auth_cache_size=int(os.getenv('AUTH_CACHE_SIZE', '4096')),
+        auth_cache_ttl=int(os.getenv('AUTH_CACHE_TTL', '300')),
+        password_hash_workers=int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        db_pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+        db_max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        db_pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        db_pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        sqlite_busy_timeout=int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+        db_async=os.getenv('DB_ASYNC', '0').lower() in ('1', 'true', 'yes'),
+        metrics_enabled=os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes'),
+        metrics_token=os.getenv('METRICS_TOKEN', ''),
+        slow_request_ms=int(os.getenv('SLOW_REQUEST_MS', '0')),
+        booking_index_size=int(os.getenv('BOOKING_INDEX_SIZE', '1024')),
+        booking_index_ttl=int(os.getenv('BOOKING_INDEX_TTL', '300')),
+        series_materialize_seconds=int(os.getenv('SERIES_MATERIALIZE_SECONDS', '600')),
+        bulk_batch_size=int(os.getenv('BULK_BATCH_SIZE', '1000')),
+        events_history=int(os.getenv('EVENTS_HISTORY', '500')),
+        events_queue_size=int(os.getenv('EVENTS_QUEUE_SIZE', '256')),
+        events_keepalive=int(os.getenv('EVENTS_KEEPALIVE', '20')),
+        run_scheduler=os.getenv('RUN_SCHEDULER', '1').lower() in ('1', 'true', 'yes'),
+        archive_after_days=int(os.getenv('ARCHIVE_AFTER_DAYS', '180')),
+        archive_interval_seconds=int(os.getenv('ARCHIVE_INTERVAL_SECONDS', '3600')),
+        archive_batch_size=int(os.getenv('ARCHIVE_BATCH_SIZE', '500')),
     )
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    # Süreç başına tek okuma; db ve main aynı nesneyi kullanır
+    return load_settings()
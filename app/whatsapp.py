@@ -1,10 +1,197 @@
-import requests
+import logging, queue, random, threading, time
+from .metrics import WHATSAPP_REQUEST_SECONDS
+
+log = logging.getLogger(__name__)
+
+GRAPH_API_BASE = "https://graph.facebook.com/v20.0"
+
+class WhatsAppError(Exception):
+    def __init__(self, message: str, status: int | None = None, retryable: bool = False, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+# Basit token bucket: saniyede `rate` istek, en fazla `burst` birikim
+class TokenBucket:
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# Bağlantı havuzlu Cloud API istemcisi; phone_number_id başına hız sınırı uygular
+class WhatsAppClient:
+    def __init__(self, api_base: str = GRAPH_API_BASE, timeout: float = 10.0, rate_per_sec: float = 20.0,
+                 pool_size: int = 16):
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+        self.rate_per_sec = rate_per_sec
+        self.pool_size = pool_size
+        self._http = None
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def http(self):
+        # requests (~80 ms import) ilk gerçek gönderimde yüklenir; demo modunda hiç yüklenmez
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    http = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                    http.mount("https://", adapter)
+                    http.mount("http://", adapter)
+                    self._http = http
+        return self._http
+
+    def _bucket(self, phone_number_id: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(phone_number_id)
+            if b is None:
+                b = self._buckets[phone_number_id] = TokenBucket(self.rate_per_sec)
+            return b
+
+    def send_text(self, access_token: str, phone_number_id: str, to: str, text: str) -> dict:
+        # For demo (no token) we just mimic success:
+        if not access_token or not phone_number_id:
+            return {"ok": True, "queued": True}
+        self._bucket(phone_number_id).acquire()
+        url = f"{self.api_base}/{phone_number_id}/messages"
+        headers = {"Authorization": f"Bearer {access_token}"}
+        payload = {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": text}}
+        http = self.http
+        import requests
+        t0 = time.perf_counter()
+        try:
+            r = http.post(url, headers=headers, json=payload, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            WHATSAPP_REQUEST_SECONDS.observe(time.perf_counter() - t0, outcome="error")
+            raise WhatsAppError(str(e), retryable=True) from e
+        WHATSAPP_REQUEST_SECONDS.observe(time.perf_counter() - t0, outcome=str(r.status_code))
+        if r.status_code == 429 or r.status_code >= 500:
+            retry_after = r.headers.get("Retry-After")
+            raise WhatsAppError(f"HTTP {r.status_code}", status=r.status_code, retryable=True,
+                                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+        if r.status_code >= 400:
+            raise WhatsAppError(f"HTTP {r.status_code}: {r.text[:200]}", status=r.status_code)
+        return r.json()
+
+    def send_with_retry(self, access_token: str, phone_number_id: str, to: str, text: str,
+                        max_retries: int = 3, backoff: float = 0.5) -> dict:
+        attempt = 0
+        while True:
+            try:
+                return self.send_text(access_token, phone_number_id, to, text)
+            except WhatsAppError as e:
+                if not e.retryable or attempt >= max_retries:
+                    raise
+                delay = e.retry_after if e.retry_after is not None else backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, backoff / 2))
+                attempt += 1
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+
+_client = WhatsAppClient()
+
+def configure(api_base: str = GRAPH_API_BASE, timeout: float = 10.0, rate_per_sec: float = 20.0, pool_size: int = 16) -> WhatsAppClient:
+    global _client
+    _client.close()
+    _client = WhatsAppClient(api_base, timeout, rate_per_sec, pool_size)
+    return _client
+
+def get_client() -> WhatsAppClient:
+    return _client
 
 def send_whatsapp_text(access_token: str, phone_number_id: str, to: str, text: str):
-    # Real Cloud API call (uncomment to use production):
-    # url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
-    # headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-    # payload = {"messaging_product":"whatsapp", "to": to, "type":"text", "text":{"body": text}}
-    # return requests.post(url, headers=headers, json=payload, timeout=10).json()
-    # For demo (no token) we just mimic success:
-    return {"ok": True, "queued": True}
+    # Tek deneme, senkron; hata durumunda WhatsAppError fırlatır
+    return _client.send_text(access_token, phone_number_id, to, text)
+
+# Süreç içi gönderim kuyruğu: handler'lar enqueue edip hemen döner.
+# Her alıcı telefon tek bir worker'a düşer (hash), böylece aynı kişiye giden mesajların sırası korunur.
+class Outbox:
+    def __init__(self, client: WhatsAppClient | None = None, workers: int = 8, maxsize: int = 10000,
+                 max_retries: int = 3, backoff: float = 0.5):
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queues = [queue.Queue(maxsize=max(1, maxsize // workers)) for _ in range(workers)]
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.sent = self.failed = self.dropped = 0
+
+    def start(self):
+        if self._threads:
+            return
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(target=self._run, args=(q,), name=f"wa-outbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        for q in self._queues:
+            try:
+                q.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def enqueue(self, access_token: str, phone_number_id: str, to: str, text: str) -> bool:
+        if not access_token or not phone_number_id:
+            return False
+        q = self._queues[hash(to) % len(self._queues)]
+        try:
+            q.put_nowait((access_token, phone_number_id, to, text))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            log.warning("whatsapp outbox dolu; mesaj düşürüldü (to=%s)", to)
+            return False
+
+    def join(self):
+        # Kuyruklar boşalana kadar bekle (test / benchmark için)
+        for q in self._queues:
+            q.join()
+
+    def _run(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            try:
+                if item is None:
+                    return
+                client = self.client or get_client()
+                try:
+                    client.send_with_retry(*item, max_retries=self.max_retries, backoff=self.backoff)
+                    with self._lock:
+                        self.sent += 1
+                except Exception as e:
+                    with self._lock:
+                        self.failed += 1
+                    log.warning("whatsapp gönderimi başarısız (to=%s): %s", item[2], e)
+            finally:
+                q.task_done()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"queued": sum(q.qsize() for q in self._queues), "sent": self.sent,
+                    "failed": self.failed, "dropped": self.dropped, "workers": len(self._queues)}
@@ -0,0 +1,109 @@
+# Sıcak / soğuk depo: yıllarca birikmiş geçmiş randevu varken sıcak sorgular, arşivlemeden önce
+# ve sonra. Tenant başına sabit gelecek yükü (--future) + büyüyen geçmiş (--history).
+#   busy_7d      : busy_from_db, önümüzdeki rastgele 7 günlük pencere
+#   upcoming     : yaklaşan randevular ilk sayfa (20)
+#   cancel_lookup: WhatsApp 'iptal' araması (danışanın sıradaki onaylı randevusu)
+#   schedule_all : hatırlatmaların baştan kurulumu
+#   history      : geçmiş listesi ilk sayfa (sıcak + arşiv birleşimi)
+#   archive      : arşivleme süresi ve satır/s
+#   hot_kb       : appointment tablosu + indekslerinin kapladığı sayfalar (SQLite dbstat)
+#
+#   python -m bench.archive --history 10000,100000 --out bench/results/archive.json
+import argparse, os, random, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.archive import archive_before, history_query
+from app.logic import busy_from_db, list_appointments
+from app.models import Appointment, AppointmentArchive, Client, Tenant
+from app.scheduler import schedule_all
+from bench.results import summarize, timed, report, emit
+
+def _setup(path: str, history: int, future: int, clients: int, rnd: random.Random):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    with Session(engine) as s:
+        t = Tenant(name="bench", tenant_key="archive")
+        s.add(t); s.flush()
+        s.execute(insert(Client), [{"tenant_id": t.id, "phone": f"+90555{i:07d}"} for i in range(clients)])
+        client_ids = s.exec(select(Client.id).where(Client.tenant_id == t.id)).all()
+        # Saatlik çakışmasız slotlar: geçmiş şimdiden geriye, gelecek ileriye
+        rows = [{"tenant_id": t.id, "client_id": rnd.choice(client_ids), "start": now + timedelta(hours=h),
+                 "end": now + timedelta(hours=h, minutes=50), "source": "manual",
+                 "status": "cancelled" if rnd.random() < .15 else "confirmed"}
+                for h in list(range(-history, 0)) + list(range(1, future + 1))]
+        for i in range(0, len(rows), 5000):
+            s.execute(insert(Appointment), rows[i:i + 5000])
+        s.commit()
+        return engine, t.id, client_ids, now
+
+def _hot_kb(s: Session) -> float | None:
+    # dbstat derlenmemişse None
+    try:
+        size = s.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = 'appointment' "
+                              "OR name LIKE 'ix_appointment_%' OR name LIKE 'ux_appointment_%'")).scalar()
+    except OperationalError:
+        s.rollback()
+        return None
+    return round(size / 1024, 1)
+
+def _measure(s: Session, tenant_id: int, client_ids: list[int], now: datetime, future: int, repeat: int,
+             rnd: random.Random) -> dict:
+    out = {"hot_kb": _hot_kb(s)}
+
+    def _busy():
+        start = now + timedelta(hours=rnd.randrange(0, max(1, future - 7 * 24)))
+        busy_from_db(s, tenant_id, start, start + timedelta(days=7))
+    out["busy_7d"] = summarize(timed(_busy, repeat))
+    out["upcoming"] = summarize(timed(lambda: list_appointments(s, tenant_id, now, limit=20), repeat))
+
+    def _cancel():
+        s.exec(select(Appointment).where(Appointment.tenant_id == tenant_id)
+               .where(Appointment.client_id == rnd.choice(client_ids)).where(Appointment.status == 'confirmed')
+               .where(Appointment.start > now).order_by(Appointment.start)).first()
+    out["cancel_lookup"] = summarize(timed(_cancel, repeat))
+    out["schedule_all"] = summarize(timed(lambda: schedule_all(s, 1440, 60, None), 3))
+    out["history"] = summarize(timed(lambda: s.execute(history_query(tenant_id, now, limit=20)).all(), repeat))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--history", default="10000,100000", help="geçmiş randevu sayıları (saatlik)")
+    ap.add_argument("--future", type=int, default=500)
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--after-days", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    results = {}
+    for n in map(int, args.history.split(",")):
+        rnd = random.Random(args.seed)
+        path = f"{tmp}/archive-{n}.db"
+        engine, tenant_id, client_ids, now = _setup(path, n, args.future, args.clients, rnd)
+        out = results[f"history_{n}"] = {}
+        with Session(engine) as s:
+            out["before"] = _measure(s, tenant_id, client_ids, now, args.future, args.repeat, rnd)
+            t0 = time.perf_counter()
+            moved = archive_before(s, now - timedelta(days=args.after_days))
+            elapsed = time.perf_counter() - t0
+            out["archive"] = {"moved": moved, "seconds": round(elapsed, 3),
+                              "rows_per_s": round(moved / elapsed, 1) if elapsed else None}
+            out["hot_rows"] = s.exec(select(func.count()).select_from(Appointment)).one()
+            out["archive_rows"] = s.exec(select(func.count()).select_from(AppointmentArchive)).one()
+            out["after"] = _measure(s, tenant_id, client_ids, now, args.future, args.repeat, rnd)
+        engine.dispose()
+        os.remove(path)
+
+    params = dict(vars(args))
+    params.pop("out")
+    emit(report("archive", params, results, database_url="sqlite://"), args.out)
+
+if __name__ == "__main__":
+    main()
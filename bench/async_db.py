@@ -0,0 +1,96 @@
+# Async endpoint'lerin DB yolu: DB_ASYNC=0 (senkron session, thread havuzu) ile
+# DB_ASYNC=1 (aiosqlite / asyncpg) karşılaştırması. Her mod için tek worker'lı uvicorn
+# başlatılır; randevu oluşturma + webhook karışık yükü altında istek/sn ve gecikme ölçülür.
+#
+#   python -m bench.async_db --requests 2000 --concurrency 20
+import argparse, asyncio, os, socket, subprocess, sys, tempfile, time
+from datetime import datetime, timedelta
+
+import httpx
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+async def _wait_ready(base: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base) as c:
+        while time.monotonic() < deadline:
+            try:
+                if (await c.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn başlamadı")
+
+async def _load(base: str, n: int, concurrency: int) -> tuple[float, list[float], int]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as c:
+        r = await c.post("/api/auth/signup", json={"email": "bench@example.com", "password": "bench-pass"})
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+        tenant_key = r.json()["tenant_key"]
+        base_day = datetime(2031, 1, 1, 9, 0)
+        counter = iter(range(n))
+        lat: list[float] = []
+        errors = 0
+
+        async def one(i: int):
+            nonlocal errors
+            t0 = time.perf_counter()
+            try:
+                if i % 2:
+                    start = base_day + timedelta(hours=i)
+                    r = await c.post("/api/appointments", headers=headers,
+                                     json={"phone": f"+90555{i % 500:07d}", "start": start.isoformat()})
+                else:
+                    body = {"entry": [{"changes": [{"value": {"messages": [
+                        {"id": f"wamid.{i}", "from": f"+90555{i % 500:07d}", "text": {"body": "merhaba"}}]}}]}]}
+                    r = await c.post(f"/whatsapp/webhook/{tenant_key}", json=body)
+                ok = r.status_code == 200
+            except httpx.TransportError:
+                ok = False
+            lat.append(time.perf_counter() - t0)
+            # SQLite tek yazarlı: aşırı yazma yükünde busy_timeout aşılabilir
+            errors += not ok
+
+        async def worker():
+            for i in counter:
+                await one(i)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - t0, lat, errors
+
+def _run_mode(db_async: bool, n: int, concurrency: int) -> str:
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/async.db",
+               DB_ASYNC="1" if db_async else "0", WHATSAPP_ACCESS_TOKEN="", REMINDER_POLL_SECONDS="3600")
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--workers", "1",
+                             "--port", str(port), "--log-level", "warning", "--no-access-log", "--timeout-keep-alive", "60"],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(_wait_ready(base))
+        total, lat, errors = asyncio.run(_load(base, n, concurrency))
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    return (f"DB_ASYNC={int(db_async)}: {n / total:7.0f} req/s  p50={_pct(lat, .5):7.2f} ms "
+            f"p99={_pct(lat, .99):7.2f} ms  hata={errors}")
+
+def main_():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=20)
+    args = ap.parse_args()
+    for db_async in (False, True):
+        print(_run_mode(db_async, args.requests, args.concurrency), flush=True)
+
+if __name__ == "__main__":
+    main_()
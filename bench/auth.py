@@ -0,0 +1,53 @@
+# Kimlik doğrulanmış istek gecikmesi: AuthCache kapalı / açık.
+# /api/me uçtan uca (ASGI TestClient) ve sadece current_user bağımlılığı ölçülür.
+#
+#   python -m bench.auth --requests 2000
+import argparse, os, tempfile, time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/auth.db")
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.db import engine
+from sqlmodel import Session
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+def _run(client, headers, n):
+    lat = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        r = client.get("/api/me", headers=headers)
+        lat.append(time.perf_counter() - t0)
+        assert r.status_code == 200, r.text
+    return lat
+
+def _dep(authorization, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with Session(engine) as s:
+            main.current_user(authorization, s)
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main_():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    args = ap.parse_args()
+    with TestClient(main.app) as client:
+        r = client.post("/api/auth/signup", json={"email": "bench@example.com", "password": "bench-pass"})
+        authorization = "Bearer " + r.json()["access_token"]
+        headers = {"Authorization": authorization}
+        for enabled in (False, True):
+            main.auth_cache.enabled = enabled
+            _run(client, headers, 50)  # ısınma
+            lat = _run(client, headers, args.requests)
+            dep = _dep(authorization, args.requests)
+            print(f"auth cache {'on ' if enabled else 'off'}: /api/me p50={_pct(lat, .5):6.3f} ms "
+                  f"p99={_pct(lat, .99):6.3f} ms  current_user={dep:7.1f} µs")
+        print(main.auth_cache.stats()["tokens"])
+
+if __name__ == "__main__":
+    main_()
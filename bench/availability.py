@@ -0,0 +1,56 @@
+# Boş slot hesabı: eski gün-gün working_slots + iç içe any(...) taraması ile
+# yeni tek geçişli free_slots karşılaştırması.
+#
+#   python -m bench.availability --days 31 --slot 15
+import argparse, random, time
+from datetime import date, datetime, timedelta, time as dtime, timezone
+
+from app.logic import working_slots, free_slots, local_day_bounds
+
+TZ = "Europe/Istanbul"
+
+def _busy(first_day: date, days: int, per_day: int, seed: int = 1):
+    rnd = random.Random(seed)
+    start, _ = local_day_bounds(first_day, first_day, TZ)
+    out = []
+    for d in range(days):
+        base = start + timedelta(days=d, hours=9)
+        for _ in range(per_day):
+            s = base + timedelta(minutes=15 * rnd.randrange(36))
+            out.append((s, s + timedelta(minutes=rnd.choice((30, 45, 60)))))
+    return out
+
+def naive(first_day, days, ws, we, slot, busy):
+    out = []
+    for d in range(days):
+        day = datetime.combine(first_day + timedelta(days=d), dtime(12, 0), timezone.utc)
+        avail = working_slots(day, ws, we, slot, TZ)
+        out += [(s, e) for (s, e) in avail if not any(max(s, b1) < min(e, b2) for (b1, b2) in busy)]
+    return out
+
+def _time(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        r = fn()
+    return (time.perf_counter() - t0) / repeat * 1000, r
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=31)
+    ap.add_argument("--slot", type=int, default=15)
+    ap.add_argument("--busy-per-day", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    first = date(2030, 1, 7)
+    ws, we = dtime(9, 0), dtime(18, 0)
+    busy = _busy(first, args.days, args.busy_per_day)
+    old_ms, old = _time(lambda: naive(first, args.days, ws, we, args.slot, busy), args.repeat)
+    new_ms, new = _time(lambda: free_slots(first, first + timedelta(days=args.days - 1), ws, we, args.slot, TZ, busy), args.repeat)
+    assert old == new, "sonuçlar farklı"
+    print(f"days={args.days} slot={args.slot}m busy={len(busy)} free={len(new)}")
+    print(f"  working_slots + any(): {old_ms:9.2f} ms")
+    print(f"  free_slots:            {new_ms:9.2f} ms  ({old_ms / new_ms:.0f}x)")
+
+if __name__ == "__main__":
+    main()
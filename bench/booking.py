@@ -0,0 +1,87 @@
+# Çakışma kontrolü: eski doğrusal tarama (any(...) / meşgul listesi) ile tenant aralık
+# indeksinin (app.booking.IntervalIndex) karşılaştırması ve DB guard'ının yarış testi.
+#   overlap_linear / overlap_index : N onaylı randevu üzerinde tek çakışma sorusu
+#   race : aynı slota eşzamanlı K rezervasyon, her biri ayrı (boş) süreç indeksiyle;
+#          sadece biri başarılı olmalı (karar DB'de)
+#
+#   python -m bench.booking --sizes 100,1000,10000 --out bench/results/booking.json
+import argparse, os, random, tempfile, threading
+from datetime import datetime, timedelta, timezone
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/booking.db"
+
+from sqlmodel import Session
+
+from app.booking import BookingConflict, BookingIndex, IntervalIndex, book_appointment
+from app.db import engine, init_db
+from app.models import Client, Tenant
+from bench.results import summarize, timed, report, emit
+
+def _intervals(n: int, rnd: random.Random):
+    # Çakışmayan 50 dk'lık randevular, saat başı slotlarda
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    hours = sorted(rnd.sample(range(n * 2), n))
+    return [(base + timedelta(hours=h), base + timedelta(hours=h, minutes=50), i) for i, h in enumerate(hours)]
+
+def _race(contenders: int) -> dict:
+    with Session(engine) as s:
+        t = Tenant(name="bench", tenant_key=f"booking-{os.getpid()}")
+        s.add(t); s.flush()
+        c = Client(tenant_id=t.id, phone="+900000000000")
+        s.add(c); s.commit()
+        tenant_id, client_id = t.id, c.id
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+    results = []
+    barrier = threading.Barrier(contenders)
+
+    def _book():
+        with Session(engine) as s:
+            barrier.wait()
+            try:
+                book_appointment(s, BookingIndex(), tenant_id, client_id, start, start + timedelta(hours=1), "manual")
+                results.append("ok")
+            except BookingConflict:
+                results.append("conflict")
+
+    threads = [threading.Thread(target=_book) for _ in range(contenders)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return {"contenders": contenders, "booked": results.count("ok"), "conflicts": results.count("conflict")}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="100,1000,10000")
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--contenders", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    results = {}
+    for n in map(int, args.sizes.split(",")):
+        items = _intervals(n, rnd)
+        busy = [(s, e) for s, e, _ in items]
+        idx = IntervalIndex(items)
+        queries = [(s + timedelta(minutes=rnd.choice((0, 30, 55))), s + timedelta(minutes=rnd.choice((60, 90))))
+                   for s, _, _ in rnd.choices(items, k=args.repeat)]
+        q = iter(queries * 2)
+        results[f"overlap_linear_{n}"] = summarize(timed(
+            lambda: (lambda s, e: any(max(s, b1) < min(e, b2) for b1, b2 in busy))(*next(q)), args.repeat))
+        q = iter(queries * 2)
+        results[f"overlap_index_{n}"] = summarize(timed(lambda: idx.overlaps(*next(q)), args.repeat))
+        mismatches = sum(idx.overlaps(s, e) != any(max(s, b1) < min(e, b2) for b1, b2 in busy) for s, e in queries[:200])
+        results[f"overlap_index_{n}"]["mismatches"] = mismatches
+
+    init_db()
+    results["race"] = _race(args.contenders)
+
+    params = dict(vars(args))
+    params.pop("out")
+    emit(report("booking", params, results), args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Toplu içe / dışa aktarma: tek tek rezervasyon yolu (POST /api/appointments'ın yaptığı:
+# ensure_client + book_appointment + schedule_appointment) ile app.bulk parti yolunun karşılaştırması.
+#   per_row / batch : N randevunun yazılması (rows_per_s), batch hatırlatma kurulumu dahil
+#   export_all / export_stream : tüm tablonun .all() ile okunması vs yield_per akışı; tepe bellek (tracemalloc)
+#
+#   python -m bench.bulk --rows 5000 --out bench/results/bulk.json
+import argparse, json, tempfile, time, tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import SQLModel, Session, create_engine
+
+from app import bulk
+from app.booking import BookingIndex, book_appointment, is_overlap_error
+from app.logic import ensure_client
+from app.models import Tenant
+from app.scheduler import schedule_appointment, schedule_appointments
+from bench.results import report, emit
+
+def _records(n: int, clients: int) -> list[dict]:
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=3)
+    return [{"phone": f"+90555{i % clients:07d}", "name": f"Danışan {i % clients}",
+             "start": base + timedelta(hours=i), "end": base + timedelta(hours=i, minutes=50),
+             "status": "confirmed", "source": "import"} for i in range(n)]
+
+def _engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as s:
+        t = Tenant(name="bench", tenant_key="bulk")
+        s.add(t); s.commit()
+        return engine, t.id
+
+def _per_row(s: Session, tenant_id: int, records: list[dict]):
+    index = BookingIndex()
+    for r in records:
+        c = ensure_client(s, tenant_id, r["phone"], r["name"])
+        a = book_appointment(s, index, tenant_id, c.id, r["start"], r["end"], r["source"])
+        schedule_appointment(a, s, 1440, 60, None)
+
+def _batch(s: Session, tenant_id: int, records: list[dict], batch_size: int):
+    result = bulk.ImportResult()
+    for i in range(0, len(records), batch_size):
+        chunk = list(enumerate(records[i:i + batch_size], i + 1))
+        bulk.import_appointment_batch(s, tenant_id, chunk, result, is_overlap_error)
+    schedule_appointments(s, result.future_ids, 1440, 60, None)
+    assert result.imported == len(records), result.summary()
+
+def _peak(fn) -> tuple[float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(elapsed * 1000, 1), round(peak / 1024 / 1024, 2)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--clients", type=int, default=500)
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    records = _records(args.rows, args.clients)
+    results = {}
+    for mode in ("per_row", "batch"):
+        engine, tenant_id = _engine(f"{tmp}/{mode}.db")
+        with Session(engine) as s:
+            t0 = time.perf_counter()
+            if mode == "per_row":
+                _per_row(s, tenant_id, records)
+            else:
+                _batch(s, tenant_id, records, args.batch_size)
+            elapsed = time.perf_counter() - t0
+        results[mode] = {"rows": args.rows, "elapsed_s": round(elapsed, 3), "rows_per_s": round(args.rows / elapsed, 1)}
+        if mode == "per_row":
+            engine.dispose()
+
+    query = bulk.appointments_export_query(tenant_id, None, None)
+    def _all():
+        # Eski yol: tüm satırlar belleğe, gövde tek seferde
+        with Session(engine) as s:
+            rows = s.execute(query).all()
+            "".join(json.dumps(dict(zip(bulk.APPOINTMENT_COLUMNS, map(bulk.cell, r))), ensure_ascii=False) + "\n"
+                    for r in rows)
+    def _stream():
+        for _ in bulk.stream_rows(lambda: Session(engine), query, bulk.APPOINTMENT_COLUMNS, "ndjson", args.batch_size):
+            pass
+    for name, fn in (("export_all", _all), ("export_stream", _stream)):
+        ms, mb = _peak(fn)
+        results[name] = {"elapsed_ms": ms, "peak_mb": mb}
+    engine.dispose()
+
+    params = dict(vars(args))
+    params.pop("out")
+    emit(report("bulk", params, results, database_url="sqlite://"), args.out)
+
+if __name__ == "__main__":
+    main()
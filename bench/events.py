@@ -0,0 +1,70 @@
+# Değişiklik akışı (app.events.ChangeFeed) yayılım maliyeti: N açık panel (abone), senkron
+# thread'den yayınlanan olaylar.
+#   fanout : yayın → son abonenin çerçeveyi alması arası gecikme
+#   publish: yayın çağrısının kendisi (yazım yoluna eklenen maliyet)
+#   memory : abone başına tracemalloc artışı
+#
+#   python -m bench.events --subscribers 100,500,1000 --events 200 --out bench/results/events.json
+import argparse, asyncio, time, tracemalloc
+
+from app.events import ChangeFeed
+from bench.results import summarize, report, emit
+
+async def _run(subscribers: int, events: int) -> dict:
+    feed = ChangeFeed(history=events, queue_size=events + 1)
+    received = [0] * subscribers
+    finished = [0]
+    all_in = asyncio.Event()
+
+    async def _consume(i: int):
+        async for frame in feed.stream(1, None, keepalive=60):
+            if frame.startswith(b"id:"):
+                received[i] += frame.count(b"\n\n")  # bir çerçevede birden fazla olay olabilir
+                if received[i] >= events:
+                    finished[0] += 1
+                    if finished[0] == subscribers:
+                        all_in.set()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(_consume(i)) for i in range(subscribers)]
+    await asyncio.sleep(0.1)
+    per_sub = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    fanout, publish = [], []
+    loop = asyncio.get_running_loop()
+
+    def _publisher():
+        for n in range(events):
+            target = n + 1
+            t0 = time.perf_counter()
+            feed.publish(1, "appointment.created", appointment={"id": n, "start": "2030-01-01T09:00:00+00:00"})
+            publish.append(time.perf_counter() - t0)
+            # Tüm aboneler bu olayı alana kadar bekle (gecikme ölçümü)
+            while min(received) < target:
+                time.sleep(0.0002)
+            fanout.append(time.perf_counter() - t0)
+
+    await loop.run_in_executor(None, _publisher)
+    await asyncio.wait_for(all_in.wait(), 10)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {"fanout": summarize(fanout), "publish": summarize(publish),
+            "memory_per_subscriber_kb": round(per_sub / 1024, 2), "subscribers_left": feed.stats()["subscribers"]}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--subscribers", default="100,500,1000")
+    ap.add_argument("--events", type=int, default=200)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    results = {f"subscribers_{n}": asyncio.run(_run(n, args.events)) for n in map(int, args.subscribers.split(","))}
+    params = dict(vars(args))
+    params.pop("out")
+    emit(report("events", params, results, database_url=""), args.out)
+
+if __name__ == "__main__":
+    main()
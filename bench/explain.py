@@ -0,0 +1,105 @@
+# Sıcak sorguların indeks kullandığını EXPLAIN ile doğrular (SQLite / Postgres).
+# Önce indekssiz "eski" şema kurulur, db.migrate() ile yükseltilir, sonra her sorgu planı kontrol edilir.
+# Aynı kontrol pytest'te de çalışır (tests/test_indexes.py); bu script planları yazdırır ve Postgres'te de koşar.
+#
+#   python -m bench.explain                       # geçici SQLite
+#   DATABASE_URL=postgresql+psycopg://... python -m bench.explain
+import os, sys, tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine, select as sa_select
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app import db
+from app.models import Tenant, User, Client, Appointment, Reminder
+from app.logic import appointments_page_query
+from app.archive import archived_overrides, history_query
+
+def hot_queries():
+    now = datetime.now(timezone.utc)
+    return {
+        "busy_from_db": select(Appointment).where(Appointment.tenant_id == 1).where(Appointment.start < now + timedelta(days=1))
+            .where(Appointment.end > now).where(Appointment.status == 'confirmed'),
+        "ensure_client": select(Client).where(Client.tenant_id == 1).where(Client.phone == "+900000000001"),
+        "login": select(User).where(User.email == "u1@example.com"),
+        "webhook_tenant": select(Tenant).where(Tenant.tenant_key == "key-1"),
+        "cancel_lookup": select(Appointment).where(Appointment.tenant_id == 1).where(Appointment.client_id == 1)
+            .where(Appointment.status == 'confirmed').where(Appointment.start > now).order_by(Appointment.start),
+        "upcoming": appointments_page_query(1, now, after=(now, 10), limit=20),
+        "schedule_all": select(Appointment).where(Appointment.status == 'confirmed').where(Appointment.start > now),
+        "reminder_claim": sa_select(Reminder.id).where(Reminder.status == 'pending').where(Reminder.due_at <= now)
+            .order_by(Reminder.due_at).limit(100),
+        "history": history_query(1, now, after=(now - timedelta(days=10), 10), limit=20),
+        "archived_overrides": archived_overrides([1, 2], now, now + timedelta(days=7)),
+    }
+
+def upgraded_engine(url: str) -> Engine:
+    # İndekssiz eski şema → init_db (create_all + migrate) → örnek veri + ANALYZE
+    engine = create_engine(url)
+    _create_legacy_schema(engine)
+    db.init_db(engine)
+    with Session(engine) as session:
+        _seed(session)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return engine
+
+def _create_legacy_schema(engine: Engine):
+    # Migrasyonu sınamak için tabloları indekssiz oluştur
+    saved = {t.name: set(t.indexes) for t in SQLModel.metadata.sorted_tables}
+    for t in SQLModel.metadata.sorted_tables:
+        t.indexes.clear()
+    try:
+        SQLModel.metadata.create_all(engine)
+    finally:
+        for t in SQLModel.metadata.sorted_tables:
+            t.indexes.update(saved[t.name])
+
+def _seed(session: Session, tenants: int = 20, clients: int = 50, appts: int = 20):
+    base = datetime.now(timezone.utc) - timedelta(days=30)
+    for i in range(tenants):
+        t = Tenant(name=f"t{i}", tenant_key=f"key-{i}")
+        session.add(t); session.flush()
+        session.add(User(tenant_id=t.id, email=f"u{i}@example.com", password_hash="x"))
+        for j in range(clients):
+            c = Client(tenant_id=t.id, phone=f"+90{i:04d}{j:06d}")
+            session.add(c); session.flush()
+            for k in range(appts):
+                s = base + timedelta(days=k * 3, hours=j)  # tenant içinde çakışmasız (overlap guard)
+                session.add(Appointment(tenant_id=t.id, client_id=c.id, start=s, end=s + timedelta(minutes=50),
+                                        status='confirmed' if k % 5 else 'cancelled'))
+    session.commit()
+
+def plan(conn, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})  # IN (...) listeleri
+    if conn.dialect.name == "sqlite":
+        params = tuple(compiled.construct_params()[k] for k in compiled.positiontup)
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+        return "\n".join(r[-1] for r in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + str(compiled), compiled.construct_params()).all()
+    return "\n".join(r[0] for r in rows)
+
+def uses_index(dialect: str, plan: str) -> bool:
+    if dialect == "sqlite":
+        lines = plan.splitlines()
+        # Alt sorgu (anon_N) taraması tablo taraması değil: dal zaten indeksle `limit` satır döner
+        scans = [l for l in lines if l.startswith("SCAN ") and "USING" not in l and not l.startswith("SCAN anon_")]
+        return not scans and any("USING" in l and "INDEX" in l for l in lines)
+    return "Index" in plan and "Seq Scan" not in plan
+
+def main() -> int:
+    from app import models  # noqa: F401
+    engine = upgraded_engine(os.environ.get("DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/explain.db")
+    with engine.connect() as conn:
+        failed = 0
+        for name, stmt in hot_queries().items():
+            p = plan(conn, stmt)
+            ok = uses_index(conn.dialect.name, p)
+            failed += not ok
+            print(f"[{'ok' if ok else 'FAIL'}] {name}")
+            for line in p.splitlines():
+                print(f"       {line}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
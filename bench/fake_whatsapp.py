@@ -0,0 +1,80 @@
+# Yük testleri için sahte WhatsApp Cloud API sunucusu.
+# POST /<version>/<phone_number_id>/messages isteklerine gecikmeli cevap verir; istenirse
+# bir oranda 429 döndürür.
+#
+#   python -m bench.fake_whatsapp --port 9009 --latency 0.05 --fail-rate 0.05
+#   WHATSAPP_API_BASE=http://127.0.0.1:9009/v20.0 uvicorn app.main:app
+import argparse, json, random, socket, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeWhatsApp(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, latency: float = 0.05, fail_rate: float = 0.0):
+        super().__init__(addr, _Handler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.received = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v20.0"
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: istemci bağlantı havuzunu kullanabilsin
+
+    def setup(self):
+        super().setup()
+        # Başlık ve gövde ayrı yazıldığında Nagle + gecikmeli ACK ~40 ms ekliyor
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        srv: FakeWhatsApp = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(srv.latency)
+        if srv.fail_rate and random.random() < srv.fail_rate:
+            with srv.lock:
+                srv.rejected += 1
+            return self._reply(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0"})
+        with srv.lock:
+            srv.received += 1
+            n = srv.received
+        to = json.loads(body or b"{}").get("to")
+        self._reply(200, {"messaging_product": "whatsapp", "contacts": [{"wa_id": to}], "messages": [{"id": f"wamid.{n}"}]})
+
+    def _reply(self, status: int, payload: dict, headers: dict | None = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_fake_server(port: int = 0, latency: float = 0.05, fail_rate: float = 0.0) -> FakeWhatsApp:
+    srv = FakeWhatsApp(("127.0.0.1", port), latency=latency, fail_rate=fail_rate)
+    threading.Thread(target=srv.serve_forever, name="fake-whatsapp", daemon=True).start()
+    return srv
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=9009)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    srv = FakeWhatsApp(("127.0.0.1", args.port), latency=args.latency, fail_rate=args.fail_rate)
+    print(f"fake whatsapp: {srv.url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Mesaj anlama mikro benchmark'ı: eski any(...) taraması + istisnalı dateutil.parse ile
+# app.intent (tek derlenmiş regex + çapalı tarih ayrıştırıcı) karşılaştırması.
+#
+#   python -m bench.intent --repeat 200
+import argparse, time
+from datetime import date
+
+from app.intent import parse_message
+
+TZ = "Europe/Istanbul"
+
+CORPUS = [
+    "Merhaba", "merhaba randevu almak istiyorum", "Randevu al", "Rezervasyon yapabilir miyim?",
+    "iptal", "Randevumu iptal etmek istiyorum", "CANCEL", "Bugün uygun saat var mı?",
+    "Yarın müsait misiniz", "yarin bos saat var mi", "Bu hafta uygun olduğunuz saatler neler",
+    "saat kaçta açıksınız", "teşekkürler", "Tamam, görüşmek üzere", "2025-03-14 14:00",
+    "14.03.2025 10:30", "yarın 15:00", "16:30", "İyi günler, danışmanlık ücreti nedir?",
+    "Online görüşme mi yüz yüze mi?", "Zoom linkini tekrar atar mısınız", "Geç kalacağım 10 dk",
+    "Hocam merhaba, bu hafta bir seans ayarlayabilir miyiz", "Randevum ne zamandı?",
+    "ok", "👍", "Saat 11:00 olur mu", "31.02.2025 10:00", "Cuma günü uygun musunuz",
+]
+
+def old_parse(text: str):
+    # app/main.py'deki önceki davranışın birebir kopyası
+    text_body = text.strip().lower()
+    intent = "help"
+    if any(k in text_body for k in ["randevu", "rezerv", "al"]):
+        intent = "book"
+    elif any(k in text_body for k in ["iptal", "cancel"]):
+        intent = "cancel"
+    elif any(k in text_body for k in ["bugün", "yarın", "hafta", "uygun", "saat"]):
+        intent = "availability"
+    when = None
+    try:
+        from dateutil import parser
+        when = parser.parse(text_body)
+    except Exception:
+        pass
+    return intent, when
+
+def _rate(fn, corpus, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for m in corpus:
+            fn(m)
+    return len(corpus) * repeat / (time.perf_counter() - t0)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    today = date(2025, 3, 10)
+    old = _rate(old_parse, CORPUS, args.repeat)
+    new = _rate(lambda m: parse_message(m, TZ, today), CORPUS, args.repeat)
+    print(f"corpus={len(CORPUS)} messages x {args.repeat}")
+    print(f"  any() + dateutil.parse : {old:12,.0f} msg/s")
+    print(f"  app.intent             : {new:12,.0f} msg/s  ({new / old:.1f}x)")
+
+if __name__ == "__main__":
+    main()
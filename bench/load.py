@@ -0,0 +1,146 @@
+# Uçtan uca yük sürücüsü: seed verisi üzerinde ASGI uygulamasına (süreç içi, httpx) sentetik
+# WhatsApp webhook teslimatları ve dashboard API trafiği gönderir. Giden mesajlar yerel sahte
+# WhatsApp sunucusuna (bench.fake_whatsapp) gider. Sonuç JSON: route başına ve toplam
+# istek/sn, p50/p95/p99, arka plan kuyruklarının boşalma süresi, en yüksek RSS.
+#
+#   python -m bench.load --requests 5000 --concurrency 32 --out bench/results/load.json
+import argparse, asyncio, os, random, tempfile, time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from bench.fake_whatsapp import start_fake_server
+
+def _configure_env(fake_url: str):
+    # app.main ayarları import anında okur; sahte sunucu ve veritabanı ondan önce hazır olmalı
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/load.db")
+    os.environ["WHATSAPP_API_BASE"] = fake_url
+    os.environ["WHATSAPP_ACCESS_TOKEN"] = "bench-token"
+    os.environ["WHATSAPP_PHONE_NUMBER_ID"] = "bench-pnid"
+    os.environ.setdefault("WHATSAPP_RATE_PER_SEC", "1000")
+    os.environ.setdefault("REMINDER_POLL_SECONDS", "3600")
+
+TEXTS = ("merhaba", "randevu almak istiyorum", "bugün uygun saat var mı", "yarın müsait misiniz",
+         "bu hafta boş saat", "iptal", "randevumu iptal etmek istiyorum")
+
+def _webhook_body(rnd: random.Random, n: int, phone: str, tz: ZoneInfo) -> dict:
+    if rnd.random() < 0.25:
+        # net tarih/saat → rezervasyon denemesi
+        day = datetime.now(tz).date() + timedelta(days=rnd.randrange(1, 14))
+        text = f"{day.isoformat()} {rnd.randrange(9, 18):02d}:00"
+    else:
+        text = rnd.choice(TEXTS)
+    return {"entry": [{"changes": [{"value": {"messages": [
+        {"id": f"wamid.load.{n}", "from": phone, "timestamp": str(int(time.time())), "type": "text",
+         "text": {"body": text}}]}}]}]}
+
+async def _drive(app, info, args, tz) -> tuple[dict, float]:
+    import httpx
+    rnd = random.Random(args.seed)
+    lat: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        tokens = []
+        for email in info.emails:
+            r = await client.post("/api/auth/login", json={"email": email, "password": info.password})
+            tokens.append({"Authorization": "Bearer " + r.json()["access_token"]})
+
+        # İstek planı önceden ve tohumdan üretilir: aynı --seed aynı trafik
+        plan = []
+        for n in range(args.requests):
+            i = rnd.randrange(len(info.tenant_ids))
+            phones = info.phones[info.tenant_ids[i]]
+            if rnd.random() < args.webhook_ratio:
+                phone = rnd.choice(phones) if rnd.random() < 0.8 else f"+90599{rnd.randrange(10**7):07d}"
+                plan.append(("webhook", "POST", f"/whatsapp/webhook/{info.tenant_keys[i]}", None,
+                             _webhook_body(rnd, n, phone, tz)))
+                continue
+            x = rnd.random()
+            if x < 0.40:
+                plan.append(("upcoming", "GET", "/api/appointments/upcoming?limit=20", tokens[i], None))
+            elif x < 0.75:
+                day = datetime.now(tz).date() + timedelta(days=rnd.randrange(0, 21))
+                plan.append(("availability", "GET", f"/api/availability?from={day}&to={day + timedelta(days=6)}",
+                             tokens[i], None))
+            elif x < 0.95:
+                plan.append(("me", "GET", "/api/me", tokens[i], None))
+            else:
+                start = datetime.now(tz).replace(minute=0, second=0, microsecond=0) + timedelta(days=rnd.randrange(1, 60), hours=rnd.randrange(0, 9))
+                plan.append(("create", "POST", "/api/appointments", tokens[i],
+                             {"phone": rnd.choice(phones), "start": start.isoformat()}))
+
+        it = iter(plan)
+
+        async def worker():
+            for route, method, url, headers, body in it:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.request(method, url, headers=headers, json=body)
+                    ok = r.status_code < 400 or r.status_code == 409  # 409: slot dolu, beklenen sonuç
+                except httpx.HTTPError:
+                    ok = False
+                lat[route].append(time.perf_counter() - t0)
+                errors[route] += not ok
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+    return {"lat": lat, "errors": errors}, elapsed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tenants", type=int, default=10)
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--appointments", type=int, default=400, help="tenant başına")
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--webhook-ratio", type=float, default=0.5)
+    ap.add_argument("--wa-latency", type=float, default=0.05, help="sahte WhatsApp API gecikmesi (sn)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    fake = start_fake_server(latency=args.wa_latency)
+    _configure_env(fake.url)
+
+    from app import main as app_main
+    from app.db import engine, init_db
+    from bench.results import summarize, report, emit
+    from bench.seed import seed
+
+    init_db()
+    info = seed(engine, args.tenants, args.clients, args.appointments, args.seed)
+    tz = ZoneInfo(app_main.settings.timezone)
+
+    async def _run():
+        # Açılış / kapanış uygulamanın lifespan'i ile (kuyruklar, zamanlayıcı, hatırlatma kurulumu)
+        async with app_main.lifespan(app_main.app):
+            data, elapsed = await _drive(app_main.app, info, args, tz)
+            # Webhook'lar arka planda işlenir; kuyrukların boşalmasını da ölç
+            t0 = time.perf_counter()
+            app_main.inbound.join()
+            app_main.outbox.join()
+            drain = time.perf_counter() - t0
+            background = {
+                "drain_seconds": round(drain, 3),
+                "inbound": app_main.inbound.stats(),
+                "outbox": app_main.outbox.stats(),
+                "fake_whatsapp_received": fake.received,
+            }
+        return data, elapsed, background
+
+    data, elapsed, background = asyncio.run(_run())
+    all_lat = [x for v in data["lat"].values() for x in v]
+    results = {
+        "total": summarize(all_lat, elapsed, sum(data["errors"].values())),
+        "routes": {route: summarize(v, errors=data["errors"][route]) for route, v in sorted(data["lat"].items())},
+        "background": background,
+    }
+    fake.shutdown()
+    params = dict(vars(args), total_appointments=info.appointments)
+    params.pop("out")
+    emit(report("load", params, results), args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Giriş patlaması sırasında diğer isteklerin gecikmesi: 100 eşzamanlı /api/auth/login
+# sürerken p50/p99. Şifre doğrulama event loop içinde (eski) ve thread havuzunda (yeni).
+#   /health                   : saf event loop gecikmesi
+#   /api/me                   : token doğrulama + kullanıcı / tenant (auth yolu)
+#   /api/appointments/upcoming: token + DB sorgusu (sync endpoint'lerle aynı thread havuzu)
+#
+#   python -m bench.login --logins 100
+import argparse, asyncio, os, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/login.db")
+
+import httpx
+from sqlmodel import Session
+
+from app import main
+from app.auth import verify_password, hash_password
+from app.db import engine, init_db, dispose_async_engine
+from app.models import Appointment, Client, Tenant, User
+
+PROBES = ("/health", "/api/me", "/api/appointments/upcoming")
+
+async def _inline_verify(p, h):
+    # Eski davranış: async handler içinde senkron PBKDF2
+    return verify_password(p, h)
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+async def _scenario(n_logins: int, creds: dict):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/api/auth/login", json=creds)
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        done = asyncio.Event()
+        lat = {path: [] for path in PROBES}
+
+        async def probe(path: str):
+            while not done.is_set():
+                t0 = time.perf_counter()
+                r = await client.get(path, headers=headers)
+                assert r.status_code == 200, r.text
+                lat[path].append(time.perf_counter() - t0)
+                await asyncio.sleep(0.005)
+
+        async def login():
+            r = await client.post("/api/auth/login", json=creds)
+            assert r.status_code == 200, r.text
+
+        probes = [asyncio.create_task(probe(path)) for path in PROBES]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(n_logins)))
+        total = time.perf_counter() - t0
+        done.set()
+        await asyncio.gather(*probes)
+    # DB_ASYNC=1: async havuz bu event loop'a bağlı; sonraki asyncio.run için kapat
+    await dispose_async_engine()
+    return total, lat
+
+def main_():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=100)
+    args = ap.parse_args()
+    init_db()
+    creds = {"email": "bench@example.com", "password": "bench-pass"}
+    with Session(engine) as s:
+        t = Tenant(name="bench", tenant_key="bench")
+        s.add(t); s.commit(); s.refresh(t)
+        s.add(User(tenant_id=t.id, email=creds["email"], password_hash=hash_password(creds["password"])))
+        c = Client(tenant_id=t.id, phone="+905550000000")
+        s.add(c); s.flush()
+        # Yaklaşan liste dolu bir sayfa okusun
+        now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        s.add_all(Appointment(tenant_id=t.id, client_id=c.id, start=now + timedelta(hours=h),
+                              end=now + timedelta(hours=h, minutes=50), source="manual") for h in range(1, 41))
+        s.commit()
+
+    original = main.verify_password_async
+    for label, fn in (("inline  ", _inline_verify), ("offload ", original)):
+        main.verify_password_async = fn
+        total, lat = asyncio.run(_scenario(args.logins, creds))
+        print(f"{label}: {args.logins} logins in {total:6.2f} s")
+        for path, v in lat.items():
+            print(f"  {path:28s} n={len(v):4d} p50={_pct(v, .5):7.2f} ms p99={_pct(v, .99):7.2f} ms "
+                  f"max={max(v) * 1000:7.1f} ms")
+    main.verify_password_async = original
+
+if __name__ == "__main__":
+    main_()
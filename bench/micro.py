@@ -0,0 +1,65 @@
+# Sıcak fonksiyonların mikro benchmark'ı; seed verisi üzerinde, JSON rapor.
+#   working_slots  : tek gün slot üretimi
+#   busy_from_db   : bir tenant'ın 7 günlük dolu aralıkları
+#   schedule_all   : tüm hatırlatmaların baştan kurulumu
+#   hash_password / verify_password : PBKDF2
+#
+#   python -m bench.micro --tenants 10 --appointments 400 --out bench/results/micro.json
+import argparse, os, random, tempfile, time
+from datetime import datetime, timedelta, time as dtime, timezone
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/micro.db"
+
+from sqlmodel import Session
+
+from app.auth import hash_password, verify_password
+from app.db import engine, init_db
+from app.logic import working_slots, busy_from_db
+from app.scheduler import schedule_all
+from bench.results import summarize, timed, report, emit
+from bench.seed import seed
+
+TZ = "Europe/Istanbul"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tenants", type=int, default=10)
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--appointments", type=int, default=400, help="tenant başına")
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    init_db()
+    t0 = time.perf_counter()
+    info = seed(engine, args.tenants, args.clients, args.appointments, args.seed)
+    seed_s = time.perf_counter() - t0
+    rnd = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    results = {}
+
+    results["working_slots"] = summarize(timed(
+        lambda: working_slots(now, dtime(9, 0), dtime(18, 0), 15, TZ), args.repeat * 10))
+
+    def _busy():
+        with Session(engine) as s:
+            busy_from_db(s, rnd.choice(info.tenant_ids), now, now + timedelta(days=7))
+    results["busy_from_db"] = summarize(timed(_busy, args.repeat))
+
+    def _schedule_all():
+        with Session(engine) as s:
+            schedule_all(s, 1440, 60, None)
+    results["schedule_all"] = summarize(timed(_schedule_all, max(3, args.repeat // 50)))
+
+    hashes = [hash_password(f"pw-{i}") for i in range(4)]
+    results["hash_password"] = summarize(timed(lambda: hash_password("bench-pass"), max(5, args.repeat // 10)))
+    results["verify_password"] = summarize(timed(lambda: verify_password("pw-0", hashes[0]), max(5, args.repeat // 10)))
+
+    params = dict(vars(args), seed_seconds=round(seed_s, 2), total_appointments=info.appointments)
+    params.pop("out")
+    emit(report("micro", params, results), args.out)
+
+if __name__ == "__main__":
+    main()
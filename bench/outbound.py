@@ -0,0 +1,55 @@
+# Giden WhatsApp mesajları: handler içinde senkron gönderim ile Outbox kuyruğu karşılaştırması.
+# Sahte sunucu (bench.fake_whatsapp) yerel olarak başlatılır.
+#
+#   python -m bench.outbound --messages 500 --latency 0.05 --workers 16
+import argparse, statistics, time
+
+from app.whatsapp import WhatsAppClient, Outbox
+from bench.fake_whatsapp import start_fake_server
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=500)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--rate", type=float, default=1000.0, help="phone_number_id başına saniyede mesaj")
+    args = ap.parse_args()
+
+    srv = start_fake_server(latency=args.latency, fail_rate=args.fail_rate)
+    client = WhatsAppClient(srv.url, timeout=5, rate_per_sec=args.rate, pool_size=args.workers)
+
+    # 1) Eski yol: handler mesajı kendisi gönderir (gecikme handler'a yansır)
+    n_sync = min(args.messages, 50)
+    lat = []
+    for i in range(n_sync):
+        t0 = time.perf_counter()
+        client.send_with_retry("token", "pnid", f"+90555{i:07d}", "merhaba", backoff=0.01)
+        lat.append(time.perf_counter() - t0)
+    print(f"inline send : handler p50={_pct(lat, .5):7.2f} ms  p99={_pct(lat, .99):7.2f} ms  "
+          f"throughput={n_sync / sum(lat):8.1f} msg/s")
+
+    # 2) Outbox: handler sadece kuyruğa atar
+    outbox = Outbox(client, workers=args.workers, backoff=0.01)
+    outbox.start()
+    lat = []
+    t_start = time.perf_counter()
+    for i in range(args.messages):
+        t0 = time.perf_counter()
+        outbox.enqueue("token", "pnid", f"+90555{i:07d}", "merhaba")
+        lat.append(time.perf_counter() - t0)
+    outbox.join()
+    total = time.perf_counter() - t_start
+    outbox.stop()
+    st = outbox.stats()
+    print(f"outbox      : handler p50={_pct(lat, .5):7.3f} ms  p99={_pct(lat, .99):7.3f} ms  "
+          f"throughput={st['sent'] / total:8.1f} msg/s  (sent={st['sent']} failed={st['failed']} "
+          f"429={srv.rejected}, mean enqueue {statistics.mean(lat) * 1e6:.1f} µs)")
+    srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Hatırlatma motoru benchmark'ı: randevu sayısı arttıkça tek değişiklik maliyeti
+# (schedule_appointment) sabit kalmalı; tam kurulum (schedule_all) ise doğrusal büyür.
+# Ayrıca vadesi gelmiş hatırlatmaların dispatcher ile gönderim hızı ölçülür.
+#
+#   python -m bench.reminders --sizes 100 1000 5000
+import argparse, time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.models import Tenant, Client, Appointment, Reminder
+from app.scheduler import schedule_all, schedule_appointment, ReminderDispatcher
+
+SEND_ARGS = {"access_token": "", "phone_number_id": ""}
+
+def _seed(session: Session, n: int) -> list[Appointment]:
+    t = Tenant(name="bench", tenant_key="bench")
+    session.add(t); session.commit(); session.refresh(t)
+    c = Client(tenant_id=t.id, phone="+900000000000")
+    session.add(c); session.commit(); session.refresh(c)
+    base = datetime.now(timezone.utc) + timedelta(days=2)
+    appts = [Appointment(tenant_id=t.id, client_id=c.id, start=base + timedelta(hours=i),
+                         end=base + timedelta(hours=i, minutes=50)) for i in range(n)]
+    session.add_all(appts); session.commit()
+    return appts
+
+def run(n: int, mutations: int) -> dict:
+    engine = create_engine("sqlite://", future=True)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        appts = _seed(session, n)
+        t0 = time.perf_counter()
+        jobs = schedule_all(session, 1440, 60, None)
+        full = time.perf_counter() - t0
+
+        step = max(1, n // mutations)
+        sample = [a.id for a in appts[::step][:mutations]]
+    # Her değişiklik bir istekteki gibi kendi kısa ömürlü session'ında
+    t0 = time.perf_counter()
+    for appt_id in sample:
+        with Session(engine) as s:
+            a = s.get(Appointment, appt_id)
+            a.start = a.start + timedelta(minutes=5)
+            schedule_appointment(a, s, 1440, 60, None)
+    per = (time.perf_counter() - t0) / len(sample)
+
+    with Session(engine) as session:
+
+        # Hepsini vadesi gelmiş yap ve iki dispatcher ile (iki süreç gibi) boşalt
+        session.exec(update(Reminder).values(due_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        session.commit()
+    dispatchers = [ReminderDispatcher(lambda: Session(engine), SEND_ARGS, batch_size=200, workers=4) for _ in range(2)]
+    t0 = time.perf_counter()
+    sent = sum(d.dispatch_due() for d in dispatchers)
+    dispatch = time.perf_counter() - t0
+    for d in dispatchers:
+        d.shutdown()
+    assert sent == jobs, (sent, jobs)
+    return {"appointments": n, "jobs": jobs, "full_rebuild_ms": full * 1000, "per_mutation_ms": per * 1000,
+            "dispatch_per_s": sent / dispatch if dispatch else 0.0}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    ap.add_argument("--mutations", type=int, default=100)
+    args = ap.parse_args()
+    print(f"{'appts':>8} {'jobs':>8} {'full rebuild ms':>16} {'per mutation ms':>16} {'dispatch/s':>12}")
+    for n in args.sizes:
+        r = run(n, args.mutations)
+        print(f"{r['appointments']:>8} {r['jobs']:>8} {r['full_rebuild_ms']:>16.1f} {r['per_mutation_ms']:>16.3f} {r['dispatch_per_s']:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark sonuçları için ortak ölçüm ve JSON rapor yardımcıları.
+# Raporlar zaman içinde karşılaştırılabilsin diye commit, Python sürümü, veritabanı ve
+# parametreler sonuçla birlikte yazılır.
+import json, os, platform, resource, subprocess, sys, time
+from datetime import datetime, timezone
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def summarize(latencies: list[float], elapsed: float | None = None, errors: int = 0) -> dict:
+    # latencies saniye cinsinden; rapor ms
+    n = len(latencies)
+    out = {
+        "count": n,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, .50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, .95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, .99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+    }
+    if elapsed:
+        out["throughput_per_s"] = round(n / elapsed, 1)
+    return out
+
+def timed(fn, repeat: int) -> list[float]:
+    lat = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        lat.append(time.perf_counter() - t0)
+    return lat
+
+def peak_rss_mb() -> float:
+    # Linux'ta KiB, macOS'ta byte
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def report(name: str, params: dict, results: dict, database_url: str | None = None) -> dict:
+    url = database_url or os.environ.get("DATABASE_URL", "")
+    return {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": url.split("://")[0] if url else None,
+        "params": params,
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def emit(data: dict, out: str | None = None):
+    # --out verilirse dosyaya, her durumda stdout'a yazılır
+    text = json.dumps(data, indent=2, ensure_ascii=False, default=str)
+    if out:
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w") as f:
+            f.write(text + "\n")
+    print(text)
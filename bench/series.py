@@ -0,0 +1,85 @@
+# Haftalık, bir yıllık N danışan: her oturum ayrı satır (eski yol) vs tek AppointmentSeries satırı.
+#   rows / series : tablo satır sayısı
+#   busy_7d       : busy_from_db, rastgele 7 günlük pencere
+#   upcoming      : yaklaşan randevular ilk sayfa (20)
+#   schedule_all  : hatırlatmaların baştan kurulumu
+#
+#   python -m bench.series --clients 200 --weeks 52 --out bench/results/series.json
+import argparse, random, tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.logic import busy_from_db, list_appointments
+from app.models import Appointment, AppointmentSeries, Client, Tenant
+from app.scheduler import schedule_all
+from app.series import upcoming_occurrences
+from bench.results import summarize, timed, report, emit
+
+TZ = "Europe/Istanbul"
+
+def _setup(path: str, clients: int, weeks: int, as_series: bool, rnd: random.Random):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    with Session(engine) as s:
+        t = Tenant(name="bench", tenant_key="series")
+        s.add(t); s.flush()
+        s.execute(insert(Client), [{"tenant_id": t.id, "phone": f"+90555{i:07d}"} for i in range(clients)])
+        client_ids = s.exec(select(Client.id).where(Client.tenant_id == t.id)).all()
+        # Her danışana haftada bir, çakışmayan sabit saat (gün x saat)
+        slots = rnd.sample([(d, h) for d in range(7) for h in range(24)], min(clients, 7 * 24))
+        rows = []
+        for cid, (d, h) in zip(client_ids, slots):
+            first = now + timedelta(days=d, hours=h)
+            if as_series:
+                rows.append({"tenant_id": t.id, "client_id": cid, "start": first, "duration_minutes": 50,
+                             "rrule": f"FREQ=WEEKLY;COUNT={weeks}", "tz": TZ, "source": "manual",
+                             "until": first + timedelta(weeks=weeks - 1, minutes=50)})
+            else:
+                rows += [{"tenant_id": t.id, "client_id": cid, "start": first + timedelta(weeks=w),
+                          "end": first + timedelta(weeks=w, minutes=50), "status": "confirmed", "source": "manual"}
+                         for w in range(weeks)]
+        s.execute(insert(AppointmentSeries if as_series else Appointment), rows)
+        s.commit()
+        tenant_id = t.id
+    return engine, tenant_id, now
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=150, help="en fazla 168 (haftalık çakışmayan slot)")
+    ap.add_argument("--weeks", type=int, default=52)
+    ap.add_argument("--repeat", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    results = {}
+    for mode in ("rows", "series"):
+        rnd = random.Random(args.seed)
+        engine, tenant_id, now = _setup(f"{tmp}/{mode}.db", args.clients, args.weeks, mode == "series", rnd)
+        out = results[mode] = {}
+        with Session(engine) as s:
+            out["appointment_rows"] = s.exec(select(func.count()).select_from(Appointment)).one()
+            out["series_rows"] = s.exec(select(func.count()).select_from(AppointmentSeries)).one()
+
+            def _busy():
+                start = now + timedelta(days=rnd.randrange(0, args.weeks * 7 - 7))
+                busy_from_db(s, tenant_id, start, start + timedelta(days=7))
+            out["busy_7d"] = summarize(timed(_busy, args.repeat))
+
+            def _upcoming():
+                list_appointments(s, tenant_id, now, limit=20)
+                upcoming_occurrences(s, tenant_id, now, None, None, 20)
+            out["upcoming"] = summarize(timed(_upcoming, args.repeat))
+            out["schedule_all"] = summarize(timed(lambda: schedule_all(s, 1440, 60, None), 3))
+        engine.dispose()
+
+    params = dict(vars(args))
+    params.pop("out")
+    emit(report("series", params, results, database_url="sqlite://"), args.out)
+
+if __name__ == "__main__":
+    main()
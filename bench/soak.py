@@ -0,0 +1,59 @@
+# Uzun süreli yük (soak) testi: 100k istek boyunca havuzdaki açık bağlantı sayısı ve süreç
+# belleği (RSS) düz kalmalı. Session sızıntısı olursa checked-out bağlantılar ve RSS birikir.
+#
+#   python -m bench.soak --requests 100000
+import argparse, gc, os, sys, tempfile, time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/soak.db")
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.db import engine
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def main_() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=100_000)
+    ap.add_argument("--samples", type=int, default=10)
+    ap.add_argument("--max-rss-growth", type=float, default=20.0, help="MB, ısınma sonrası")
+    args = ap.parse_args()
+
+    with TestClient(main.app) as client:
+        r = client.post("/api/auth/signup", json={"email": "soak@example.com", "password": "soak-pass"})
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+        day = date.today() + timedelta(days=1)
+        for h in range(10, 14):
+            client.post("/api/appointments", headers=headers,
+                        json={"phone": f"+9055500000{h}", "start": f"{day}T{h:02d}:00:00+03:00"})
+        paths = ["/health", "/api/me", "/api/appointments/upcoming?limit=20",
+                 f"/api/availability?from={day}&to={day + timedelta(days=6)}"]
+
+        every = max(1, args.requests // args.samples)
+        samples = []
+        t0 = time.perf_counter()
+        for i in range(1, args.requests + 1):
+            r = client.get(paths[i % len(paths)], headers=headers)
+            assert r.status_code == 200, r.text
+            if i % every == 0:
+                gc.collect()
+                samples.append((i, engine.pool.checkedout(), _rss_mb()))
+                print(f"{i:>8d} istek  checked-out={samples[-1][1]:3d}  rss={samples[-1][2]:7.1f} MB  "
+                      f"{i / (time.perf_counter() - t0):7.0f} req/s", flush=True)
+
+    leaked = max(s[1] for s in samples)
+    base = samples[min(1, len(samples) - 1)][2]  # ilk örnek ısınma sayılır
+    growth = samples[-1][2] - base
+    ok = leaked == 0 and growth <= args.max_rss_growth
+    print(f"[{'ok' if ok else 'FAIL'}] açık bağlantı (en fazla)={leaked}  rss artışı={growth:+.1f} MB")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,65 @@
+# Uygulama giriş noktasının (app.main) açılış maliyeti; her ölçüm temiz bir alt süreçte.
+#   import   : `import app.main` süresi, modül / thread sayısı, tepe RSS, ağır modüllerin yüklenip yüklenmediği
+#   lifespan : açılış (init_db, kuyruklar, RUN_SCHEDULER=1 ise hatırlatma kurulumu + zamanlayıcı) süresi
+#
+#   python -m bench.startup --runs 5 --out bench/results/startup.json
+import argparse, json, os, subprocess, sys, tempfile
+
+from bench.results import summarize, report, emit
+
+HEAVY = ("requests", "apscheduler", "dateutil.tz", "dateutil.parser", "dateutil.rrule", "passlib.handlers.bcrypt",
+         "bcrypt", "jinja2", "msal")
+
+def _child(lifespan: bool):
+    import asyncio, resource, threading, time
+    t0 = time.perf_counter()
+    import app.main as M
+    out = {"import_s": time.perf_counter() - t0, "modules": len(sys.modules), "threads": threading.active_count(),
+           "loaded": [m for m in HEAVY if m in sys.modules]}
+    if lifespan:
+        async def _run():
+            async with M.app.router.lifespan_context(M.app):
+                out["startup_s"] = time.perf_counter() - t1
+                out["threads_running"] = threading.active_count()
+        t1 = time.perf_counter()
+        asyncio.run(_run())
+    out["rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps(out))
+
+def _spawn(lifespan: bool, run_scheduler: str) -> dict:
+    with tempfile.TemporaryDirectory() as d:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{d}/app.db", RUN_SCHEDULER=run_scheduler, DB_ASYNC="0")
+        args = [sys.executable, "-m", "bench.startup", "--child"] + (["--lifespan"] if lifespan else [])
+        r = subprocess.run(args, env=env, capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+def _collect(runs: list[dict]) -> dict:
+    last = runs[-1]
+    out = {"import": summarize([r["import_s"] for r in runs]), "modules": last["modules"],
+           "threads_after_import": last["threads"], "peak_rss_mb": round(max(r["rss_kb"] for r in runs) / 1024, 1),
+           "heavy_loaded": last["loaded"]}
+    if "startup_s" in last:
+        out["startup"] = summarize([r["startup_s"] for r in runs])
+        out["threads_running"] = last["threads_running"]
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--lifespan", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    if args.child:
+        return _child(args.lifespan)
+
+    results = {
+        "import": _collect([_spawn(False, "1") for _ in range(args.runs)]),
+        "web_only": _collect([_spawn(True, "0") for _ in range(args.runs)]),
+        "with_scheduler": _collect([_spawn(True, "1") for _ in range(args.runs)]),
+    }
+    emit(report("startup", {"runs": args.runs}, results, database_url="sqlite://"), args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+// Canlı değişiklik akışı (GET /api/events, Server-Sent Events).
+// EventSource Authorization başlığı gönderemediği için fetch + ReadableStream ile okunur;
+// bağlantı koparsa sunucunun verdiği retry süresi sonra Last-Event-ID ile yeniden bağlanır.
+function openFeed(token, onEvent, onState) {
+  let lastId = null, retry = 3000, stopped = false, ctrl = null;
+  const state = (s) => onState && onState(s);
+
+  function dispatch(block) {
+    let id = null; const data = [];
+    for (const line of block.split("\n")) {
+      if (line.startsWith("id:")) id = line.slice(3).trim();
+      else if (line.startsWith("data:")) data.push(line.slice(5).replace(/^ /, ""));
+      else if (line.startsWith("retry:")) retry = parseInt(line.slice(6), 10) || retry;
+    }
+    if (id) lastId = id;
+    if (!data.length) return;  // ": ping" ve retry satırları
+    try { onEvent(JSON.parse(data.join("\n"))); } catch (e) { console.error(e); }
+  }
+
+  async function connect() {
+    ctrl = new AbortController();
+    const headers = { Authorization: "Bearer " + token };
+    if (lastId) headers["Last-Event-ID"] = lastId;
+    try {
+      const res = await fetch("/api/events", { headers, signal: ctrl.signal });
+      if (res.status === 401) { state("auth"); return; }
+      if (!res.ok || !res.body) throw new Error(String(res.status));
+      state("open");
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buf = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += value;
+        let i;
+        while ((i = buf.indexOf("\n\n")) >= 0) {
+          dispatch(buf.slice(0, i));
+          buf = buf.slice(i + 2);
+        }
+      }
+    } catch (e) {
+      if (stopped) return;
+    }
+    if (!stopped) { state("closed"); setTimeout(connect, retry); }
+  }
+
+  connect();
+  return { close() { stopped = true; if (ctrl) ctrl.abort(); } };
+}
+
+// Yaklaşan randevu listesine olay uygula. items: upcoming öğeleri (start, id sıralı);
+// complete: listenin sonuna kadar yüklendiyse true (X-Next-Cursor yok).
+// Dönen: true → liste değişti, null → baştan yüklenmeli ("refresh").
+function applyFeedEvent(items, ev, complete) {
+  if (!ev.type || !ev.type.startsWith("appointment.")) return null;
+  const a = ev.appointment;
+  const key = (x) => [Date.parse(x.start), x.id ?? -x.series_id];
+  const before = (x, y) => { const [s1, i1] = key(x), [s2, i2] = key(y); return s1 < s2 || (s1 === s2 && i1 < i2); };
+  // Aynı randevu ya da serinin satırı olmayan (id'siz) aynı oturumu listeden çıkar
+  for (let i = items.length - 1; i >= 0; i--) {
+    const x = items[i];
+    if ((a.id != null && x.id === a.id) ||
+        (x.id == null && a.series_id != null && x.series_id === a.series_id &&
+         a.occurrence_start && Date.parse(x.start) === Date.parse(a.occurrence_start))) {
+      items.splice(i, 1);
+    }
+  }
+  if (Date.parse(a.start) < Date.now()) return true;
+  // Yüklenmiş sayfaların ötesine düşen kayıt eklenmez; "Daha fazla" ile gelir
+  const last = items[items.length - 1];
+  if (!complete && last && before(last, a)) return true;
+  let i = items.findIndex((x) => before(a, x));
+  items.splice(i < 0 ? items.length : i, 0, a);
+  return true;
+}
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.archive import archive_before, history_query
+from app.models import Appointment, AppointmentArchive, AppointmentSeries, Client, Reminder, Tenant
+from app.series import occurrences, override, series_until
+
+NOW = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/archive.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as s:
+        t = Tenant(name="t", tenant_key="k")
+        s.add(t); s.flush()
+        s.add(Client(tenant_id=t.id, phone="+905550000000")); s.commit()
+        yield s
+
+def _appt(s: Session, start: datetime, status: str = "confirmed") -> int:
+    a = Appointment(tenant_id=1, client_id=1, start=start, end=start + timedelta(minutes=50), status=status)
+    s.add(a); s.commit()
+    return a.id
+
+def _ids(s: Session, model) -> list[int]:
+    return s.exec(select(model.id).order_by(model.id)).all()
+
+def test_archive_moves_rows_and_their_reminders(session):
+    old = [_appt(session, NOW - timedelta(days=100, hours=i), "cancelled" if i == 1 else "confirmed") for i in range(3)]
+    recent = _appt(session, NOW + timedelta(days=1))
+    session.add(Reminder(tenant_id=1, appointment_id=old[0], kind="24", due_at=NOW - timedelta(days=101),
+                         phone="+905550000000", text="t", status="sent"))
+    session.add(Reminder(tenant_id=1, appointment_id=recent, kind="24", due_at=NOW, phone="+905550000000", text="t"))
+    session.commit()
+
+    assert archive_before(session, NOW - timedelta(days=30), batch_size=2) == 3
+    assert _ids(session, Appointment) == [recent]
+    assert _ids(session, AppointmentArchive) == old  # id'ler değişmez
+    assert session.exec(select(Reminder.appointment_id)).all() == [recent]
+    assert session.get(AppointmentArchive, old[1]).status == "cancelled"
+    assert archive_before(session, NOW - timedelta(days=30)) == 0
+
+def test_max_id_is_not_archived(session):
+    # SQLite rowid'i max(id)+1'den verir: en büyük id taşınırsa yeni randevu aynı id'yi alıp arşivle çakışır
+    ids = [_appt(session, NOW - timedelta(days=100, hours=i)) for i in range(3)]
+    assert archive_before(session, NOW) == 2
+    assert _ids(session, Appointment) == [ids[-1]]
+    new = _appt(session, NOW + timedelta(days=1))
+    assert new not in _ids(session, AppointmentArchive)
+
+def test_history_unions_hot_and_archived_rows(session):
+    starts = [NOW - timedelta(days=d) for d in (100, 90, 80, 5, 4)]
+    ids = [_appt(session, st) for st in starts]
+    archive_before(session, NOW - timedelta(days=30))
+    page = session.execute(history_query(1, NOW, limit=10)).all()
+    assert [(r.id, r.archived) for r in page] == [(ids[4], False), (ids[3], False),
+                                                 (ids[2], True), (ids[1], True), (ids[0], True)]
+    # Keyset: (start, id) imleci arşiv dalında da devam eder
+    last = page[2]
+    rest = session.execute(history_query(1, NOW, after=(last.start, last.id), limit=10)).all()
+    assert [r.id for r in rest] == [ids[1], ids[0]]
+
+def test_archived_series_override_still_hides_occurrence(session):
+    series = AppointmentSeries(tenant_id=1, client_id=1, start=NOW - timedelta(days=120), duration_minutes=50,
+                               rrule="FREQ=WEEKLY;COUNT=4", tz="UTC")
+    series.until = series_until(series)
+    session.add(series); session.commit(); session.refresh(series)
+    window = (NOW - timedelta(days=130), NOW)
+    cancelled = occurrences(session, 1, *window)[1].start
+    override(session, series, cancelled, "cancelled")
+    session.commit()
+    _appt(session, NOW + timedelta(days=1))  # override satırı en büyük id olmasın, taşınsın
+    before = [o.start for o in occurrences(session, 1, *window)]
+    assert archive_before(session, NOW - timedelta(days=30)) == 1
+    assert session.exec(select(AppointmentArchive.series_id)).all() == [series.id]
+    assert [o.start for o in occurrences(session, 1, *window)] == before
+    assert cancelled not in before
@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.booking import BookingConflict, BookingIndex, IntervalIndex, book_appointment, is_overlap_error
+from app.db import _install_overlap_guard
+from app.models import Appointment, Client, Tenant
+
+T0 = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+
+def _h(hours: float) -> datetime:
+    return T0 + timedelta(hours=hours)
+
+@pytest.mark.parametrize("start, end, expected", [
+    (_h(1), _h(2), False),       # bitişik: önceki bitişte başlar
+    (_h(-1), _h(0), False),      # bitişik: sonraki başlangıçta biter
+    (_h(.5), _h(1.5), True),     # sona taşar
+    (_h(-.5), _h(.5), True),     # başa taşar
+    (_h(.25), _h(.75), True),    # içinde
+    (_h(-1), _h(2), True),       # kapsar
+    (_h(3), _h(4), False),
+])
+def test_interval_index_overlaps(start, end, expected):
+    idx = IntervalIndex([(_h(0), _h(1), 1), (_h(5), _h(6), 2)])
+    assert idx.overlaps(start, end) is expected
+
+def test_interval_index_long_earlier_interval_is_seen():
+    # Önek maksimumu: uzun erken aralık, sonradan başlayan kısa aralıkların arkasında kalsa da görülür
+    idx = IntervalIndex([(_h(0), _h(8), 1), (_h(1), _h(2), 2)])
+    assert idx.overlaps(_h(5), _h(6))
+    assert idx.remove(1, _h(0))
+    assert not idx.overlaps(_h(5), _h(6))
+
+def test_interval_index_ignore_self_when_moving():
+    idx = IntervalIndex([(_h(0), _h(1), 1)])
+    assert not idx.overlaps(_h(.5), _h(1.5), ignore=1)
+    idx.add(_h(1), _h(2), 2)
+    assert idx.overlaps(_h(.5), _h(1.5), ignore=1)
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/booking.db", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    _install_overlap_guard(engine)
+    with Session(engine) as s:
+        t = Tenant(name="t", tenant_key="k")
+        s.add(t); s.flush()
+        c = Client(tenant_id=t.id, phone="+905550000000")
+        s.add(c); s.commit()
+        ids = (t.id, c.id)
+    yield engine, *ids
+    engine.dispose()
+
+def test_adjacent_booking_is_allowed(db):
+    engine, tenant_id, client_id = db
+    index = BookingIndex()
+    with Session(engine) as s:
+        book_appointment(s, index, tenant_id, client_id, _h(0), _h(1), "manual")
+        book_appointment(s, index, tenant_id, client_id, _h(1), _h(2), "manual")
+        with pytest.raises(BookingConflict):
+            book_appointment(s, index, tenant_id, client_id, _h(1.5), _h(2.5), "manual")
+
+def test_cancelled_appointment_frees_its_slot(db):
+    engine, tenant_id, client_id = db
+    index = BookingIndex()
+    with Session(engine) as s:
+        a = book_appointment(s, index, tenant_id, client_id, _h(0), _h(1), "manual")
+        a.status = "cancelled"
+        s.add(a); s.commit()
+        index.remove(tenant_id, a.id, a.start)  # iptal endpoint'i gibi
+        book_appointment(s, index, tenant_id, client_id, _h(0), _h(1), "manual")
+        # Yeniden yüklenen indeks de iptal edilen satırı saymaz
+        index.invalidate(tenant_id)
+        assert len(index.get(s, tenant_id)) == 1
+
+def test_index_rebuilds_after_external_write(db):
+    engine, tenant_id, client_id = db
+    index = BookingIndex()
+    with Session(engine) as s:
+        assert not index.overlaps(s, tenant_id, _h(0), _h(1))  # boş indeks önbellekte
+    # Başka worker aynı saati yazdı; bu süreçteki indeks bilmiyor
+    with Session(engine) as other:
+        other.add(Appointment(tenant_id=tenant_id, client_id=client_id, start=_h(0), end=_h(1)))
+        other.commit()
+    with Session(engine) as s:
+        assert not index.overlaps(s, tenant_id, _h(0), _h(1))
+        # DB guard reddeder, indeks yeniden okunur
+        with pytest.raises(BookingConflict):
+            book_appointment(s, index, tenant_id, client_id, _h(.5), _h(1.5), "manual")
+        assert index.overlaps(s, tenant_id, _h(0), _h(1))
+
+def test_db_guard_rejects_concurrent_overlapping_insert(db):
+    engine, tenant_id, client_id = db
+    barrier, results = threading.Barrier(2), []
+
+    def insert(start: datetime):
+        with Session(engine) as s:
+            s.add(Appointment(tenant_id=tenant_id, client_id=client_id, start=start, end=start + timedelta(hours=1)))
+            barrier.wait()
+            try:
+                s.commit()
+                results.append("ok")
+            except IntegrityError as e:
+                results.append("overlap" if is_overlap_error(e) else repr(e))
+
+    threads = [threading.Thread(target=insert, args=(s,)) for s in (_h(0), _h(.5))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert sorted(results) == ["ok", "overlap"]
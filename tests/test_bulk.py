@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app import bulk
+from app.booking import BookingIndex, book_series, is_overlap_error
+from app.models import Appointment, Client, Tenant
+
+def _setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/bulk.db")
+    SQLModel.metadata.create_all(engine)
+    s = Session(engine)
+    t = Tenant(name="t", tenant_key="k")
+    s.add(t); s.flush()
+    c = Client(tenant_id=t.id, phone="+905550000001", name="Seri")
+    s.add(c); s.commit()
+    # Haftalık seri: önümüzdeki 4 hafta, her oturum 10:00-10:50 UTC
+    first = (datetime.now(timezone.utc) + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+    book_series(s, BookingIndex(), t.id, c.id, first, 50, "FREQ=WEEKLY;COUNT=4", "UTC")
+    return s, t.id, first
+
+def _row(phone: str, start: datetime, name: str | None = None) -> dict:
+    return {"phone": phone, "name": name, "start": start, "end": start + timedelta(minutes=50),
+            "status": "confirmed", "source": "import"}
+
+def test_row_overlapping_series_occurrence_is_rejected(tmp_path):
+    s, tenant_id, first = _setup(tmp_path)
+    result = bulk.ImportResult()
+    batch = [(1, _row("+905550000002", first + timedelta(weeks=1, minutes=30))),
+             (2, _row("+905550000003", first + timedelta(hours=1)))]  # oturumdan sonra, boş
+    bulk.import_appointment_batch(s, tenant_id, batch, result, is_overlap_error)
+    assert result.imported == 1
+    assert result.errors == [{"line": 1, "error": "saat dolu (çakışan onaylı randevu ya da seri oturumu)"}]
+    assert s.exec(select(Client.phone).order_by(Client.id)).all() == ["+905550000001", "+905550000003"]
+
+def test_rejected_row_does_not_rename_client(tmp_path):
+    s, tenant_id, first = _setup(tmp_path)
+    result = bulk.ImportResult()
+    bulk.import_appointment_batch(s, tenant_id, [(1, _row("+905550000001", first, "Yeni"))], result, is_overlap_error)
+    assert result.failed == 1 and result.clients_updated == 0
+    assert s.exec(select(Client.name)).one() == "Seri"
+
+def test_overlap_within_batch_is_rejected(tmp_path):
+    s, tenant_id, first = _setup(tmp_path)
+    start = first + timedelta(days=1)
+    result = bulk.ImportResult()
+    batch = [(1, _row("+905550000002", start)), (2, _row("+905550000003", start + timedelta(minutes=20)))]
+    bulk.import_appointment_batch(s, tenant_id, batch, result, is_overlap_error)
+    assert result.imported == 1 and [e["line"] for e in result.errors] == [2]
+    assert len(s.exec(select(Appointment)).all()) == 1
+    assert "+905550000003" not in s.exec(select(Client.phone)).all()
@@ -0,0 +1,40 @@
+import threading
+from datetime import date, datetime, time as dtime, timezone
+
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.cache import AvailabilityCache
+
+DAY = date(2030, 1, 7)
+
+def _cache(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/cache.db", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    return Session(engine), AvailabilityCache(dtime(9, 0), dtime(17, 0), 60, "Europe/Istanbul")
+
+def _invalidate_during_first_set(cache: AvailabilityCache, invalidate):
+    # Yükleme nesli kontrol ettikten sonra, yazmadan önce başka thread invalidate çağırır
+    set_, threads = cache.cache.set, []
+    def hooked(key, value, ttl=None):
+        if not threads:
+            threads.append(threading.Thread(target=invalidate))
+            threads[0].start()
+            threads[0].join(0.2)  # kilit varsa invalidate yazma bitene kadar bekler
+        set_(key, value, ttl)
+    cache.cache.set = hooked
+    return threads
+
+def test_invalidate_between_gen_check_and_set(tmp_path):
+    s, cache = _cache(tmp_path)
+    start = datetime(2030, 1, 7, 10, tzinfo=timezone.utc)
+    threads = _invalidate_during_first_set(cache, lambda: cache.invalidate(1, start, start.replace(hour=11)))
+    cache.range(s, 1, DAY, DAY)
+    threads[0].join(5)
+    assert cache.cache.get((1, DAY)) is None
+
+def test_invalidate_tenant_between_gen_check_and_set(tmp_path):
+    s, cache = _cache(tmp_path)
+    threads = _invalidate_during_first_set(cache, lambda: cache.invalidate_tenant(1))
+    cache.range(s, 1, DAY, DAY)
+    threads[0].join(5)
+    assert cache.cache.get((1, DAY)) is None
@@ -0,0 +1,81 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.inbound import InboundPipeline
+from app.models import InboundMessage, Tenant
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/inbound.db", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+def _message(engine, **kw) -> int:
+    with Session(engine) as s:
+        t = Tenant(name="t", tenant_key="k")
+        s.add(t); s.flush()
+        m = InboundMessage(tenant_id=t.id, message_id="wamid.1", from_phone="+905550000000", text="iptal", **kw)
+        s.add(m); s.commit()
+        return m.id
+
+def test_old_message_recently_claimed_is_not_reclaimed(tmp_path):
+    engine = _engine(tmp_path)
+    msg_id = _message(engine, received_at=datetime.utcnow() - timedelta(minutes=10))
+    calls, entered, release = [], threading.Event(), threading.Event()
+
+    def slow_handler(session, tenant, msg):
+        calls.append(msg.id)
+        entered.set()
+        release.wait(5)
+
+    first = InboundPipeline(lambda: Session(engine), slow_handler, workers=1, stale_seconds=300)
+    worker = threading.Thread(target=first._process, args=(msg_id,))
+    worker.start()
+    assert entered.wait(5)
+
+    # İkinci süreç açılıyor: mesaj 10 dk'lık ama sahiplenme taze → dokunmamalı
+    second = InboundPipeline(lambda: Session(engine), lambda s, t, m: calls.append(m.id), workers=1, stale_seconds=300)
+    assert second.recover() == 0
+    second._process(msg_id)
+
+    release.set()
+    worker.join(5)
+    assert calls == [msg_id]
+    with Session(engine) as s:
+        assert s.exec(select(InboundMessage.status)).one() == "done"
+
+def test_stale_claim_is_recovered(tmp_path):
+    engine = _engine(tmp_path)
+    msg_id = _message(engine, status="processing", attempts=1,
+                      claimed_at=datetime.utcnow() - timedelta(minutes=10))
+    calls = []
+    pipeline = InboundPipeline(lambda: Session(engine), lambda s, t, m: calls.append(m.id), workers=1, stale_seconds=300)
+    assert pipeline.recover() == 1
+    pipeline._process(msg_id)
+    assert calls == [msg_id]
+
+def test_retry_keeps_sender_order(tmp_path):
+    engine = _engine(tmp_path)
+    first = _message(engine)
+    with Session(engine) as s:
+        m = InboundMessage(tenant_id=1, message_id="wamid.2", from_phone="+905550000000", text="iptal")
+        s.add(m); s.commit()
+        second = m.id
+    calls = []
+
+    def flaky(session, tenant, msg):
+        calls.append(msg.id)
+        if msg.id == first and msg.attempts == 1:
+            raise RuntimeError("geçici hata")
+
+    pipeline = InboundPipeline(lambda: Session(engine), flaky, workers=1, retry_seconds=0.01)
+    pipeline.submit(first, "+905550000000")
+    pipeline.submit(second, "+905550000000")
+    pipeline.start()
+    pipeline.join()
+    pipeline.stop()
+    # İlk mesaj yerinde tekrar denenir; 'iptal' ondan önce işlenmez
+    assert calls == [first, first, second]
+    with Session(engine) as s:
+        assert s.exec(select(InboundMessage.status)).all() == ["done", "done"]
@@ -0,0 +1,16 @@
+import pytest
+
+from bench.explain import hot_queries, plan, upgraded_engine, uses_index
+
+# İndekssiz eski şema db.migrate() ile yükseltildikten sonra her sıcak sorgu indeksle çalışmalı
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    engine = upgraded_engine(f"sqlite:///{tmp_path_factory.mktemp('explain')}/explain.db")
+    with engine.connect() as c:
+        yield c
+    engine.dispose()
+
+@pytest.mark.parametrize("name", list(hot_queries()))
+def test_hot_query_uses_index(conn, name):
+    p = plan(conn, hot_queries()[name])
+    assert uses_index(conn.dialect.name, p), p
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.intent import classify, fold, parse_message, parse_when
+
+TZ = "Europe/Istanbul"
+TODAY = date(2030, 1, 7)
+
+@pytest.mark.parametrize("text, folded", [
+    ("İPTAL", "iptal"),
+    ("IĞDIR", "igdir"),          # I → ı → i
+    ("YARIN", "yarin"),
+    ("yarın", "yarin"),
+    ("Bugün", "bugun"),
+    ("MÜSAİT", "musait"),
+    ("Vazgeçtim", "vazgectim"),
+])
+def test_fold_turkish_case(text, folded):
+    assert fold(text) == folded
+
+@pytest.mark.parametrize("text, intent, window", [
+    ("İPTAL", "cancel", "today"),
+    ("randevumu iptal et", "cancel", "today"),   # iptal, randevu kelimesine baskın
+    ("Randevu almak istiyorum, yoksa vazgeçeyim mi", "cancel", "today"),
+    ("RANDEVU AL", "book", "today"),
+    ("yarın randevu", "book", "tomorrow"),
+    ("YARIN müsait misiniz", "availability", "tomorrow"),
+    ("bu HAFTA", "availability", "week"),
+    ("bugün", "availability", "today"),
+    ("merhaba", "help", "today"),
+    ("alarm", "help", "today"),                  # 'al' kelime başı + sonu ister
+    ("saatçi", "availability", "today"),
+])
+def test_classify(text, intent, window):
+    assert classify(text) == (intent, window)
+
+def _local(*args) -> datetime:
+    return datetime(*args, tzinfo=ZoneInfo(TZ)).astimezone(timezone.utc)
+
+@pytest.mark.parametrize("text, expected", [
+    ("2030-01-31 14:30", _local(2030, 1, 31, 14, 30)),
+    ("2030-01-31T14:30", _local(2030, 1, 31, 14, 30)),
+    ("31.01.2030 14:30", _local(2030, 1, 31, 14, 30)),
+    ("31/01/2030 14.30", _local(2030, 1, 31, 14, 30)),
+    ("31.01 14:30", _local(2030, 1, 31, 14, 30)),
+    ("  YARIN 9:05 ", _local(2030, 1, 8, 9, 5)),
+    ("bugün saat 14:30", _local(2030, 1, 7, 14, 30)),
+    ("14:30", _local(2030, 1, 7, 14, 30)),
+])
+def test_parse_when_formats(text, expected):
+    assert parse_when(text, TZ, TODAY) == expected
+
+@pytest.mark.parametrize("text", [
+    "31.02.2030 10:00",       # geçersiz gün
+    "2030-13-01 10:00",       # geçersiz ay
+    "25:00",                  # geçersiz saat
+    "10:60",
+    "yarın 14:30'da gelirim",  # tüm mesaj değil (anchored)
+    "randevu 14:30",
+    "2030-01-31",             # saat yok
+    "1430",
+])
+def test_parse_when_rejects(text):
+    assert parse_when(text, TZ, TODAY) is None
+
+def test_parse_message_combines_intent_and_when():
+    m = parse_message("Yarın 10:00", TZ, TODAY)
+    assert (m.intent, m.window, m.when) == ("availability", "tomorrow", _local(2030, 1, 8, 10, 0))
+    assert parse_message("iptal", TZ, TODAY).when is None
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.models import Appointment, Client, Reminder, Tenant
+from app.scheduler import ReminderDispatcher, _insert_pending, _schedule, schedule_all, schedule_appointment
+
+def _setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/reminders.db")
+    SQLModel.metadata.create_all(engine)
+    s = Session(engine)
+    t = Tenant(name="t", tenant_key="k")
+    s.add(t); s.flush()
+    c = Client(tenant_id=t.id, phone="+905550000000")
+    s.add(c); s.flush()
+    start = datetime.now(timezone.utc) + timedelta(days=3)
+    a = Appointment(tenant_id=t.id, client_id=c.id, start=start, end=start + timedelta(minutes=50))
+    s.add(a); s.commit()
+    return s, a
+
+def _pending(s: Session) -> list[tuple[int, str]]:
+    return sorted(s.exec(select(Reminder.appointment_id, Reminder.kind).where(Reminder.status == 'pending')).all())
+
+def test_concurrent_reschedule_keeps_one_pending_per_kind(tmp_path):
+    s, a = _setup(tmp_path)
+    schedule_appointment(a, s, 1440, 60, None)
+    # Diğer istek de silmeyi bizden önce yapmış, eklemeyi bizden sonra yapıyor
+    _insert_pending(s, _schedule(a, "+905550000000", 1440, 60, None))
+    s.commit()
+    assert _pending(s) == [(a.id, "1"), (a.id, "24")]
+
+def test_schedule_all_is_idempotent(tmp_path):
+    s, a = _setup(tmp_path)
+    assert schedule_all(s, 1440, 60, None) == 2
+    schedule_all(s, 1440, 60, None)
+    schedule_appointment(a, s, 1440, 60, None)
+    assert _pending(s) == [(a.id, "1"), (a.id, "24")]
+
+def test_sent_reminder_does_not_block_new_pending(tmp_path):
+    s, a = _setup(tmp_path)
+    schedule_appointment(a, s, 1440, 60, None)
+    s.exec(update(Reminder).where(Reminder.kind == "24").values(status="sent"))
+    s.commit()
+    schedule_appointment(a, s, 1440, 60, None)
+    assert _pending(s) == [(a.id, "1"), (a.id, "24")]
+    assert len(s.exec(select(Reminder)).all()) == 3
+
+def _claim_all(s: Session):
+    s.exec(update(Reminder).values(due_at=datetime.now(timezone.utc) - timedelta(minutes=1)))
+    s.commit()
+    d = ReminderDispatcher(lambda: s, {}, workers=1)
+    return d, sorted(d._claim(s), key=lambda r: r.kind)  # ['1', '24']
+
+def test_failed_send_after_reschedule_is_superseded(tmp_path):
+    s, a = _setup(tmp_path)
+    schedule_appointment(a, s, 1440, 60, None)
+    d, batch = _claim_all(s)
+    # Gönderim sürerken randevu yeniden kuruldu: her tür için yeni bekleyen satır
+    schedule_appointment(a, s, 1440, 60, None)
+    d._finish(s, batch, [None, "timeout"])
+    d.shutdown()
+    rows = {(r.kind, r.status) for r in s.exec(select(Reminder)).all()}
+    assert rows == {("1", "sent"), ("24", "superseded"), ("1", "pending"), ("24", "pending")}
+
+def test_failed_send_goes_back_to_pending(tmp_path):
+    s, a = _setup(tmp_path)
+    schedule_appointment(a, s, 1440, 60, None)
+    d, batch = _claim_all(s)
+    d._finish(s, batch, [None, "timeout"])
+    d.shutdown()
+    rows = {(r.kind, r.status, r.last_error) for r in s.exec(select(Reminder)).all()}
+    assert rows == {("1", "sent", None), ("24", "pending", "timeout")}
+
+def test_reminder_text_uses_clinic_timezone():
+    start = datetime(2030, 1, 7, 7, 0, tzinfo=timezone.utc)
+    a = Appointment(id=1, tenant_id=1, client_id=1, start=start, end=start + timedelta(minutes=50))
+    texts = {r.kind: r.text for r in _schedule(a, "+905550000000", 1440, 60, None, "Europe/Istanbul")}
+    assert texts["24"] == "Hatırlatma (24s): 07.01 10:00 seansınız var."
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.models import Appointment, AppointmentSeries, Client, Tenant
+from app.series import expand, materialize, occurrences, override, series_until
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+def _series(start: datetime, rrule: str, tz: str = "UTC", **kw) -> AppointmentSeries:
+    s = AppointmentSeries(tenant_id=1, client_id=1, start=start, duration_minutes=50, rrule=rrule, tz=tz, **kw)
+    s.until = series_until(s)
+    return s
+
+def test_dst_keeps_wall_clock():
+    # Berlin 2030-03-31'de yaz saatine geçer: 10:00 yerel önce 09:00Z, sonra 08:00Z
+    s = _series(_utc(2030, 3, 25, 9), "FREQ=WEEKLY;COUNT=3", "Europe/Berlin")
+    starts = [a for a, _ in expand(s, _utc(2030, 3, 1), _utc(2030, 5, 1))]
+    assert starts == [_utc(2030, 3, 25, 9), _utc(2030, 4, 1, 8), _utc(2030, 4, 8, 8)]
+
+@pytest.mark.parametrize("rrule, n", [
+    ("FREQ=DAILY;COUNT=5", 5),
+    ("FREQ=DAILY;UNTIL=20300105T235959", 5),
+    ("FREQ=WEEKLY;COUNT=2", 2),
+])
+def test_count_and_until_bound_the_series(rrule, n):
+    s = _series(_utc(2030, 1, 1, 10), rrule)
+    occs = expand(s, _utc(2029, 12, 1), _utc(2031, 1, 1))
+    assert len(occs) == n
+    assert s.until == occs[-1][1]
+
+def test_open_ended_series_has_no_until():
+    s = _series(_utc(2030, 1, 1, 10), "FREQ=WEEKLY")
+    assert s.until is None
+    assert len(expand(s, _utc(2030, 1, 1), _utc(2030, 2, 1))) == 5
+
+def test_window_includes_session_started_before_it():
+    s = _series(_utc(2030, 1, 1, 10), "FREQ=DAILY;COUNT=3")
+    assert expand(s, _utc(2030, 1, 2, 10, 30), _utc(2030, 1, 2, 12)) == [(_utc(2030, 1, 2, 10), _utc(2030, 1, 2, 10, 50))]
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/series.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as s:
+        t = Tenant(name="t", tenant_key="k")
+        s.add(t); s.flush()
+        s.add(Client(tenant_id=t.id, phone="+905550000000")); s.commit()
+        yield s
+
+def _stored(session: Session, start: datetime, rrule: str) -> AppointmentSeries:
+    series = _series(start, rrule)
+    session.add(series); session.commit(); session.refresh(series)
+    return series
+
+def test_override_cancels_and_moves_single_occurrence(session):
+    series = _stored(session, _utc(2030, 1, 1, 10), "FREQ=DAILY;COUNT=4")
+    override(session, series, _utc(2030, 1, 2, 10), "cancelled")
+    override(session, series, _utc(2030, 1, 3, 10), "confirmed", _utc(2030, 1, 3, 15))
+    session.commit()
+    left = [o.start for o in occurrences(session, 1, _utc(2030, 1, 1), _utc(2030, 1, 10))]
+    assert left == [_utc(2030, 1, 1, 10), _utc(2030, 1, 4, 10)]
+    moved = session.exec(select(Appointment).where(Appointment.status == "confirmed")).one()
+    assert (moved.series_id, moved.start, moved.end) == (series.id, datetime(2030, 1, 3, 15), datetime(2030, 1, 3, 15, 50))
+    # Aynı oturum için ikinci override satırı günceller, yenisini eklemez
+    override(session, series, _utc(2030, 1, 2, 10), "confirmed")
+    session.commit()
+    assert len(session.exec(select(Appointment)).all()) == 2
+
+def test_materialize_is_idempotent(session):
+    start = (datetime.now(timezone.utc) + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    _stored(session, start, "FREQ=DAILY;COUNT=5")
+    until = start + timedelta(days=10)
+    assert len(materialize(session, until)) == 5
+    assert materialize(session, until) == []
+    assert len(session.exec(select(Appointment)).all()) == 5
+    assert occurrences(session, 1, start, until) == []